@@ -3,55 +3,106 @@ Flask Web Application for Eye Blink Detection
 Modern web-based frontend with real-time video streaming
 """
 
-from flask import Flask, render_template, Response, jsonify, request
-import cv2
+from flask import Flask, render_template, Response, jsonify, request, stream_with_context
+import argparse
 import json
-from blink_detector import EyeBlinkDetector
 import threading
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from blink_detector import EyeBlinkDetector, load_config
+from stream_engine import DetectionEngine, QualityLadder
+from export_jobs import ExportManager
+from luma_capture import open_capture
+from startup import run_in_background, StartupProfiler
+import model_registry
 import time
 
 app = Flask(__name__)
 
-# Global detector instance
+# Global detector instance (owned by the engine thread once attached)
 detector = None
 cap = None
-detection_active = False
-lock = threading.Lock()
+config = load_config()
 
-def initialize_detector():
-    """Initialize the blink detector"""
+# Single capture/detect/encode loop shared by all video clients; each client
+# gets JPEG quality/resolution from the ladder according to its drain rate
+streaming = config.get('streaming', {})
+engine = DetectionEngine(
+    QualityLadder(max_quality=streaming.get('max_jpeg_quality', 85),
+                  min_quality=streaming.get('min_jpeg_quality', 40),
+                  min_scale=streaming.get('min_scale', 0.5),
+                  steps=streaming.get('quality_steps', 5)),
+    target_fps=streaming.get('target_fps', config.get('camera', {}).get('fps', 30)),
+    heartbeat_interval=streaming.get('stats_heartbeat_seconds', 1.0))
+
+# Seconds a settings or reset request waits for the detection thread
+SETTINGS_TIMEOUT = 5.0
+
+# Exports run in the background and are downloaded when finished
+exports = ExportManager()
+
+def export_snapshot(d):
+    """Copy blink rows and summary; runs on the engine thread between frames"""
+    stats = d.get_stats()
+    summary = {
+        'total_blinks': stats['total_blinks'],
+        'session_duration': stats['session_duration'],
+        'avg_blink_rate': stats['avg_blink_rate'],
+        'blink_rate': stats['blink_rate'],
+        'faces': stats['faces']
+    }
+    return d.blink_rows(), summary
+
+# Held while initializing, so a start request arriving during the
+# background startup waits for it instead of opening a second camera
+_init_lock = threading.Lock()
+
+def initialize_detector(profiler=None):
+    """Initialize the blink detector (the landmark model is only loaded once)"""
     global detector, cap
-    try:
-        detector = EyeBlinkDetector()
-        cap = cv2.VideoCapture(0)
-        return True
-    except Exception as e:
-        print(f"Error initializing detector: {e}")
-        return False
+    profiler = profiler or StartupProfiler(enabled=False)
+    with _init_lock:
+        if cap is not None and cap.isOpened():
+            return True
+        try:
+            with profiler.phase('detector'):
+                detector = EyeBlinkDetector.from_config(
+                    config, session_log=config.get('export', {}).get('session_log'))
+            with profiler.phase('camera'):
+                cap = open_capture(0, luma=config.get('camera', {}).get('luma_capture', False))
+            engine.attach(detector, cap)
+            return True
+        except Exception as e:
+            print(f"Error initializing detector: {e}")
+            return False
 
 def generate_frames():
-    """Generate video frames with blink detection"""
-    global detector, cap, detection_active
+    """
+    Stream the engine's latest encoded frames to one client
     
-    while True:
-        if not detection_active or cap is None:
-            time.sleep(0.1)
-            continue
+    Frames that arrive while the previous one is still being written are
+    skipped. The time the server spends writing each chunk is fed back to
+    the slot, which picks JPEG quality and resolution for this client.
+    """
+    slot = engine.subscribe()
+    last_seq = 0
+    try:
+        while True:
+            item = slot.wait(last_seq, timeout=1.0)
+            if item is None:
+                if slot.closed:
+                    break
+                continue
+            seq, frame_bytes = item
             
-        success, frame = cap.read()
-        if not success:
-            break
-        
-        with lock:
-            # Detect blinks
-            frame, blink_detected, is_drowsy = detector.detect_blink(frame)
-        
-        # Encode frame
-        ret, buffer = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, 85])
-        frame_bytes = buffer.tobytes()
-        
-        yield (b'--frame\r\n'
-               b'Content-Type: image/jpeg\r\n\r\n' + frame_bytes + b'\r\n')
+            chunk = (b'--frame\r\n'
+                     b'Content-Type: image/jpeg\r\n\r\n' + frame_bytes + b'\r\n')
+            # The server writes the chunk before resuming this generator
+            sent_at = time.perf_counter()
+            yield chunk
+            slot.record_delivery(seq, last_seq, len(chunk), time.perf_counter() - sent_at)
+            last_seq = seq
+    finally:
+        engine.unsubscribe(slot)
 
 @app.route('/')
 def index():
@@ -67,81 +118,160 @@ def video_feed():
 @app.route('/api/start', methods=['POST'])
 def start_detection():
     """Start blink detection"""
-    global detection_active, cap
-    
     if cap is None or not cap.isOpened():
         if not initialize_detector():
             return jsonify({'success': False, 'message': 'Failed to initialize camera'})
     
-    detection_active = True
+    engine.start()
     return jsonify({'success': True, 'message': 'Detection started'})
 
 @app.route('/api/stop', methods=['POST'])
 def stop_detection():
     """Stop blink detection"""
-    global detection_active
-    detection_active = False
+    engine.pause()
     return jsonify({'success': True, 'message': 'Detection stopped'})
 
 @app.route('/api/reset', methods=['POST'])
 def reset_counters():
     """Reset all counters"""
-    global detector
-    with lock:
-        detector.reset()
+    if detector is None:
+        return jsonify({'success': False, 'message': 'Detector not initialized'}), 503
+    
+    try:
+        engine.call(lambda d: d.reset(), timeout=SETTINGS_TIMEOUT)
+    except FutureTimeoutError:
+        return jsonify({'success': False, 'message': 'Timed out resetting counters'}), 504
+    except Exception as e:
+        return jsonify({'success': False, 'message': f'Failed to reset counters: {e}'}), 500
     return jsonify({'success': True, 'message': 'Counters reset'})
 
 @app.route('/api/stats')
 def get_stats():
-    """Get current statistics"""
-    global detector
-    with lock:
-        stats = detector.get_stats()
-    return jsonify(stats)
+    """Get current statistics from the latest published snapshot"""
+    return jsonify(dict(engine.snapshot))
+
+@app.route('/api/stats/stream')
+def stream_stats():
+    """Server-Sent Events channel pushing stats deltas"""
+    def events():
+        sub = engine.stats.subscribe()
+        try:
+            while True:
+                delta = sub.wait(timeout=15.0)
+                if delta is None:
+                    if sub.closed:
+                        break
+                    # Comment line keeps proxies from closing an idle stream
+                    yield ': keepalive\n\n'
+                    continue
+                yield f"event: stats\ndata: {json.dumps(delta)}\n\n"
+        finally:
+            engine.stats.unsubscribe(sub)
+    
+    return Response(stream_with_context(events()), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@app.route('/api/streams')
+def get_streams():
+    """Get per-client video delivery statistics"""
+    return jsonify({'clients': engine.client_stats(), 'models': model_registry.get_stats()})
 
 @app.route('/api/export', methods=['POST'])
 def export_data():
-    """Export data to CSV"""
-    global detector
-    with lock:
-        try:
-            filepath = detector.export_data()
-            return jsonify({'success': True, 'filepath': filepath})
-        except Exception as e:
-            return jsonify({'success': False, 'message': str(e)})
+    """Start a background export job"""
+    if detector is None:
+        return jsonify({'success': False, 'message': 'Detector not initialized'})
+    
+    job = exports.start(lambda: engine.call(export_snapshot))
+    return jsonify({
+        'success': True,
+        'job_id': job.job_id,
+        'status_url': f'/api/export/{job.job_id}',
+        'download_url': f'/api/export/{job.job_id}/download'
+    }), 202
+
+@app.route('/api/export/<job_id>')
+def export_status(job_id):
+    """Get export job status and progress"""
+    job = exports.get(job_id)
+    if job is None:
+        return jsonify({'success': False, 'message': 'Unknown export job'}), 404
+    return jsonify(dict(job.to_dict(), success=True))
+
+@app.route('/api/export/<job_id>/download')
+def export_download(job_id):
+    """Stream a finished export as a CSV download"""
+    job = exports.get(job_id)
+    if job is None:
+        return jsonify({'success': False, 'message': 'Unknown export job'}), 404
+    if job.status != 'done':
+        return jsonify({'success': False, 'message': f'Export is {job.status}'}), 409
+    
+    stream = exports.iter_file(job)
+    if stream is None:
+        return jsonify({'success': False, 'message': 'Unknown export job'}), 404
+    return Response(stream, mimetype='text/csv',
+                    headers={'Content-Disposition': f'attachment; filename="{job.filename}"'})
 
 @app.route('/api/settings', methods=['POST'])
 def update_settings():
     """Update detection settings"""
-    global detector
     data = request.json
     
-    with lock:
-        if 'ear_threshold' in data:
-            detector.ear_threshold = float(data['ear_threshold'])
-        if 'consec_frames' in data:
-            detector.consec_frames = int(data['consec_frames'])
-        if 'drowsiness_threshold' in data:
-            detector.drowsiness_threshold = float(data['drowsiness_threshold'])
+    settings = {}
+    if 'ear_threshold' in data:
+        settings['ear_threshold'] = float(data['ear_threshold'])
+    if 'consec_frames' in data:
+        settings['consec_frames'] = int(data['consec_frames'])
+    if 'drowsiness_threshold' in data:
+        settings['drowsiness_threshold'] = float(data['drowsiness_threshold'])
     
+    def apply(d):
+        for name, value in settings.items():
+            setattr(d, name, value)
+    
+    if detector is None:
+        return jsonify({'success': False, 'message': 'Detector not initialized'}), 503
+    
+    # Applied by the detection thread before its next frame
+    try:
+        engine.call(apply, timeout=SETTINGS_TIMEOUT)
+    except FutureTimeoutError:
+        return jsonify({'success': False, 'message': 'Timed out applying settings'}), 504
+    except Exception as e:
+        return jsonify({'success': False, 'message': f'Failed to apply settings: {e}'}), 500
     return jsonify({'success': True, 'message': 'Settings updated'})
 
-if __name__ == '__main__':
-    print("=" * 50)
-    print("Eye Blink Detection - Web Interface")
-    print("=" * 50)
-    print("\nInitializing...")
-    
-    if initialize_detector():
+def background_initialize(profiler):
+    """Initialize the detector while the web server starts"""
+    if initialize_detector(profiler):
         print("✓ System initialized successfully!")
-        print("\n🌐 Starting web server...")
-        print("📱 Open your browser and go to:")
-        print("\n   http://localhost:5001\n")
-        print("Press Ctrl+C to stop the server\n")
-        
-        app.run(debug=False, threaded=True, host='0.0.0.0', port=5001)
+        model_registry.report()
+        profiler.report('detector ready')
     else:
         print("✗ Failed to initialize system")
         print("Please check:")
         print("  - Webcam is connected")
         print("  - shape_predictor_68_face_landmarks.dat exists")
+        print("Detection will be retried when you press Start")
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Eye Blink Detection web interface")
+    parser.add_argument("--profile-startup", action="store_true",
+                        help="print a per-phase import and initialization breakdown")
+    args = parser.parse_args()
+    
+    print("=" * 50)
+    print("Eye Blink Detection - Web Interface")
+    print("=" * 50)
+    print("\nInitializing in the background...")
+    
+    # The page is served right away; the model and camera come up meanwhile
+    run_in_background(background_initialize, StartupProfiler(args.profile_startup))
+    
+    print("\n🌐 Starting web server...")
+    print("📱 Open your browser and go to:")
+    print("\n   http://localhost:5001\n")
+    print("Press Ctrl+C to stop the server\n")
+    
+    app.run(debug=False, threaded=True, host='0.0.0.0', port=5001)
@@ -0,0 +1,557 @@
+"""
+Offline Batch Blink Analysis
+Processes recorded videos in parallel worker processes using each
+frame's position in the video as its timestamp. Long videos can be
+split into chunks that are measured in parallel and stitched back
+into one serial blink timeline.
+"""
+
+import argparse
+import csv
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import cv2
+
+from blink_detector import EyeBlinkDetector, load_config
+from clocks import ManualClock, VideoClock
+from landmark_backends import BACKENDS, FaceBox
+from luma_capture import open_capture, to_gray
+import model_registry
+
+
+VIDEO_EXTENSIONS = (".mp4", ".avi", ".mov", ".mkv", ".m4v", ".webm", ".wmv")
+
+# One detector per worker process, created by init_worker. The landmark
+# model is preloaded in the parent and inherited by forked workers;
+# without fork, each worker loads it once, not once per video
+_detector = None
+_luma = False
+
+
+def collect_videos(paths, extensions=VIDEO_EXTENSIONS):
+    """
+    Expand files and directories into a sorted list of video files
+
+    Args:
+        paths: Video files and/or directories (searched recursively)
+        extensions: Accepted file extensions
+
+    Returns:
+        list: Video file paths
+    """
+    videos = []
+    for path in paths:
+        if os.path.isdir(path):
+            for root, _, files in os.walk(path):
+                videos.extend(os.path.join(root, name) for name in files
+                              if name.lower().endswith(extensions))
+        elif os.path.isfile(path):
+            videos.append(path)
+        else:
+            print(f"Skipping missing path: {path}")
+    return sorted(set(videos))
+
+
+def read_frames(cap):
+    """Yield frames from an open capture until the stream ends"""
+    while True:
+        ret, frame = cap.read()
+        if not ret:
+            return
+        yield frame
+
+
+def output_name(video_path, base_dirs):
+    """Build a unique CSV name for a video from its path relative to its input"""
+    video_path = os.path.abspath(video_path)
+    for base in base_dirs:
+        base = os.path.abspath(base)
+        if os.path.isdir(base) and video_path.startswith(base + os.sep):
+            video_path = os.path.relpath(video_path, base)
+            break
+    else:
+        video_path = os.path.basename(video_path)
+    stem = os.path.splitext(video_path)[0].replace(os.sep, "__")
+    return f"{stem}_blinks.csv"
+
+
+def init_worker(config, overrides):
+    """Create this worker's detector (runs once per process)"""
+    global _detector, _luma
+    _detector = EyeBlinkDetector.from_config(config, clock=ManualClock(), overlay=False, **overrides)
+    _luma = config.get('camera', {}).get('luma_capture', False)
+
+
+def process_video(video_path, csv_path):
+    """
+    Run blink detection over a whole video and export its results
+
+    Args:
+        video_path: Input video
+        csv_path: Output CSV; the summary is written next to it
+
+    Returns:
+        dict: Per-video result for the aggregate report
+    """
+    result = {'video': video_path, 'csv': csv_path, 'error': ''}
+    cap = open_capture(video_path, luma=_luma)
+    if not cap.isOpened():
+        result['error'] = "cannot open video"
+        return result
+
+    detector = _detector
+    detector.clock = VideoClock(cap)
+    detector.reset()
+
+    start = time.perf_counter()
+    frames = 0
+    face_frames = 0
+    drowsy_episodes = 0
+    was_drowsy = False
+    try:
+        for frame in read_frames(cap):
+            _, _, is_drowsy = detector.detect_blink(frame)
+            frames += 1
+            if detector.status != "No Face Detected":
+                face_frames += 1
+            if is_drowsy and not was_drowsy:
+                drowsy_episodes += 1
+            was_drowsy = is_drowsy
+    finally:
+        cap.release()
+    elapsed = time.perf_counter() - start
+
+    if frames == 0:
+        result['error'] = "no frames could be read"
+        return result
+
+    detector.export_data(csv_path)
+    stats = detector.get_stats()
+    result.update({
+        'frames': frames,
+        'face_frames': face_frames,
+        'duration_seconds': stats['session_duration'],
+        'total_blinks': stats['total_blinks'],
+        'avg_blink_rate': stats['avg_blink_rate'],
+        'drowsy_episodes': drowsy_episodes,
+        'processing_seconds': round(elapsed, 2),
+        'speed': round(stats['session_duration'] / elapsed, 2) if elapsed > 0 else 0.0
+    })
+    return result
+
+
+def plan_chunks(video_path, chunks, overlap):
+    """
+    Split a video into frame ranges for parallel measurement
+
+    Args:
+        video_path: Input video
+        chunks: Number of chunks
+        overlap: Warm-up seconds processed before each chunk but discarded
+
+    Returns:
+        list: (warm_start, start, end) frame indices; the last chunk's
+        end is None so it always runs to the end of the stream
+    """
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        raise RuntimeError("cannot open video")
+    frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+    cap.release()
+
+    chunks = max(1, min(chunks, frame_count // max(1, int(fps))))
+    size = frame_count // chunks if chunks > 1 else 0
+    warm = int(round(overlap * fps))
+    plan = []
+    for i in range(chunks):
+        start = i * size
+        end = start + size if i < chunks - 1 else None
+        plan.append((max(0, start - warm), start, end))
+    return plan
+
+
+def seek_frame(cap, index):
+    """
+    Position a capture so the next read returns frame `index`
+
+    Seeks land on keyframes and some codecs report or decode a nearby
+    frame instead, so the position is checked after seeking. When it
+    is off, the capture is placed at the start (or at the earlier frame
+    it landed on) and frames are decoded and discarded up to `index`.
+
+    Raises:
+        RuntimeError: If frame `index` cannot be reached
+    """
+    if index <= 0:
+        return
+    cap.set(cv2.CAP_PROP_POS_FRAMES, index)
+    landed = int(cap.get(cv2.CAP_PROP_POS_FRAMES))
+    if landed == index:
+        return
+    if not 0 <= landed < index:
+        cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+        landed = int(cap.get(cv2.CAP_PROP_POS_FRAMES))
+        if landed != 0:
+            raise RuntimeError(f"cannot seek to frame {index}")
+    for _ in range(index - landed):
+        if not cap.grab():
+            raise RuntimeError(f"video ended before frame {index}")
+    landed = int(cap.get(cv2.CAP_PROP_POS_FRAMES))
+    if landed != index:
+        raise RuntimeError(f"cannot seek to frame {index} (decoder is at frame {landed})")
+
+
+def measure_chunk(video_path, warm_start, start, end):
+    """
+    Measure faces and EAR for one chunk of a video
+
+    Frames are timestamped by the video's own clock. Frames from
+    `warm_start` are decoded and tracked so detection and tracking state
+    have settled by `start`; only frames in [start, end) are returned.
+    No blink state is kept here: blinks and drowsiness are decided when
+    the measurements of all chunks are replayed in order, so events
+    crossing a chunk boundary are neither split nor repeated.
+
+    Returns:
+        list: (frame_index, timestamp, rects, ears) per frame, with rects
+        as (left, top, right, bottom) tuples and ears as [left, right]
+        EAR pairs
+    """
+    cap = open_capture(video_path, luma=_luma)
+    if not cap.isOpened():
+        raise RuntimeError("cannot open video")
+    detector = _detector
+    measurements = []
+    try:
+        seek_frame(cap, warm_start)
+        detector.clock = VideoClock(cap)
+        detector.reset()
+        for index, frame in enumerate(read_frames(cap), warm_start):
+            if end is not None and index >= end:
+                break
+            timestamp = detector.clock.stamp()
+            tracks, _, ears = detector.measure_faces(to_gray(frame), timestamp)
+            if index < start:
+                continue
+            rects = [(t.rect.left(), t.rect.top(), t.rect.right(), t.rect.bottom()) for t in tracks]
+            measurements.append((index, timestamp, rects,
+                                 [] if ears is None else ears.tolist()))
+    finally:
+        cap.release()
+    return measurements
+
+
+def stitch_chunks(detector, video_path, csv_path, chunk_results, elapsed):
+    """
+    Replay chunk measurements in frame order and export the results
+
+    Args:
+        detector: Detector with a ManualClock whose blink state is
+            advanced by the replay
+        video_path: Input video
+        csv_path: Output CSV
+        chunk_results: Measurement lists from measure_chunk, in chunk order
+        elapsed: Wall time spent measuring, for the report
+
+    Returns:
+        dict: Per-video result for the aggregate report
+    """
+    detector.reset()
+    result = {'video': video_path, 'csv': csv_path, 'error': ''}
+
+    frames = 0
+    face_frames = 0
+    drowsy_episodes = 0
+    was_drowsy = False
+    next_index = 0
+    for measurements in chunk_results:
+        for index, timestamp, rects, ears in measurements:
+            if index != next_index:
+                result['error'] = f"chunk boundary mismatch at frame {next_index} (got {index})"
+                return result
+            next_index += 1
+            faces = [FaceBox(*rect) for rect in rects]
+            _, is_drowsy = detector.apply_measurements(faces, ears, timestamp)
+            frames += 1
+            if faces:
+                face_frames += 1
+            if is_drowsy and not was_drowsy:
+                drowsy_episodes += 1
+            was_drowsy = is_drowsy
+
+    if frames == 0:
+        result['error'] = "no frames could be read"
+        return result
+
+    detector.export_data(csv_path)
+    stats = detector.get_stats()
+    result.update({
+        'frames': frames,
+        'face_frames': face_frames,
+        'duration_seconds': stats['session_duration'],
+        'total_blinks': stats['total_blinks'],
+        'avg_blink_rate': stats['avg_blink_rate'],
+        'drowsy_episodes': drowsy_episodes,
+        'processing_seconds': round(elapsed, 2),
+        'speed': round(stats['session_duration'] / elapsed, 2) if elapsed > 0 else 0.0
+    })
+    return result
+
+
+def write_report(results, output_dir):
+    """
+    Write the aggregate report over all videos
+
+    Returns:
+        str: Path to the report CSV
+    """
+    fieldnames = ['video', 'frames', 'face_frames', 'duration_seconds', 'total_blinks',
+                  'avg_blink_rate', 'drowsy_episodes', 'processing_seconds', 'speed',
+                  'csv', 'error']
+    report_path = os.path.join(output_dir, "batch_report.csv")
+    with open(report_path, 'w', newline='') as csvfile:
+        writer = csv.DictWriter(csvfile, fieldnames=fieldnames, restval='')
+        writer.writeheader()
+        writer.writerows(sorted(results, key=lambda r: r['video']))
+
+    ok = [r for r in results if not r['error']]
+    duration = sum(r['duration_seconds'] for r in ok)
+    blinks = sum(r['total_blinks'] for r in ok)
+    summary_path = os.path.join(output_dir, "batch_report_summary.txt")
+    with open(summary_path, 'w') as f:
+        f.write("=== Eye Blink Batch Summary ===\n\n")
+        f.write(f"Videos Processed: {len(ok)}\n")
+        f.write(f"Videos Failed: {len(results) - len(ok)}\n")
+        f.write(f"Total Video Duration: {duration:.2f} seconds\n")
+        f.write(f"Total Blinks: {blinks}\n")
+        if duration > 0:
+            f.write(f"Average Blink Rate: {blinks / duration * 60:.2f} blinks/minute\n")
+        f.write(f"Drowsiness Episodes: {sum(r['drowsy_episodes'] for r in ok)}\n")
+
+    return report_path
+
+
+def print_result(done, total, result):
+    """Print one line of batch progress"""
+    if result['error']:
+        print(f"[{done}/{total}] ❌ {result['video']}: {result['error']}")
+    else:
+        print(f"[{done}/{total}] ✅ {result['video']}: {result['total_blinks']} blinks, "
+              f"{result['duration_seconds']:.0f}s of video at {result['speed']:.1f}x")
+
+
+def run_batch(videos, output_dir, config, overrides, workers):
+    """
+    Process videos across a pool of worker processes, one video per task
+
+    Returns:
+        list: One result dict per video
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    results = []
+    with ProcessPoolExecutor(max_workers=workers, mp_context=model_registry.fork_context(),
+                             initializer=init_worker, initargs=(config, overrides)) as pool:
+        futures = {}
+        for video, csv_name in videos:
+            csv_path = os.path.join(output_dir, csv_name)
+            futures[pool.submit(process_video, video, csv_path)] = video
+
+        for done, future in enumerate(as_completed(futures), 1):
+            video = futures[future]
+            try:
+                result = future.result()
+            except Exception as e:
+                result = {'video': video, 'error': str(e)}
+            results.append(result)
+            print_result(done, len(futures), result)
+    return results
+
+
+def run_chunked(videos, output_dir, config, overrides, workers, chunks, overlap):
+    """
+    Process videos across a pool of worker processes, splitting each
+    video into chunks that are measured in parallel
+
+    Chunks of all videos share the pool. When every chunk of a video is
+    done, its measurements are replayed in the main process, which is
+    cheap compared to face detection and landmark fitting.
+
+    Returns:
+        list: One result dict per video
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    replay = EyeBlinkDetector.from_config(config, clock=ManualClock(), **overrides)
+    results = []
+    with ProcessPoolExecutor(max_workers=workers, mp_context=model_registry.fork_context(),
+                             initializer=init_worker, initargs=(config, overrides)) as pool:
+        pending = {}
+        futures = {}
+        for video, csv_name in videos:
+            try:
+                plan = plan_chunks(video, chunks, overlap)
+            except RuntimeError as e:
+                results.append({'video': video, 'error': str(e)})
+                print_result(len(results), len(videos), results[-1])
+                continue
+            pending[video] = {'csv': os.path.join(output_dir, csv_name),
+                              'chunks': [None] * len(plan), 'left': len(plan),
+                              'start': time.perf_counter()}
+            for i, (warm_start, start, end) in enumerate(plan):
+                futures[pool.submit(measure_chunk, video, warm_start, start, end)] = (video, i)
+
+        for future in as_completed(futures):
+            video, i = futures[future]
+            job = pending.get(video)
+            if job is None:
+                continue
+            try:
+                job['chunks'][i] = future.result()
+            except Exception as e:
+                del pending[video]
+                results.append({'video': video, 'error': str(e)})
+                print_result(len(results), len(videos), results[-1])
+                continue
+            job['left'] -= 1
+            if job['left'] == 0:
+                del pending[video]
+                elapsed = time.perf_counter() - job['start']
+                results.append(stitch_chunks(replay, video, job['csv'], job['chunks'], elapsed))
+                print_result(len(results), len(videos), results[-1])
+    return results
+
+
+def verify_serial(results, config, overrides):
+    """
+    Re-run chunked videos serially and compare the blink logs
+
+    Returns:
+        bool: True if every video produced identical blink rows
+    """
+    init_worker(config, overrides)
+    all_match = True
+    for result in results:
+        if result['error']:
+            continue
+        with open(result['csv']) as f:
+            chunked = f.read()
+        serial_path = result['csv'].replace('.csv', '_serial.csv')
+        process_video(result['video'], serial_path)
+        with open(serial_path) as f:
+            serial = f.read()
+        match = chunked == serial
+        all_match = all_match and match
+        print(f"{'✅' if match else '❌'} {result['video']}: chunked and serial blink logs "
+              f"{'match' if match else 'differ'}")
+    return all_match
+
+
+def parse_args():
+    """Parse command-line options"""
+    parser = argparse.ArgumentParser(description="Batch blink analysis of recorded videos")
+    parser.add_argument("inputs", nargs="+",
+                        help="video files and/or directories of videos")
+    parser.add_argument("--output-dir", default="batch_results",
+                        help="directory for per-video CSVs and the report (default: batch_results)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(),
+                        help="number of worker processes (default: CPU count)")
+    parser.add_argument("--config", default="config.json",
+                        help="path to config file (default: config.json)")
+    parser.add_argument("--detect-interval", type=int, default=1,
+                        help="run the HOG face detector every N frames (default: 1)")
+    parser.add_argument("--detection-scale", type=float, default=None,
+                        help="downscale factor for face detection "
+                             "(default: advanced.face_detection_scale in config.json)")
+    parser.add_argument("--backend", choices=BACKENDS, default=None,
+                        help="landmark backend (default: advanced.landmark_backend "
+                             "in config.json, or dlib)")
+    parser.add_argument("--landmark-interval", type=int, default=None,
+                        help="fit full landmarks every N frames, eye ROIs in between "
+                             "(default: advanced.landmark_interval in config.json, or 1)")
+    parser.add_argument("--luma", action="store_true",
+                        help="decode only the luma plane and skip BGR conversion "
+                             "(default: camera.luma_capture in config.json)")
+    parser.add_argument("--chunks", type=int, default=1,
+                        help="split each video into N chunks processed in parallel "
+                             "(default: 1, one worker per video)")
+    parser.add_argument("--overlap", type=float, default=2.0,
+                        help="warm-up seconds decoded before each chunk (default: 2.0)")
+    parser.add_argument("--verify", action="store_true",
+                        help="with --chunks, also run each video serially and "
+                             "compare the blink logs")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+
+    print("=== Eye Blink Batch Processing ===")
+    videos = collect_videos(args.inputs)
+    if not videos:
+        print("No videos found")
+        return
+
+    overrides = {'detect_interval': args.detect_interval}
+    if args.detection_scale is not None:
+        overrides['detection_scale'] = args.detection_scale
+    if args.backend is not None:
+        overrides['backend'] = args.backend
+    if args.landmark_interval is not None:
+        overrides['landmark_interval'] = args.landmark_interval
+    config = load_config(args.config)
+    if args.luma:
+        config.setdefault('camera', {})['luma_capture'] = True
+    backend = overrides.get('backend', config.get('advanced', {}).get('landmark_backend', 'dlib'))
+    if args.chunks > 1 and backend == 'facemesh':
+        # FaceMesh tracks landmarks across frames, so a chunk starting
+        # mid-video would not reproduce a serial run
+        print("Error: --chunks is not supported with the facemesh backend")
+        return
+    if args.chunks > 1:
+        # Skipped frames depend on where decoding started, so chunked runs
+        # would no longer match a serial run; every frame is measured instead
+        intervals = {
+            'detect_interval': overrides['detect_interval'],
+            'landmark_interval': overrides.get(
+                'landmark_interval', config.get('advanced', {}).get('landmark_interval', 1)),
+        }
+        for name, value in intervals.items():
+            if value > 1:
+                print(f"⚠️  --chunks ignores {name}={value}; using 1")
+                overrides[name] = 1
+    jobs = [(video, output_name(video, args.inputs)) for video in videos]
+
+    start = time.perf_counter()
+    # FaceMesh keeps per-stream tracking state, so each worker creates its
+    # own; only the dlib predictor is preloaded and shared
+    if backend == 'dlib':
+        try:
+            model_registry.preload()
+        except RuntimeError as e:
+            print(f"Error loading facial landmark predictor: {e}")
+            return
+        model_registry.report()
+    if args.chunks > 1:
+        workers = max(1, args.workers)
+        print(f"Processing {len(videos)} video(s) in up to {args.chunks} chunks each "
+              f"with {workers} worker(s)...\n")
+        results = run_chunked(jobs, args.output_dir, config, overrides, workers,
+                              args.chunks, args.overlap)
+    else:
+        workers = max(1, min(args.workers, len(videos)))
+        print(f"Processing {len(videos)} video(s) with {workers} worker(s)...\n")
+        results = run_batch(jobs, args.output_dir, config, overrides, workers)
+    report_path = write_report(results, args.output_dir)
+
+    print(f"\nDone in {time.perf_counter() - start:.1f}s")
+    print(f"Report saved to: {report_path}")
+
+    if args.chunks > 1 and args.verify:
+        print("\nVerifying against serial runs...")
+        verify_serial(results, config, overrides)
+
+
+if __name__ == "__main__":
+    main()
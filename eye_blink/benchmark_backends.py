@@ -0,0 +1,145 @@
+"""
+Landmark Backend Benchmark
+Compares throughput and EAR agreement of the dlib and FaceMesh backends
+"""
+
+import argparse
+import time
+
+import cv2
+import numpy as np
+
+from blink_detector import EyeBlinkDetector, load_config
+from blink_state import BlinkParams, replay_trace
+from clocks import ManualClock
+from landmark_backends import BACKENDS
+
+
+def measure_frame(detector, gray, timestamp):
+    """
+    Measure the faces of one frame with a detector's backend
+
+    Returns:
+        tuple: (seconds, ear) where ear is the mean EAR of the largest
+        face, or None if no face was found
+    """
+    start = time.perf_counter()
+    tracks, _, ears = detector.measure_faces(gray, timestamp)
+    elapsed = time.perf_counter() - start
+
+    if not tracks:
+        return elapsed, None
+    primary = max(range(len(tracks)), key=lambda i: tracks[i].rect.area())
+    return elapsed, float(ears[primary].mean())
+
+
+def run_benchmark(source, backends, max_frames, ear_threshold, config):
+    """
+    Run every backend over the same frames and compare against the first
+
+    Each backend gets its own detector, so tracking state carries over
+    from frame to frame exactly as in live use.
+
+    Returns:
+        tuple: (frames, results) with one result dict per backend
+    """
+    detectors = {name: EyeBlinkDetector.from_config(config, backend=name, clock=ManualClock(),
+                                                    ear_threshold=ear_threshold, overlay=False)
+                 for name in backends}
+    cap = cv2.VideoCapture(source)
+    if not cap.isOpened():
+        raise RuntimeError(f"Cannot open video source: {source}")
+    fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+
+    times = {name: [] for name in backends}
+    ears = {name: [] for name in backends}
+
+    frames = 0
+    while frames < max_frames:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        for name, detector in detectors.items():
+            elapsed, ear = measure_frame(detector, gray, frames / fps)
+            times[name].append(elapsed)
+            ears[name].append(np.nan if ear is None else ear)
+        frames += 1
+    cap.release()
+    for detector in detectors.values():
+        detector.backend.close()
+
+    if frames == 0:
+        raise RuntimeError("No frames could be read from the video source")
+
+    # The first frames include model warm-up; leave them out of the timing
+    warmup = min(10, frames // 10)
+    timestamps = np.arange(frames) / fps
+    params = BlinkParams(ear_threshold)
+    base = backends[0]
+    base_time = np.mean(times[base][warmup:])
+    base_ear = np.array(ears[base])
+    results = []
+    for name in backends:
+        ear = np.array(ears[name])
+        both = ~np.isnan(base_ear) & ~np.isnan(ear)
+        diff = ear[both] - base_ear[both]
+        baseline_faces = max(int((~np.isnan(base_ear)).sum()), 1)
+        found = ~np.isnan(ear)
+        blinks = replay_trace(timestamps[found], ear[found], ear[found], params)['blinks']
+        results.append({
+            'backend': name,
+            'frame_ms': np.mean(times[name][warmup:]) * 1000,
+            'speedup': base_time / np.mean(times[name][warmup:]),
+            'face_recall': both.sum() / baseline_faces,
+            'mean_ear': np.nanmean(ear) if found.any() else float('nan'),
+            'mean_ear_diff': np.abs(diff).mean() if diff.size else float('nan'),
+            'ear_offset': diff.mean() if diff.size else float('nan'),
+            'ear_correlation': (np.corrcoef(ear[both], base_ear[both])[0, 1]
+                                if both.sum() > 1 else float('nan')),
+            'state_agreement': (np.mean((ear[both] < ear_threshold) == (base_ear[both] < ear_threshold))
+                                if both.any() else float('nan')),
+            'blinks': len(blinks),
+        })
+    return frames, results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark landmark backends")
+    parser.add_argument("--source", default="0",
+                        help="video file path or camera index (default: 0)")
+    parser.add_argument("--backends", nargs="+", choices=BACKENDS, default=list(BACKENDS),
+                        help="backends to compare; the first is the reference "
+                             "(default: dlib facemesh)")
+    parser.add_argument("--frames", type=int, default=300,
+                        help="number of frames to process (default: 300)")
+    parser.add_argument("--ear-threshold", type=float, default=0.25,
+                        help="threshold used for open/closed agreement and blink "
+                             "counts (default: 0.25)")
+    parser.add_argument("--config", default="config.json",
+                        help="path to config file (default: config.json)")
+    args = parser.parse_args()
+
+    source = int(args.source) if args.source.isdigit() else args.source
+    backends = list(dict.fromkeys(args.backends))
+
+    print("=== Landmark Backend Benchmark ===")
+    try:
+        frames, results = run_benchmark(source, backends, args.frames, args.ear_threshold,
+                                        load_config(args.config))
+    except RuntimeError as e:
+        print(f"\nError: {e}")
+        return
+
+    print(f"Frames: {frames} (reference: {backends[0]})\n")
+    print(f"{'backend':>9} {'frame ms':>9} {'fps':>6} {'speedup':>8} {'recall':>7} "
+          f"{'mean EAR':>9} {'mean dEAR':>10} {'offset':>7} {'corr':>6} {'agree':>6} {'blinks':>6}")
+    for r in results:
+        print(f"{r['backend']:>9} {r['frame_ms']:>9.2f} {1000 / r['frame_ms']:>6.1f} "
+              f"{r['speedup']:>7.2f}x {r['face_recall']:>7.1%} {r['mean_ear']:>9.3f} "
+              f"{r['mean_ear_diff']:>10.4f} {r['ear_offset']:>+7.3f} {r['ear_correlation']:>6.3f} "
+              f"{r['state_agreement']:>6.1%} {r['blinks']:>6}")
+
+
+if __name__ == "__main__":
+    main()
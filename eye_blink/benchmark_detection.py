@@ -0,0 +1,120 @@
+"""
+Face Detection Scale Benchmark
+Measures HOG detection time and EAR agreement across detection scales
+"""
+
+import argparse
+import time
+
+import cv2
+import numpy as np
+
+from blink_detector import EyeBlinkDetector
+from eye_metrics import eye_aspect_ratios
+
+
+def measure_frame(detector, gray, scale):
+    """
+    Detect faces at one scale and fit landmarks at full resolution
+
+    Returns:
+        tuple: (detect_seconds, ear) where ear is the mean EAR of the
+        largest face, or None if no face was found
+    """
+    detector.detection_scale = scale
+    start = time.perf_counter()
+    faces = detector.detect_faces(gray)
+    elapsed = time.perf_counter() - start
+
+    if not faces:
+        return elapsed, None
+    face = max(faces, key=lambda rect: rect.area())
+    points = detector.backend.fit(gray, [face])[0]
+    return elapsed, float(eye_aspect_ratios(points).mean())
+
+
+def run_benchmark(source, scales, max_frames, ear_threshold):
+    """
+    Run every scale over the same frames and compare against scale 1.0
+
+    Returns:
+        list: One result dict per scale
+    """
+    detector = EyeBlinkDetector(ear_threshold=ear_threshold)
+    cap = cv2.VideoCapture(source)
+    if not cap.isOpened():
+        raise RuntimeError(f"Cannot open video source: {source}")
+
+    scales = sorted(set(scales) | {1.0}, reverse=True)
+    times = {scale: [] for scale in scales}
+    ears = {scale: [] for scale in scales}
+
+    frames = 0
+    while frames < max_frames:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        for scale in scales:
+            elapsed, ear = measure_frame(detector, gray, scale)
+            times[scale].append(elapsed)
+            ears[scale].append(np.nan if ear is None else ear)
+        frames += 1
+    cap.release()
+
+    if frames == 0:
+        raise RuntimeError("No frames could be read from the video source")
+
+    base_time = np.mean(times[1.0])
+    base_ear = np.array(ears[1.0])
+    results = []
+    for scale in scales:
+        ear = np.array(ears[scale])
+        both = ~np.isnan(base_ear) & ~np.isnan(ear)
+        diff = np.abs(ear[both] - base_ear[both])
+        baseline_faces = max(int((~np.isnan(base_ear)).sum()), 1)
+        results.append({
+            'scale': scale,
+            'detect_ms': np.mean(times[scale]) * 1000,
+            'speedup': base_time / np.mean(times[scale]),
+            'face_recall': both.sum() / baseline_faces,
+            'mean_ear_diff': diff.mean() if diff.size else float('nan'),
+            'max_ear_diff': diff.max() if diff.size else float('nan'),
+            'state_agreement': (np.mean((ear[both] < ear_threshold) == (base_ear[both] < ear_threshold))
+                                if both.any() else float('nan')),
+        })
+    return frames, results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark face detection scales")
+    parser.add_argument("--source", default="0",
+                        help="video file path or camera index (default: 0)")
+    parser.add_argument("--scales", type=float, nargs="+", default=[1.0, 0.75, 0.5, 0.35],
+                        help="detection scales to compare (default: 1.0 0.75 0.5 0.35)")
+    parser.add_argument("--frames", type=int, default=300,
+                        help="number of frames to process (default: 300)")
+    parser.add_argument("--ear-threshold", type=float, default=0.25,
+                        help="threshold used for open/closed agreement (default: 0.25)")
+    args = parser.parse_args()
+
+    source = int(args.source) if args.source.isdigit() else args.source
+
+    print("=== Face Detection Scale Benchmark ===")
+    try:
+        frames, results = run_benchmark(source, args.scales, args.frames, args.ear_threshold)
+    except RuntimeError as e:
+        print(f"\nError: {e}")
+        return
+
+    print(f"Frames: {frames}\n")
+    print(f"{'scale':>6} {'detect ms':>10} {'speedup':>8} {'recall':>7} "
+          f"{'mean dEAR':>10} {'max dEAR':>9} {'agree':>6}")
+    for r in results:
+        print(f"{r['scale']:>6.2f} {r['detect_ms']:>10.2f} {r['speedup']:>7.2f}x "
+              f"{r['face_recall']:>7.1%} {r['mean_ear_diff']:>10.4f} "
+              f"{r['max_ear_diff']:>9.4f} {r['state_agreement']:>6.1%}")
+
+
+if __name__ == "__main__":
+    main()
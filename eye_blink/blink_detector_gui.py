@@ -5,33 +5,40 @@ Modern interface with real-time video, statistics, and controls
 
 import tkinter as tk
 from tkinter import ttk, messagebox, filedialog
-import cv2
+import argparse
 from PIL import Image, ImageTk
 import threading
 from blink_detector import EyeBlinkDetector
+from startup import lazy_import, run_in_background, StartupProfiler
 import time
 from datetime import datetime
 
+cv2 = lazy_import("cv2")
+
 
 class BlinkDetectorGUI:
     """
     Professional GUI for Eye Blink Detection System
     """
     
-    def __init__(self, root):
-        """Initialize the GUI application"""
+    def __init__(self, root, profiler=None):
+        """
+        Initialize the GUI application
+        
+        Args:
+            root: Tk root window
+            profiler: StartupProfiler recording the startup phases
+        """
         self.root = root
         self.root.title("Eye Blink Detection System")
         self.root.geometry("1200x700")
         self.root.configure(bg='#1e1e1e')
+        self.profiler = profiler or StartupProfiler(enabled=False)
         
-        # Initialize detector
-        try:
-            self.detector = EyeBlinkDetector()
-        except RuntimeError as e:
-            messagebox.showerror("Error", str(e))
-            self.root.quit()
-            return
+        # The detector loads in the background while the window is built;
+        # the controls that need it are enabled once it is ready
+        self.detector = None
+        self.loading = run_in_background(self._build_detector)
         
         # Video capture
         self.cap = None
@@ -42,11 +49,42 @@ class BlinkDetectorGUI:
         self.drowsiness_alert_shown = False
         
         # Setup GUI
-        self.setup_gui()
+        with self.profiler.phase('window'):
+            self.setup_gui()
+        for button in (self.start_button, self.reset_button, self.export_button):
+            button.config(state=tk.DISABLED)
+        self.status_label.config(text="Loading face model...", fg='#ffaa00')
+        self.root.after(50, self.check_detector)
         
         # Bind close event
         self.root.protocol("WM_DELETE_WINDOW", self.on_closing)
     
+    def _build_detector(self):
+        with self.profiler.phase('detector'):
+            return EyeBlinkDetector()
+    
+    def check_detector(self):
+        """Enable the controls once the background detector load finishes"""
+        if not self.loading.done():
+            self.root.after(50, self.check_detector)
+            return
+        
+        try:
+            self.detector = self.loading.result()
+        except RuntimeError as e:
+            messagebox.showerror("Error", str(e))
+            self.root.quit()
+            return
+        
+        # Apply settings changed while the model was loading
+        self.update_ear_threshold(self.ear_threshold_var.get())
+        self.update_consec_frames(self.consec_frames_var.get())
+        self.update_drowsiness_threshold(self.drowsiness_var.get())
+        
+        for button in (self.start_button, self.reset_button, self.export_button):
+            button.config(state=tk.NORMAL)
+        self.status_label.config(text="Ready to start detection", fg='#aaaaaa')
+    
     def setup_gui(self):
         """Setup all GUI components"""
         # Title
@@ -315,15 +353,18 @@ class BlinkDetectorGUI:
     
     def update_ear_threshold(self, value):
         """Update EAR threshold"""
-        self.detector.ear_threshold = float(value)
+        if self.detector is not None:
+            self.detector.ear_threshold = float(value)
     
     def update_consec_frames(self, value):
         """Update consecutive frames threshold"""
-        self.detector.consec_frames = int(value)
+        if self.detector is not None:
+            self.detector.consec_frames = int(value)
     
     def update_drowsiness_threshold(self, value):
         """Update drowsiness threshold"""
-        self.detector.drowsiness_threshold = float(value)
+        if self.detector is not None:
+            self.detector.drowsiness_threshold = float(value)
     
     def start_detection(self):
         """Start the detection process"""
@@ -382,6 +423,7 @@ class BlinkDetectorGUI:
             # Update video display
             self.video_display.config(image=photo)
             self.video_display.image = photo
+            self.profiler.report()
             
             time.sleep(0.03)  # ~30 FPS
     
@@ -435,7 +477,8 @@ class BlinkDetectorGUI:
                 filepath = self.detector.export_data(filename)
                 messagebox.showinfo(
                     "Export Successful",
-                    f"Data exported successfully!\n\nFiles created:\n- {filename}\n- {filename.replace('.csv', '_summary.txt')}"
+                    f"Data exported successfully!\n\nFiles created:\n- {filename}\n- {filename.replace('.csv', '_minutes.csv')}\n"
+                    f"- {filename.replace('.csv', '_summary.txt')}"
                 )
                 self.status_label.config(text=f"Data exported to {filename}", fg='#00ff00')
             except Exception as e:
@@ -453,8 +496,13 @@ class BlinkDetectorGUI:
 
 def main():
     """Main entry point for GUI application"""
+    parser = argparse.ArgumentParser(description="Eye Blink Detection System GUI")
+    parser.add_argument("--profile-startup", action="store_true",
+                        help="print a per-phase import and initialization breakdown")
+    args = parser.parse_args()
+    
     root = tk.Tk()
-    app = BlinkDetectorGUI(root)
+    app = BlinkDetectorGUI(root, StartupProfiler(args.profile_startup))
     root.mainloop()
 
 
@@ -4,235 +4,27 @@ Beautiful, responsive interface with real-time feedback
 No external GUI dependencies - uses OpenCV only
 """
 
-import cv2
-import dlib
-import numpy as np
-from scipy.spatial import distance
-from collections import deque
+import argparse
 import time
-import csv
-from datetime import datetime
-import os
 
+from detection_core import BlinkDetector
+from clocks import CaptureClock
+from startup import lazy_import, run_in_background, StartupProfiler
 
-class ModernBlinkDetector:
+cv2 = lazy_import("cv2")
+np = lazy_import("numpy")
+
+
+class ModernBlinkDetector(BlinkDetector):
     """
     Modern Eye Blink Detection with Optimized Response Time
-    """
-    
-    LEFT_EYE_INDICES = list(range(36, 42))
-    RIGHT_EYE_INDICES = list(range(42, 48))
-    
-    def __init__(self, 
-                 ear_threshold=0.25, 
-                 consec_frames=2,  # Reduced from 3 for faster response
-                 drowsiness_threshold=1.5,
-                 predictor_path="shape_predictor_68_face_landmarks.dat"):
-        
-        self.ear_threshold = ear_threshold
-        self.consec_frames = consec_frames
-        self.drowsiness_threshold = drowsiness_threshold
-        
-        # Initialize dlib
-        try:
-            self.detector = dlib.get_frontal_face_detector()
-            self.predictor = dlib.shape_predictor(predictor_path)
-        except RuntimeError as e:
-            raise RuntimeError(
-                f"Error loading facial landmark predictor: {e}\n"
-                f"Please run: ./setup.sh"
-            )
-        
-        # Tracking variables
-        self.total_blinks = 0
-        self.frame_counter = 0
-        self.eyes_closed_start = None
-        self.is_drowsy = False
-        
-        # Blink rate tracking
-        self.blink_times = deque(maxlen=100)
-        self.session_start_time = time.time()
-        
-        # Data logging
-        self.blink_data = []
-        
-        # Status
-        self.current_ear = 0.0
-        self.status = "Ready"
-        self.last_blink_time = 0
-        
-        # Smoothing for EAR
-        self.ear_history = deque(maxlen=3)
-        
-    def calculate_ear(self, eye_landmarks):
-        """Calculate Eye Aspect Ratio with improved accuracy"""
-        A = distance.euclidean(eye_landmarks[1], eye_landmarks[5])
-        B = distance.euclidean(eye_landmarks[2], eye_landmarks[4])
-        C = distance.euclidean(eye_landmarks[0], eye_landmarks[3])
-        ear = (A + B) / (2.0 * C)
-        return ear
     
-    def get_eye_landmarks(self, landmarks, eye_indices):
-        """Extract eye landmark coordinates"""
-        return np.array([(landmarks.part(i).x, landmarks.part(i).y) 
-                        for i in eye_indices])
-    
-    def detect_blink(self, frame):
-        """
-        Optimized blink detection with reduced lag
-        """
-        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-        faces = self.detector(gray, 0)
-        
-        blink_detected = False
-        
-        if len(faces) == 0:
-            self.status = "No Face"
-            return frame, False, False
-        
-        for face in faces:
-            landmarks = self.predictor(gray, face)
-            
-            # Get eye landmarks
-            left_eye = self.get_eye_landmarks(landmarks, self.LEFT_EYE_INDICES)
-            right_eye = self.get_eye_landmarks(landmarks, self.RIGHT_EYE_INDICES)
-            
-            # Calculate EAR
-            left_ear = self.calculate_ear(left_eye)
-            right_ear = self.calculate_ear(right_eye)
-            current_ear = (left_ear + right_ear) / 2.0
-            
-            # Smooth EAR to reduce noise
-            self.ear_history.append(current_ear)
-            self.current_ear = sum(self.ear_history) / len(self.ear_history)
-            
-            # Draw eye contours with glow effect
-            self.draw_eye_with_glow(frame, left_eye, self.current_ear < self.ear_threshold)
-            self.draw_eye_with_glow(frame, right_eye, self.current_ear < self.ear_threshold)
-            
-            # Blink detection with optimized logic
-            if self.current_ear < self.ear_threshold:
-                self.frame_counter += 1
-                self.status = "Closed"
-                
-                # Drowsiness tracking
-                if self.eyes_closed_start is None:
-                    self.eyes_closed_start = time.time()
-                elif time.time() - self.eyes_closed_start > self.drowsiness_threshold:
-                    self.is_drowsy = True
-                    self.status = "Drowsy!"
-            else:
-                # Eyes opened - check for blink
-                if self.frame_counter >= self.consec_frames:
-                    # Prevent double counting (minimum 150ms between blinks)
-                    current_time = time.time()
-                    if current_time - self.last_blink_time > 0.15:
-                        self.total_blinks += 1
-                        blink_detected = True
-                        self.last_blink_time = current_time
-                        self.blink_times.append(current_time)
-                        
-                        # Log blink
-                        self.blink_data.append({
-                            'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S.%f')[:-3],
-                            'blink_number': self.total_blinks,
-                            'ear_value': round(self.current_ear, 3),
-                            'duration_frames': self.frame_counter
-                        })
-                
-                self.frame_counter = 0
-                self.eyes_closed_start = None
-                self.is_drowsy = False
-                self.status = "Open"
-        
-        return frame, blink_detected, self.is_drowsy
-    
-    def draw_eye_with_glow(self, frame, eye, is_closed):
-        """Draw eye with glowing effect"""
-        eye_hull = cv2.convexHull(eye)
-        
-        # Glow effect
-        if is_closed:
-            color = (0, 100, 255)  # Orange glow when closed
-            cv2.drawContours(frame, [eye_hull], -1, color, 3)
-        else:
-            color = (0, 255, 100)  # Green glow when open
-            cv2.drawContours(frame, [eye_hull], -1, color, 2)
-        
-        # Inner highlight
-        cv2.drawContours(frame, [eye_hull], -1, (255, 255, 255), 1)
-    
-    def get_blink_rate(self):
-        """Calculate blinks per minute"""
-        if len(self.blink_times) < 2:
-            return 0.0
-        
-        current_time = time.time()
-        recent_blinks = [t for t in self.blink_times if current_time - t <= 60]
-        
-        if len(recent_blinks) < 2:
-            return 0.0
-        
-        time_span = current_time - recent_blinks[0]
-        if time_span > 0:
-            return (len(recent_blinks) / time_span) * 60
-        return 0.0
-    
-    def get_average_blink_rate(self):
-        """Calculate average blinks per minute"""
-        elapsed_time = time.time() - self.session_start_time
-        if elapsed_time > 0:
-            return (self.total_blinks / elapsed_time) * 60
-        return 0.0
-    
-    def export_data(self, filename=None):
-        """Export blink data to CSV"""
-        if filename is None:
-            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-            filename = f'blink_data_{timestamp}.csv'
-        
-        filepath = os.path.join(os.getcwd(), filename)
-        
-        with open(filepath, 'w', newline='') as csvfile:
-            if self.blink_data:
-                fieldnames = self.blink_data[0].keys()
-                writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-                writer.writeheader()
-                writer.writerows(self.blink_data)
-        
-        # Summary
-        summary_file = filepath.replace('.csv', '_summary.txt')
-        with open(summary_file, 'w') as f:
-            f.write("=== Eye Blink Detection Session Summary ===\n\n")
-            f.write(f"Total Blinks: {self.total_blinks}\n")
-            f.write(f"Session Duration: {time.time() - self.session_start_time:.2f} seconds\n")
-            f.write(f"Average Blink Rate: {self.get_average_blink_rate():.2f} blinks/minute\n")
-            f.write(f"Current Blink Rate: {self.get_blink_rate():.2f} blinks/minute\n")
-        
-        return filepath
-    
-    def reset(self):
-        """Reset all counters"""
-        self.total_blinks = 0
-        self.frame_counter = 0
-        self.blink_times.clear()
-        self.blink_data.clear()
-        self.session_start_time = time.time()
-        self.is_drowsy = False
-        self.status = "Ready"
-        self.last_blink_time = 0
+    The modern configuration of the detection core: 3-sample EAR
+    smoothing, 2-frame blinks, a 150ms refractory period and glowing
+    eye contours.
+    """
     
-    def get_stats(self):
-        """Get current statistics"""
-        return {
-            'total_blinks': self.total_blinks,
-            'current_ear': round(self.current_ear, 3),
-            'status': self.status,
-            'blink_rate': round(self.get_blink_rate(), 2),
-            'avg_blink_rate': round(self.get_average_blink_rate(), 2),
-            'is_drowsy': self.is_drowsy,
-            'session_duration': round(time.time() - self.session_start_time, 2)
-        }
+    default_mode = "modern"
 
 
 class ModernGUI:
@@ -240,9 +32,17 @@ class ModernGUI:
     Beautiful modern GUI using OpenCV only
     """
     
-    def __init__(self):
-        self.detector = ModernBlinkDetector()
-        self.cap = cv2.VideoCapture(0)
+    def __init__(self, profiler=None):
+        """
+        Args:
+            profiler: StartupProfiler recording the startup phases
+        """
+        self.profiler = profiler or StartupProfiler(enabled=False)
+        
+        # Load the landmark model while the camera and window come up
+        loading = run_in_background(self._build_detector)
+        with self.profiler.phase('camera'):
+            self.cap = cv2.VideoCapture(0)
         
         if not self.cap.isOpened():
             raise RuntimeError("Cannot access webcam")
@@ -261,13 +61,32 @@ class ModernGUI:
         
         # Window name
         self.window_name = "Eye Blink Detection - Modern Interface"
-        cv2.namedWindow(self.window_name, cv2.WINDOW_NORMAL)
-        cv2.resizeWindow(self.window_name, self.width, self.height)
+        with self.profiler.phase('window'):
+            cv2.namedWindow(self.window_name, cv2.WINDOW_NORMAL)
+            cv2.resizeWindow(self.window_name, self.width, self.height)
         
         # Animation
         self.pulse = 0
         self.last_blink_anim = 0
         
+        with self.profiler.phase('wait for detector'):
+            self.detector = self._wait_for(loading)
+        self.detector.clock = CaptureClock(self.cap)
+        
+    def _build_detector(self):
+        with self.profiler.phase('detector'):
+            return ModernBlinkDetector()
+    
+    def _wait_for(self, loading):
+        """Show a loading screen until the detector is built"""
+        screen = np.full((self.height, self.width, 3), self.bg_color, dtype=np.uint8)
+        cv2.putText(screen, "Loading face model...", (self.width // 2 - 190, self.height // 2),
+                   cv2.FONT_HERSHEY_SIMPLEX, 1.0, self.text_color, 2)
+        while not loading.done():
+            cv2.imshow(self.window_name, screen)
+            cv2.waitKey(30)
+        return loading.result()
+    
     def draw_rounded_rect(self, img, pt1, pt2, color, thickness, radius=15):
         """Draw rounded rectangle"""
         x1, y1 = pt1
@@ -503,6 +322,7 @@ class ModernGUI:
             
             # Show frame
             cv2.imshow(self.window_name, gui_frame)
+            self.profiler.report()
             
             # Handle keys
             key = cv2.waitKey(1) & 0xFF
@@ -537,10 +357,19 @@ class ModernGUI:
         print("\nThank you for using Eye Blink Detection System!")
 
 
+def parse_args():
+    """Parse command-line options"""
+    parser = argparse.ArgumentParser(description="Modern Eye Blink Detection System")
+    parser.add_argument("--profile-startup", action="store_true",
+                        help="print a per-phase import and initialization breakdown")
+    return parser.parse_args()
+
+
 def main():
     """Main entry point"""
+    args = parse_args()
     try:
-        gui = ModernGUI()
+        gui = ModernGUI(StartupProfiler(args.profile_startup))
         gui.run()
     except RuntimeError as e:
         print(f"\nError: {e}")
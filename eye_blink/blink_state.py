@@ -0,0 +1,197 @@
+"""
+Blink state machine
+Turns a stream of (timestamp, left_ear, right_ear) samples into blink
+events and drowsiness state, independent of how the EAR was measured.
+Shared by EyeBlinkDetector, ModernBlinkDetector and the trace replay
+tool; `replay_trace` is a vectorized equivalent for whole traces.
+"""
+
+from collections import deque, namedtuple
+
+from startup import lazy_import
+
+np = lazy_import("numpy")
+
+
+# duration: seconds from the first closed sample to the sample that
+# reopened the eyes
+BlinkEvent = namedtuple("BlinkEvent", ["timestamp", "ear", "duration_frames", "duration"])
+
+
+class BlinkParams:
+    """
+    Tunable blink settings
+
+    Detectors pass themselves as params, so settings changed at runtime
+    take effect on the next sample.
+    """
+
+    def __init__(self, ear_threshold=0.25, consec_frames=3, drowsiness_threshold=1.5):
+        self.ear_threshold = ear_threshold
+        self.consec_frames = consec_frames
+        self.drowsiness_threshold = drowsiness_threshold
+
+
+class BlinkStateMachine:
+    """
+    Blink and drowsiness state of one pair of eyes
+
+    A blink is counted when the eyes open after being closed (EAR below
+    `ear_threshold`) for at least `consec_frames` samples. Eyes closed
+    for more than `drowsiness_threshold` seconds raise drowsiness until
+    they open again.
+    """
+
+    def __init__(self, params, refractory=0.0, smoothing=1):
+        """
+        Args:
+            params: Object with ear_threshold, consec_frames and
+                drowsiness_threshold attributes (e.g. BlinkParams)
+            refractory: Minimum seconds between counted blinks
+                (0 disables the check)
+            smoothing: Number of samples in the EAR moving average
+                (1 disables smoothing)
+        """
+        self.params = params
+        self.refractory = refractory
+        self.ear_history = deque(maxlen=max(1, int(smoothing)))
+        self.reset()
+
+    def reset(self):
+        """Clear all state"""
+        self.total_blinks = 0
+        self.frame_counter = 0
+        self.eyes_closed_start = None
+        self.is_drowsy = False
+        self.closed = False
+        self.current_ear = 0.0
+        self.last_blink_time = None
+        self.ear_history.clear()
+
+    def update(self, timestamp, left_ear, right_ear):
+        """
+        Advance the state with one sample
+
+        Args:
+            timestamp: Sample time in seconds
+            left_ear: Left eye EAR
+            right_ear: Right eye EAR
+
+        Returns:
+            BlinkEvent: The blink completed by this sample, or None
+        """
+        return self.update_ear(timestamp, (left_ear + right_ear) / 2.0)
+
+    def update_ear(self, timestamp, ear):
+        """Advance the state with one sample of the mean EAR of both eyes"""
+        if self.ear_history.maxlen > 1:
+            self.ear_history.append(ear)
+            ear = sum(self.ear_history) / len(self.ear_history)
+        self.current_ear = ear
+        params = self.params
+
+        if ear < params.ear_threshold:
+            self.frame_counter += 1
+            self.closed = True
+
+            # Track drowsiness
+            if self.eyes_closed_start is None:
+                self.eyes_closed_start = timestamp
+            elif timestamp - self.eyes_closed_start > params.drowsiness_threshold:
+                self.is_drowsy = True
+            return None
+
+        # Eyes opened
+        event = None
+        if self.frame_counter >= params.consec_frames and (
+                self.refractory <= 0 or self.last_blink_time is None
+                or timestamp - self.last_blink_time > self.refractory):
+            self.total_blinks += 1
+            self.last_blink_time = timestamp
+            event = BlinkEvent(timestamp, ear, self.frame_counter,
+                               timestamp - self.eyes_closed_start)
+
+        self.frame_counter = 0
+        self.eyes_closed_start = None
+        self.is_drowsy = False
+        self.closed = False
+        return event
+
+
+def smoothed_ear(ears, window):
+    """
+    Moving average of the last `window` samples, matching BlinkStateMachine
+
+    Samples are summed oldest first, exactly like the state machine's
+    history, so both produce bit-identical values.
+    """
+    ears = np.asarray(ears, dtype=np.float64)
+    if window <= 1:
+        return ears
+    total = np.zeros_like(ears)
+    for lag in range(window - 1, -1, -1):
+        total[lag:] += ears[:len(ears) - lag]
+    counts = np.minimum(np.arange(1, len(ears) + 1), window)
+    return total / counts
+
+
+def replay_trace(timestamps, left_ears, right_ears, params, refractory=0.0, smoothing=1):
+    """
+    Run a whole EAR trace through the blink logic with array operations
+
+    Produces the same events as feeding every sample to a fresh
+    BlinkStateMachine, at a small fraction of the cost.
+
+    Args:
+        timestamps: (N,) sample times in seconds, increasing
+        left_ears: (N,) left eye EAR
+        right_ears: (N,) right eye EAR
+        params: Blink settings (see BlinkStateMachine)
+        refractory: Minimum seconds between counted blinks
+        smoothing: EAR moving average length
+
+    Returns:
+        dict: 'blinks' (list of BlinkEvent) and 'drowsy_starts'
+        (timestamps at which drowsiness was raised)
+    """
+    t = np.asarray(timestamps, dtype=np.float64)
+    ear = smoothed_ear((np.asarray(left_ears, dtype=np.float64)
+                        + np.asarray(right_ears, dtype=np.float64)) / 2.0, smoothing)
+    n = len(ear)
+    if n == 0:
+        return {'blinks': [], 'drowsy_starts': []}
+
+    # Runs of closed samples: [starts[i], ends[i]); ends == n if still closed
+    closed = ear < params.ear_threshold
+    edges = np.diff(closed.astype(np.int8), prepend=0, append=0)
+    starts = np.flatnonzero(edges == 1)
+    ends = np.flatnonzero(edges == -1)
+    lengths = ends - starts
+
+    # Blinks complete on the first open sample after a long enough run
+    candidates = np.flatnonzero((ends < n) & (lengths >= params.consec_frames))
+    blinks = []
+    last_time = None
+    for run in candidates:
+        index = ends[run]
+        if refractory > 0 and last_time is not None and t[index] - last_time <= refractory:
+            continue
+        last_time = t[index]
+        blinks.append(BlinkEvent(float(t[index]), float(ear[index]), int(lengths[run]),
+                                 float(t[index] - t[starts[run]])))
+
+    # Drowsiness is raised on the first closed sample more than the
+    # threshold after the run started. The search is per run, not per
+    # sample; the final comparison mirrors the state machine so rounding
+    # in t + threshold cannot move the result by a sample.
+    threshold = params.drowsiness_threshold
+    raise_at = np.searchsorted(t, t[starts] + threshold, side='right')
+    drowsy_starts = []
+    for start, end, index in zip(starts, ends, raise_at):
+        index = max(index - 1, start + 1)
+        while index < end and not t[index] - t[start] > threshold:
+            index += 1
+        if index < end:
+            drowsy_starts.append(float(t[index]))
+
+    return {'blinks': blinks, 'drowsy_starts': drowsy_starts}
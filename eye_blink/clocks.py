@@ -0,0 +1,157 @@
+"""
+Frame clocks for the blink detectors
+A clock stamps each processed frame with a time in seconds. Blink times,
+rates, drowsiness timing and session duration are all measured on that
+timeline, so results stay correct when frames are processed faster or
+slower than real time.
+"""
+
+import time
+
+from startup import lazy_import
+
+cv2 = lazy_import("cv2")
+
+
+class Clock:
+    """
+    Base frame clock
+
+    `stamp()` is called once per processed frame and returns its time;
+    `now()` is the time used for queries such as the current blink rate.
+    Non-realtime clocks answer queries with the latest frame time, so
+    statistics describe the stream rather than the processing speed.
+    """
+
+    # Realtime clocks run on the wall clock; their blink logs carry
+    # calendar timestamps instead of offsets into the stream
+    realtime = False
+
+    def __init__(self):
+        self.last = None
+
+    def stamp(self, timestamp=None):
+        """
+        Take the time of the frame being processed
+
+        Args:
+            timestamp: Explicit frame time in seconds; read from the
+                clock's source when omitted
+
+        Returns:
+            float: Frame time in seconds
+        """
+        self.last = self._read() if timestamp is None else float(timestamp)
+        return self.last
+
+    def now(self):
+        """
+        Get the current time on this clock
+
+        Returns:
+            float: Latest frame time, or None before the first frame
+        """
+        return self.last
+
+    def reset(self):
+        """Forget the latest frame time (start of a new session)"""
+        self.last = None
+
+    def _read(self):
+        raise ValueError(f"{type(self).__name__} needs an explicit timestamp for every frame")
+
+
+class ManualClock(Clock):
+    """
+    Clock driven entirely by timestamps passed with each frame
+    """
+
+
+class SystemClock(Clock):
+    """
+    Wall-clock time at the moment each frame is processed (the default)
+    """
+
+    realtime = True
+
+    def _read(self):
+        return time.time()
+
+    def now(self):
+        return time.time()
+
+
+class CaptureClock(SystemClock):
+    """
+    Driver timestamps of a live capture device
+
+    Cameras whose backend reports frame timestamps (CAP_PROP_POS_MSEC)
+    are stamped with the time the frame was captured rather than the time
+    it was processed, mapped onto the wall clock at the first frame.
+    Backends without timestamps fall back to the wall clock.
+    """
+
+    def __init__(self, cap):
+        super().__init__()
+        self.cap = cap
+        self._offset = None
+        self._last_driver = None
+
+    def reset(self):
+        super().reset()
+        self._offset = None
+        self._last_driver = None
+
+    def _read(self):
+        driver = self.cap.get(cv2.CAP_PROP_POS_MSEC) / 1000.0
+        if driver <= 0 or (self._last_driver is not None and driver <= self._last_driver):
+            return time.time()
+        self._last_driver = driver
+        if self._offset is None:
+            self._offset = time.time() - driver
+        return driver + self._offset
+
+
+class VideoClock(Clock):
+    """
+    Presentation timestamps of a video file
+
+    Reads the position of the frame just decoded; backends that do not
+    report positions fall back to frame index / FPS.
+    """
+
+    def __init__(self, cap):
+        super().__init__()
+        self.cap = cap
+        self.fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+
+    def _read(self):
+        timestamp = self.cap.get(cv2.CAP_PROP_POS_MSEC) / 1000.0
+        if self.last is not None and timestamp <= self.last:
+            timestamp = (self.cap.get(cv2.CAP_PROP_POS_FRAMES) - 1) / self.fps
+            if timestamp <= self.last:
+                timestamp = self.last + 1.0 / self.fps
+        return timestamp
+
+
+class SyntheticClock(Clock):
+    """
+    Fixed frame rate clock for tests, benchmarks and generated input
+
+    Frame n is stamped start + n / fps, independent of processing speed.
+    """
+
+    def __init__(self, fps=30.0, start=0.0):
+        super().__init__()
+        self.fps = fps
+        self.start = start
+        self.frames = 0
+
+    def reset(self):
+        super().reset()
+        self.frames = 0
+
+    def _read(self):
+        timestamp = self.start + self.frames / self.fps
+        self.frames += 1
+        return timestamp
@@ -5,6 +5,7 @@ Demonstrates basic usage and features
 
 import cv2
 from blink_detector import EyeBlinkDetector
+import model_registry
 import time
 
 
@@ -220,6 +221,12 @@ def main():
     print("Make sure your webcam is connected and working.\n")
     
     try:
+        # Load the landmark model once; every demo's detector reuses it
+        print("Loading facial landmark model...")
+        model_registry.preload()
+        model_registry.report()
+        print()
+        
         input("Press Enter to start Demo 1...")
         demo_basic_detection()
         
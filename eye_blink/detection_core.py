@@ -0,0 +1,932 @@
+"""
+Blink detection core shared by EyeBlinkDetector and ModernBlinkDetector
+Each frame passes through four stages: landmark acquisition (face
+location and landmark fitting by a backend), the EAR signal, per-face
+blink state machines and optional overlay rendering. The classic and
+modern detectors are configurations (DetectionMode) of this one core.
+"""
+
+import time
+import csv
+import itertools
+from collections import deque
+from datetime import datetime
+import os
+
+from eye_metrics import (LEFT_EYE_INDICES, RIGHT_EYE_INDICES,
+                         shape_to_array, eye_aspect_ratios, contour_aspect_ratio)
+from face_tracks import FaceTrack, STATUS_LABELS, match_tracks, rect_iou
+from clocks import SystemClock
+from landmark_backends import LandmarkBackend, create_backend
+from eye_roi import EyeROITracker
+from luma_capture import LumaFrame, to_gray
+from session_metrics import BlinkRates, DurationStats, DEFAULT_RATE_WINDOWS, window_label
+from session_log import SessionLog, MinuteRollups, BLINK_FIELDS, MINUTE_FIELDS, DEFAULT_MAX_MINUTES
+import model_registry
+from startup import lazy_import
+
+cv2 = lazy_import("cv2")
+dlib = lazy_import("dlib")
+np = lazy_import("numpy")
+
+
+def draw_contours(frame, track, eyes, points, show_id):
+    """Classic overlay: thin green eye contours, plus track IDs with several faces"""
+    for eye in eyes:
+        cv2.drawContours(frame, [cv2.convexHull(eye)], -1, (0, 255, 0), 1)
+    if show_id:
+        x, y = points.min(axis=0)
+        cv2.putText(frame, f"#{track.track_id}", (int(x), int(y) - 10),
+                   cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 0), 1)
+
+
+def draw_glow(frame, track, eyes, points, show_id):
+    """Modern overlay: glowing eye contours, orange while the eyes are closed"""
+    for eye in eyes:
+        eye_hull = cv2.convexHull(eye)
+        if track.blink.closed:
+            cv2.drawContours(frame, [eye_hull], -1, (0, 100, 255), 3)
+        else:
+            cv2.drawContours(frame, [eye_hull], -1, (0, 255, 100), 2)
+        
+        # Inner highlight
+        cv2.drawContours(frame, [eye_hull], -1, (255, 255, 255), 1)
+
+
+class DetectionMode:
+    """
+    Blink logic and presentation of one detector flavor
+    """
+    
+    def __init__(self, name, consec_frames, refractory, smoothing, labels,
+                 no_face_status, idle_status, overlay):
+        """
+        Args:
+            name: Mode name
+            consec_frames: Default consecutive closed frames for a blink
+            refractory: Minimum seconds between counted blinks
+            smoothing: Number of samples in the EAR moving average
+            labels: (open, closed, drowsy) status texts of a face
+            no_face_status: Status text when no face is in view
+            idle_status: Status text before the first frame
+            overlay: Function drawing one face's eyes
+                (frame, track, eyes, points, show_id)
+        """
+        self.name = name
+        self.consec_frames = consec_frames
+        # config.json detection key overriding consec_frames in this mode
+        self.consec_frames_key = ('consecutive_frames' if name == 'classic'
+                                  else f'{name}_consecutive_frames')
+        self.refractory = refractory
+        self.smoothing = smoothing
+        self.labels = labels
+        self.no_face_status = no_face_status
+        self.idle_status = idle_status
+        self.overlay = overlay
+
+
+MODES = {
+    'classic': DetectionMode('classic', consec_frames=3, refractory=0.0, smoothing=1,
+                             labels=STATUS_LABELS, no_face_status="No Face Detected",
+                             idle_status="Eyes Open", overlay=draw_contours),
+    # 3-sample EAR smoothing, 2-frame blinks for faster response and a
+    # 150ms refractory period to prevent double counting
+    'modern': DetectionMode('modern', consec_frames=2, refractory=0.15, smoothing=3,
+                            labels=("Open", "Closed", "Drowsy!"), no_face_status="No Face",
+                            idle_status="Ready", overlay=draw_glow),
+}
+
+
+# Blink rows kept in memory when they are streamed to a session log
+RECENT_BLINK_ROWS = 100
+
+
+class BlinkDetector:
+    """
+    Blink detection pipeline configured by a DetectionMode
+    
+    Stages per frame: landmark acquisition (`acquire_landmarks`), EAR
+    signal (`measure_faces`), per-face blink state (`_update_tracks`)
+    and, when `overlay` is enabled, rendering (`draw_overlay`).
+    Features: Blink counting, rate calculation, drowsiness detection, data export
+    """
+    
+    # Eye landmark indices (68-point facial landmarks)
+    LEFT_EYE_INDICES = LEFT_EYE_INDICES
+    RIGHT_EYE_INDICES = RIGHT_EYE_INDICES
+    
+    # Mode used when none is passed
+    default_mode = "classic"
+    
+    def __init__(self, 
+                 ear_threshold=0.25, 
+                 consec_frames=None,
+                 drowsiness_threshold=1.5,
+                 predictor_path="shape_predictor_68_face_landmarks.dat",
+                 detect_interval=1,
+                 tracker="landmarks",
+                 min_track_iou=0.6,
+                 min_track_psr=7.0,
+                 detection_scale=1.0,
+                 upsample=0,
+                 match_iou=0.3,
+                 max_missed=3,
+                 clock=None,
+                 backend="dlib",
+                 max_faces=1,
+                 min_detection_confidence=0.5,
+                 mode=None,
+                 overlay=True,
+                 landmark_interval=1,
+                 roi_min_match=0.4,
+                 rate_windows=DEFAULT_RATE_WINDOWS,
+                 perclos_window=60.0,
+                 perclos_threshold=None,
+                 perclos_fps=30.0,
+                 session_log=None,
+                 max_minutes=DEFAULT_MAX_MINUTES):
+        """
+        Initialize the blink detector
+        
+        Args:
+            ear_threshold: Eye Aspect Ratio threshold for blink detection
+            consec_frames: Consecutive frames below threshold to count as
+                blink (default: the mode's)
+            drowsiness_threshold: Time in seconds eyes closed to trigger drowsiness
+            predictor_path: Path to dlib facial landmark predictor
+            detect_interval: Run the HOG face detector every N frames
+                (1 = every frame); faces are tracked in between
+            tracker: How faces are tracked between detections:
+                "landmarks" (reuse previous frame's landmarks) or
+                "correlation" (dlib correlation tracker)
+            min_track_iou: Landmark tracking is considered lost when the
+                propagated box and the refitted box overlap less than this
+            min_track_psr: Correlation tracking is considered lost when the
+                tracker's peak-to-sidelobe ratio drops below this
+            detection_scale: Scale factor (0, 1] applied to the gray frame
+                before face detection; landmarks are always fitted at
+                full resolution
+            upsample: Number of times the HOG detector upsamples its input
+            match_iou: Minimum IoU for a detection to continue an existing
+                face track instead of starting a new one
+            max_missed: Detections a face may be missing from before its
+                track is dropped
+            clock: Frame clock (see clocks.py) that timestamps each frame;
+                defaults to the wall clock
+            backend: Landmark backend, "dlib" (HOG detection plus the
+                68-point predictor), "facemesh" (MediaPipe FaceMesh, which
+                finds and tracks faces itself, so the face tracking
+                settings above do not apply) or a LandmarkBackend
+            max_faces: Maximum number of faces tracked by FaceMesh
+            min_detection_confidence: FaceMesh face detection confidence
+            mode: DetectionMode or its name in MODES ("classic" or
+                "modern"); sets blink smoothing, refractory period,
+                status texts and overlay style
+            overlay: Draw eye contours on frames passed to detect_blink;
+                disable for headless and offline processing
+            landmark_interval: Fit full landmarks every N frames
+                (1 = every frame); in between, each eye's EAR is
+                estimated from a small ROI around it (see eye_roi.py)
+            roi_min_match: Template correlation below which an eye ROI
+                is considered lost and full landmarks are refitted
+            rate_windows: Sliding windows in seconds over which blink
+                rates are reported; the 60 s window is always included
+                and backs `get_blink_rate`
+            perclos_window: Seconds over which PERCLOS (the share of
+                frames with closed eyes) is measured, by frame timestamps
+            perclos_threshold: PERCLOS that raises drowsiness once a
+                face's window is full, in addition to long closures
+                (None, the default, disables)
+            perclos_fps: Expected frame rate sizing the PERCLOS buffers;
+                clocks that know their source's rate (e.g. VideoClock)
+                take precedence
+            session_log: Path of an append-only blink log (or a
+                SessionLog) for long sessions; blink rows are streamed to
+                it by a background thread and only the most recent ones
+                stay in memory. None keeps every row in memory
+            max_minutes: Completed per-minute rollups kept in memory
+        """
+        if not isinstance(mode, DetectionMode):
+            mode = MODES[mode or self.default_mode]
+        if tracker not in ("landmarks", "correlation"):
+            raise ValueError(f"Unknown tracker '{tracker}' (use 'landmarks' or 'correlation')")
+        if not 0 < detection_scale <= 1:
+            raise ValueError(f"detection_scale must be in (0, 1], got {detection_scale}")
+        
+        self.mode = mode
+        self.overlay = overlay
+        self.ear_threshold = ear_threshold
+        self.consec_frames = mode.consec_frames if consec_frames is None else consec_frames
+        self.drowsiness_threshold = drowsiness_threshold
+        
+        # Face tracking between detections
+        self.detect_interval = max(1, int(detect_interval))
+        self.tracker = tracker
+        self.min_track_iou = min_track_iou
+        self.min_track_psr = min_track_psr
+        self._frames_since_detection = 0
+        self._tracking_lost = True
+        
+        # Eye-ROI fast path between full landmark fits
+        self.landmark_interval = max(1, int(landmark_interval))
+        self.roi_min_match = roi_min_match
+        self._frames_since_landmarks = 0
+        
+        # Per-face tracks, keyed by a track ID assigned on first sight
+        self.match_iou = match_iou
+        self.max_missed = max_missed
+        self.tracks = []
+        self._next_track_id = 1
+        
+        # Face detection resolution
+        self.detection_scale = detection_scale
+        self.upsample = int(upsample)
+        
+        # Landmarks come from a pluggable backend; the dlib predictor is
+        # shared by all detectors (see model_registry)
+        if not isinstance(backend, LandmarkBackend):
+            backend = create_backend(backend, predictor_path, max_faces, min_detection_confidence)
+        self.backend = backend
+        
+        # Blink tracking variables
+        self.total_blinks = 0
+        self.frame_counter = 0
+        self.blink_start_time = None
+        self.eyes_closed_start = None
+        self.is_drowsy = False
+        
+        # Blink rate tracking
+        # Blinks per minute over sliding windows, O(1) amortized per query
+        self.rate_windows = tuple(rate_windows)
+        self.blink_rates = BlinkRates(self.rate_windows)
+        self.blink_durations = DurationStats()
+        
+        # PERCLOS fatigue metric, kept per face
+        self.perclos_window = perclos_window
+        self.perclos_threshold = perclos_threshold
+        self.perclos_fps = perclos_fps
+        self.perclos = 0.0
+        self.clock = clock or SystemClock()
+        self.session_start_time = self._session_origin()
+        
+        # Data logging; with a session log, rows go to disk and
+        # `blink_data` only holds the most recent ones
+        if session_log is not None and not isinstance(session_log, SessionLog):
+            session_log = SessionLog(session_log)
+        self.session_log = session_log
+        if session_log is None:
+            self.blink_data = []
+        else:
+            self.blink_data = deque(maxlen=RECENT_BLINK_ROWS)
+        self.rollups = MinuteRollups(max_minutes, session_log.log_minute if session_log else None)
+        
+        # Status variables
+        self.current_ear = 0.0
+        self.status = mode.idle_status
+        
+    @property
+    def detector(self):
+        """HOG face detector for the calling thread (see model_registry)"""
+        return model_registry.get_face_detector()
+    
+    def calculate_ear(self, eye_landmarks):
+        """
+        Calculate Eye Aspect Ratio (EAR)
+        
+        EAR = (||p2-p6|| + ||p3-p5||) / (2 * ||p1-p4||)
+        where p1-p6 are eye landmark points
+        
+        Args:
+            eye_landmarks: Array of eye landmark coordinates
+            
+        Returns:
+            float: Eye Aspect Ratio
+        """
+        return float(contour_aspect_ratio(eye_landmarks))
+    
+    def get_eye_landmarks(self, landmarks, eye_indices):
+        """
+        Extract eye landmark coordinates
+        
+        Args:
+            landmarks: Full facial landmarks
+            eye_indices: Indices for specific eye
+            
+        Returns:
+            numpy array: Eye landmark coordinates
+        """
+        return shape_to_array(landmarks)[eye_indices]
+    
+    @classmethod
+    def from_config(cls, config, **overrides):
+        """
+        Create a detector from a config.json dictionary
+        
+        Consecutive frames come from the mode's own key
+        (`consecutive_frames` for classic, `<mode>_consecutive_frames`
+        otherwise) and fall back to the mode preset when it is not set
+        
+        Args:
+            config: Parsed config (see load_config)
+            **overrides: Constructor arguments taking precedence over config
+            
+        Returns:
+            BlinkDetector: Configured detector
+        """
+        detection = config.get('detection', {})
+        advanced = config.get('advanced', {})
+        mode = overrides.get('mode') or cls.default_mode
+        if not isinstance(mode, DetectionMode):
+            mode = MODES[mode]
+        kwargs = {
+            'ear_threshold': detection.get('ear_threshold', 0.25),
+            'consec_frames': detection.get(mode.consec_frames_key),
+            'drowsiness_threshold': detection.get('drowsiness_threshold_seconds', 1.5),
+            'rate_windows': detection.get('blink_rate_windows', DEFAULT_RATE_WINDOWS),
+            'perclos_window': detection.get('perclos_window_seconds', 60.0),
+            'perclos_threshold': detection.get('perclos_threshold'),
+            'perclos_fps': config.get('camera', {}).get('fps', 30),
+            'detection_scale': advanced.get('face_detection_scale', 1.0),
+            'upsample': advanced.get('face_detector_upsampling', 0),
+            'backend': advanced.get('landmark_backend', 'dlib'),
+            'landmark_interval': advanced.get('landmark_interval', 1),
+            'max_faces': advanced.get('max_faces', 1),
+            'min_detection_confidence': advanced.get('min_detection_confidence', 0.5),
+        }
+        kwargs.update(overrides)
+        return cls(**kwargs)
+    
+    def detect_faces(self, gray):
+        """
+        Run the HOG face detector, optionally on a downscaled image
+        
+        HOG cost scales with pixel count, so detection runs on a copy of
+        the frame resized by `detection_scale` and the rectangles are
+        mapped back to full-resolution coordinates for landmark fitting.
+        
+        Args:
+            gray: Full-resolution grayscale frame
+            
+        Returns:
+            list: dlib rectangles in full-resolution coordinates
+        """
+        scale = self.detection_scale
+        if scale >= 1.0:
+            return list(self.detector(gray, self.upsample))
+        
+        small = cv2.resize(gray, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+        return [dlib.rectangle(int(round(face.left() / scale)), int(round(face.top() / scale)),
+                               int(round(face.right() / scale)), int(round(face.bottom() / scale)))
+                for face in self.detector(small, self.upsample)]
+    
+    def _associate_faces(self, gray, faces, now):
+        """
+        Match this frame's detections to face tracks by IoU
+        
+        Matched tracks take the detected rectangle, unmatched detections
+        start new tracks and tracks missing for more than `max_missed`
+        detections are dropped.
+        
+        Returns:
+            list: Tracks observed in this frame
+        """
+        matches, missing, new_faces = match_tracks(self.tracks, faces, self.match_iou)
+        
+        observed = []
+        for track, face in matches:
+            track.rect = face
+            track.missed = 0
+            observed.append(track)
+        for track in missing:
+            track.missed += 1
+        self.tracks = [t for t in self.tracks if t.missed <= self.max_missed]
+        # Size PERCLOS buffers from the source's own rate when the clock knows it
+        perclos_fps = getattr(self.clock, 'fps', None) or self.perclos_fps
+        for face in new_faces:
+            track = FaceTrack(self._next_track_id, face, now, self, self.mode.refractory,
+                              self.mode.smoothing, self.mode.labels, self.rate_windows,
+                              self.perclos_window, perclos_fps)
+            self._next_track_id += 1
+            self.tracks.append(track)
+            observed.append(track)
+        
+        if self.tracker == "correlation" and gray is not None:
+            for track in observed:
+                track.correlation = dlib.correlation_tracker()
+                track.correlation.start_track(gray, track.rect)
+        return observed
+    
+    def _locate_faces(self, gray, now):
+        """
+        Find this frame's faces, running the HOG detector only when needed
+        
+        Detection runs every `detect_interval` frames, whenever nothing is
+        being tracked, and whenever tracking confidence dropped on the
+        previous frame. Otherwise rectangles are propagated by the tracker.
+        
+        Returns:
+            tuple: (tracks, detected) where tracks are the face tracks
+            observed in this frame and detected is True if the HOG
+            detector produced their rectangles
+        """
+        if (self.detect_interval <= 1 or self._tracking_lost
+                or not any(t.missed == 0 for t in self.tracks)
+                or self._frames_since_detection + 1 >= self.detect_interval):
+            faces = self.detect_faces(gray)
+            self._frames_since_detection = 0
+            self._tracking_lost = False
+            return self._associate_faces(gray, faces, now), True
+        
+        self._frames_since_detection += 1
+        observed = [t for t in self.tracks if t.missed == 0]
+        if self.tracker == "correlation":
+            for track in observed:
+                if track.correlation.update(gray) < self.min_track_psr:
+                    self._tracking_lost = True
+                pos = track.correlation.get_position()
+                track.rect = dlib.rectangle(int(pos.left()), int(pos.top()),
+                                            int(pos.right()), int(pos.bottom()))
+        return observed, False
+    
+    def _refine_track(self, track, points, detected, frame_shape):
+        """
+        Propagate a face rectangle from this frame's landmarks
+        
+        On detection frames the offset between the HOG rectangle and the
+        landmark bounding box is recorded, so propagated rectangles keep
+        the framing the predictor was trained on. On tracked frames the
+        track is dropped when the refitted landmarks disagree with the
+        rectangle they were fitted in, or drift out of the frame.
+        """
+        x0, y0 = points.min(axis=0)
+        x1, y1 = points.max(axis=0)
+        w = max(x1 - x0, 1)
+        h = max(y1 - y0, 1)
+        face = track.rect
+        
+        if detected:
+            track.offsets = ((face.left() - x0) / w, (face.top() - y0) / h,
+                             (face.right() - x1) / w, (face.bottom() - y1) / h)
+        elif track.offsets is None:
+            self._tracking_lost = True
+            return
+        
+        ol, ot, o_r, ob = track.offsets
+        propagated = dlib.rectangle(int(round(x0 + ol * w)), int(round(y0 + ot * h)),
+                                    int(round(x1 + o_r * w)), int(round(y1 + ob * h)))
+        
+        if not detected and rect_iou(face, propagated) < self.min_track_iou:
+            self._tracking_lost = True
+        frame_h, frame_w = frame_shape[:2]
+        if x0 < 0 or y0 < 0 or x1 >= frame_w or y1 >= frame_h:
+            self._tracking_lost = True
+        
+        track.rect = propagated
+    
+    def _session_origin(self):
+        """Realtime sessions start now; others start at their first frame"""
+        return time.time() if self.clock.realtime else None
+    
+    def current_time(self):
+        """
+        Get the current time on the detector's clock
+        
+        Returns:
+            float: Wall-clock time for realtime clocks, otherwise the
+            latest frame time
+        """
+        now = self.clock.now()
+        if now is None:
+            return self.session_start_time or 0.0
+        return now
+    
+    def session_duration(self):
+        """Seconds from the start of the session to the current time"""
+        if self.session_start_time is None:
+            return 0.0
+        return self.current_time() - self.session_start_time
+    
+    def _format_timestamp(self, now):
+        """Format a blink time for the CSV log"""
+        if self.clock.realtime:
+            return datetime.now().strftime('%Y-%m-%d %H:%M:%S.%f')[:-3]
+        minutes, seconds = divmod(now, 60)
+        hours, minutes = divmod(int(minutes), 60)
+        return f"{hours:02d}:{minutes:02d}:{seconds:06.3f}"
+    
+    def _update_blink_state(self, track, left_ear, right_ear, now):
+        """
+        Advance one face's blink state machine with its current EAR
+        
+        Returns:
+            bool: True if a blink completed on this frame
+        """
+        event = track.blink.update(now, left_ear, right_ear)
+        track.update_perclos(now, self.perclos_threshold)
+        if event is None:
+            return False
+        
+        track.blink_rates.add(now)
+        track.blink_durations.add(event.duration)
+        self.total_blinks += 1
+        self.blink_rates.add(now)
+        self.blink_durations.add(event.duration)
+        self.rollups.add_blink(self._minute(now), event.duration)
+        
+        # Log blink data
+        row = {
+            'timestamp': self._format_timestamp(now),
+            'blink_number': self.total_blinks,
+            'ear_value': round(event.ear, 3),
+            'duration_frames': event.duration_frames,
+            'duration_ms': round(event.duration * 1000, 1),
+            'face_id': track.track_id
+        }
+        self.blink_data.append(row)
+        if self.session_log is not None:
+            self.session_log.log_blink(row)
+        return True
+    
+    def _minute(self, now):
+        """Index of the session minute `now` falls in"""
+        return max(0, int((now - self.session_start_time) // 60))
+    
+    def detect_blink(self, frame, timestamp=None):
+        """
+        Detect blinks in a video frame
+        
+        Every face keeps its own blink state. The detector-level
+        `current_ear`, `status` and `frame_counter` mirror the largest
+        face; `total_blinks` counts blinks of all faces and `is_drowsy`
+        is set if any face is drowsy.
+        
+        Args:
+            frame: Video frame (BGR format), or a LumaFrame whose Y plane
+                is used directly; its overlay is drawn only if the frame
+                is converted to BGR for display
+            timestamp: Time of the frame in seconds; overrides the
+                clock's own reading (use with a ManualClock)
+            
+        Returns:
+            tuple: (processed_frame, blink_detected, is_drowsy)
+        """
+        now = self._advance_time(timestamp)
+        gray = to_gray(frame)
+        tracks, points, ears = self.measure_faces(gray, now)
+        
+        if len(tracks) == 0:
+            self.status = self.mode.no_face_status
+            return frame, False, False
+        
+        blink_detected = self._update_tracks(tracks, ears, now)
+        if self.overlay:
+            if isinstance(frame, LumaFrame):
+                frame.draw(lambda image: self.draw_overlay(image, tracks, points))
+            else:
+                self.draw_overlay(frame, tracks, points)
+        
+        return frame, blink_detected, self.is_drowsy
+    
+    def draw_overlay(self, frame, tracks, points):
+        """
+        Draw the mode's eye contours on a frame in place
+        
+        Args:
+            frame: BGR frame
+            tracks: Face tracks observed in the frame
+            points: (F, N, 2) landmarks in track order
+        """
+        left_eye, right_eye = self.backend.eye_indices
+        for index, track in enumerate(tracks):
+            eyes = (points[index, left_eye].astype(np.int32),
+                    points[index, right_eye].astype(np.int32))
+            self.mode.overlay(frame, track, eyes, points[index], len(tracks) > 1)
+    
+    def _advance_time(self, timestamp):
+        """Stamp the current frame on the clock and return its time"""
+        now = self.clock.stamp(timestamp)
+        if self.session_start_time is None:
+            self.session_start_time = now
+        return now
+    
+    def acquire_landmarks(self, gray, now):
+        """
+        Locate this frame's faces and fit their landmarks
+        
+        Updates face tracking but not blink state.
+        
+        Args:
+            gray: Grayscale frame
+            now: Current time
+            
+        Returns:
+            tuple: (tracks, points) with one (N, 2) landmark set per
+            observed track; points is None when no face was found
+        """
+        if self.backend.locates_faces:
+            return self._acquire_located_faces(gray, now)
+        
+        tracks, detected = self._locate_faces(gray, now)
+        if len(tracks) == 0:
+            return tracks, None
+        
+        # Fit landmarks for every face in one backend call
+        points = self.backend.fit(gray, [t.rect for t in tracks])
+        
+        if self.detect_interval > 1 and self.tracker == "landmarks":
+            for index, track in enumerate(tracks):
+                self._refine_track(track, points[index], detected, gray.shape)
+        return tracks, points
+    
+    def _acquire_located_faces(self, gray, now):
+        """acquire_landmarks for backends that find and track faces themselves"""
+        faces, points = self.backend.locate(gray)
+        tracks = self._associate_faces(None, faces, now)
+        if len(tracks) == 0:
+            return tracks, None
+        
+        # Put the landmark sets in track order
+        order = {id(face): index for index, face in enumerate(faces)}
+        return tracks, points[[order[id(t.rect)] for t in tracks]]
+    
+    def measure_faces(self, gray, now):
+        """
+        Locate this frame's faces and compute their EAR
+        
+        Updates face tracking but not blink state, so measurements can be
+        taken in one place and replayed through `apply_measurements`.
+        
+        Args:
+            gray: Grayscale frame
+            now: Current time
+            
+        Returns:
+            tuple: (tracks, points, ears) with one landmark array and one
+            [left, right] EAR pair per observed track; points and ears
+            are None when no face was found
+        """
+        if self.landmark_interval > 1:
+            measured = self._measure_eye_rois(gray)
+            if measured is not None:
+                return measured
+        
+        tracks, points = self.acquire_landmarks(gray, now)
+        if len(tracks) == 0:
+            return tracks, None, None
+        
+        # EARs of all faces in one pass
+        ears = eye_aspect_ratios(points, self.backend.eye_indices)
+        
+        if self.landmark_interval > 1:
+            self._frames_since_landmarks = 0
+            for track, face_points, face_ears in zip(tracks, points, ears):
+                if track.eye_rois is None:
+                    track.eye_rois = EyeROITracker(self.backend.eye_indices, self.roi_min_match)
+                track.eye_rois.calibrate(gray, face_points, face_ears, self.ear_threshold)
+        return tracks, points, ears
+    
+    def _measure_eye_rois(self, gray):
+        """
+        Fast path: EAR proxies of the tracked faces from their eye ROIs
+        
+        Returns:
+            tuple: Same as measure_faces, or None when full landmarks are
+            due, a face has no calibrated ROIs yet or an eye was lost
+        """
+        if self._frames_since_landmarks + 1 >= self.landmark_interval:
+            return None
+        tracks = [t for t in self.tracks if t.missed == 0]
+        if not tracks or not all(t.eye_rois is not None and t.eye_rois.calibrated for t in tracks):
+            return None
+        
+        estimates = [t.eye_rois.estimate(gray) for t in tracks]
+        if any(estimate is None for estimate in estimates):
+            return None
+        self._frames_since_landmarks += 1
+        points = np.stack([points for points, _ in estimates])
+        ears = np.array([ears for _, ears in estimates], dtype=np.float64)
+        return tracks, points, ears
+    
+    def _update_tracks(self, tracks, ears, now):
+        """
+        Advance every observed face's blink state and the detector-level state
+        
+        Returns:
+            bool: True if any face completed a blink
+        """
+        blink_detected = False
+        for track, (left_ear, right_ear) in zip(tracks, ears):
+            if self._update_blink_state(track, float(left_ear), float(right_ear), now):
+                blink_detected = True
+        
+        # Detector-level state follows the largest (closest) face
+        primary = max(tracks, key=lambda t: t.rect.area())
+        self.current_ear = primary.current_ear
+        self.status = primary.status
+        self.frame_counter = primary.frame_counter
+        self.eyes_closed_start = primary.eyes_closed_start
+        self.perclos = primary.perclos.value
+        self.is_drowsy = any(t.is_drowsy for t in tracks)
+        self.rollups.add_frame(self._minute(now), primary.current_ear, primary.blink.closed)
+        return blink_detected
+    
+    def apply_measurements(self, faces, ears, timestamp=None):
+        """
+        Advance blink state from face rectangles and EARs measured elsewhere
+        
+        Faces are associated with tracks by IoU exactly as on detection
+        frames of `detect_blink`, so replaying the measurements of every
+        frame in order reproduces its blink events.
+        
+        Args:
+            faces: dlib rectangles observed in the frame
+            ears: (left, right) EAR pair of each face
+            timestamp: Frame time in seconds (see detect_blink)
+            
+        Returns:
+            tuple: (blink_detected, is_drowsy)
+        """
+        now = self._advance_time(timestamp)
+        tracks = self._associate_faces(None, faces, now)
+        if len(tracks) == 0:
+            self.status = self.mode.no_face_status
+            return False, False
+        
+        ear_by_face = {id(face): ear for face, ear in zip(faces, ears)}
+        blink_detected = self._update_tracks(tracks, [ear_by_face[id(t.rect)] for t in tracks], now)
+        return blink_detected, self.is_drowsy
+    
+    def get_blink_rate(self):
+        """
+        Calculate blinks per minute
+        
+        Returns:
+            float: Blinks per minute over the last 60 seconds
+        """
+        return self.blink_rates.rate(self.current_time())
+    
+    def get_average_blink_rate(self):
+        """
+        Calculate average blinks per minute for entire session
+        
+        Returns:
+            float: Average blinks per minute
+        """
+        elapsed_time = self.session_duration()
+        if elapsed_time > 0:
+            return (self.total_blinks / elapsed_time) * 60
+        return 0.0
+    
+    def export_data(self, filename=None):
+        """
+        Export blink data to CSV file
+        
+        Args:
+            filename: Output filename (default: auto-generated with timestamp)
+            
+        Returns:
+            str: Path to exported file
+        """
+        if filename is None:
+            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+            filename = f'blink_data_{timestamp}.csv'
+        
+        filepath = os.path.join(os.getcwd(), filename)
+        
+        # Blink rows are copied from the session log without loading them;
+        # logged rows carry the session ID as their first column
+        blinks = self.blink_rows()
+        with open(filepath, 'w', newline='') as csvfile:
+            writer = csv.DictWriter(csvfile, fieldnames=getattr(blinks, 'fieldnames', BLINK_FIELDS))
+            writer.writeheader()
+            if self.session_log is None:
+                writer.writerows(blinks)
+        if self.session_log is not None:
+            with open(filepath, 'ab') as f:
+                blinks.copy_to(f)
+        
+        # Per-minute rollups
+        minutes_file = filepath.replace('.csv', '_minutes.csv')
+        if self.session_log is None:
+            minute_fields = MINUTE_FIELDS
+        else:
+            minute_fields = self.session_log.fieldnames['minutes']
+        with open(minutes_file, 'w', newline='') as csvfile:
+            writer = csv.DictWriter(csvfile, fieldnames=minute_fields)
+            writer.writeheader()
+            writer.writerows(self.minute_rows())
+        
+        # Also write summary statistics
+        summary_file = filepath.replace('.csv', '_summary.txt')
+        with open(summary_file, 'w') as f:
+            f.write("=== Eye Blink Detection Session Summary ===\n\n")
+            if self.session_log is not None:
+                f.write(f"Session ID: {self.session_log.session_id}\n")
+            f.write(f"Total Blinks: {self.total_blinks}\n")
+            f.write(f"Session Duration: {self.session_duration():.2f} seconds\n")
+            f.write(f"Average Blink Rate: {self.get_average_blink_rate():.2f} blinks/minute\n")
+            f.write(f"Current Blink Rate: {self.get_blink_rate():.2f} blinks/minute\n")
+            if self.blink_durations.count:
+                f.write(f"Mean Blink Duration: {self.blink_durations.mean * 1000:.1f} ms\n")
+            f.write(f"PERCLOS: {self.perclos:.1%}\n")
+            if len(self.tracks) > 1:
+                f.write("\nPer Face:\n")
+                now = self.current_time()
+                for track in self.tracks:
+                    f.write(f"  Face #{track.track_id}: {track.total_blinks} blinks, "
+                            f"{track.get_blink_rate(now):.2f} blinks/minute\n")
+        
+        return filepath
+    
+    def blink_rows(self):
+        """
+        Get the session's blink rows for export
+        
+        Returns:
+            iterable: Row dicts, oldest first; with a session log they
+            are read back from disk when iterated and carry the session ID
+        """
+        if self.session_log is None:
+            return list(self.blink_data)
+        return self.session_log.snapshot('blinks')
+    
+    def minute_rows(self):
+        """
+        Get the session's per-minute rollups for export
+        
+        Returns:
+            iterable: Rows with count, mean EAR, mean blink duration and
+            PERCLOS per minute, oldest first, including the minute in
+            progress. Without a session log only the last `max_minutes`
+            completed minutes are available; with one, rows also carry
+            the session ID
+        """
+        if self.session_log is None:
+            return self.rollups.rows()
+        in_progress = []
+        if self.rollups.current is not None:
+            in_progress.append(dict(self.rollups.current.to_row(),
+                                    session_id=self.session_log.session_id))
+        return itertools.chain(self.session_log.snapshot('minutes'), in_progress)
+    
+    def _log_current_minute(self):
+        """Write the minute in progress to the session log"""
+        if self.session_log is not None and self.rollups.current is not None:
+            self.session_log.log_minute(self.rollups.current.to_row())
+            self.rollups.current = None
+    
+    def close(self):
+        """Log the minute in progress and close the session log"""
+        if self.session_log is not None:
+            self._log_current_minute()
+            self.session_log.close()
+    
+    def reset(self):
+        """Reset all counters and data"""
+        self.total_blinks = 0
+        self.frame_counter = 0
+        self.blink_rates.clear()
+        self.blink_durations.clear()
+        self.perclos = 0.0
+        self.blink_data.clear()
+        if self.session_log is not None:
+            self._log_current_minute()
+            self.session_log.mark()
+        self.rollups.clear()
+        self.clock.reset()
+        self.session_start_time = self._session_origin()
+        self.is_drowsy = False
+        self.status = self.mode.idle_status
+        self.tracks = []
+        self._next_track_id = 1
+        self._tracking_lost = True
+        self._frames_since_landmarks = 0
+        self.backend.reset()
+    
+    def get_stats(self):
+        """
+        Get current statistics
+        
+        Top-level values aggregate all faces (see detect_blink); `faces`
+        holds one entry per currently tracked face.
+        
+        Returns:
+            dict: Statistics dictionary
+        """
+        now = self.current_time()
+        faces = [t.get_stats(now) for t in self.tracks if t.missed == 0]
+        return {
+            'total_blinks': self.total_blinks,
+            'current_ear': round(self.current_ear, 3),
+            'status': self.status,
+            'blink_rate': round(self.get_blink_rate(), 2),
+            'blink_rates': self.blink_rates.rates(now),
+            'avg_blink_rate': round(self.get_average_blink_rate(), 2),
+            'is_drowsy': self.is_drowsy,
+            'perclos': round(self.perclos, 3),
+            'perclos_window': window_label(self.perclos_window),
+            'blink_duration': self.blink_durations.summary(),
+            'session_duration': round(self.session_duration(), 2),
+            'face_count': len(faces),
+            'faces': faces
+        }
@@ -0,0 +1,213 @@
+"""
+Background export jobs for the web interface
+Blink data is snapshotted from the detection thread, written to a
+temporary CSV off the hot path and streamed to the browser in chunks
+"""
+
+import csv
+import itertools
+import os
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+from session_log import BLINK_FIELDS
+
+
+class ExportJob:
+    """
+    State of one export: snapshot, CSV writing progress and result file
+    """
+
+    _ids = itertools.count(1)
+
+    def __init__(self):
+        self.job_id = str(next(self._ids))
+        self.status = "pending"
+        self.rows_total = 0
+        self.rows_written = 0
+        self.bytes_total = 0
+        self.bytes_written = 0
+        self.created_at = time.time()
+        self.finished_at = None
+        self.error = None
+        self.summary = None
+        self.path = None
+        self.downloads = 0
+        self.filename = f"blink_data_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
+
+    @property
+    def progress(self):
+        if self.status == "done":
+            return 1.0
+        if self.bytes_total:
+            return self.bytes_written / self.bytes_total
+        if self.rows_total == 0:
+            return 0.0
+        return self.rows_written / self.rows_total
+
+    def to_dict(self):
+        """
+        Get job status for the API
+
+        Returns:
+            dict: Job status dictionary
+        """
+        return {
+            'job_id': self.job_id,
+            'status': self.status,
+            'progress': round(self.progress, 3),
+            'rows_total': self.rows_total,
+            'rows_written': self.rows_written,
+            'bytes_total': self.bytes_total,
+            'bytes_written': self.bytes_written,
+            'filename': self.filename,
+            'summary': self.summary,
+            'error': self.error
+        }
+
+
+class ExportStream:
+    """
+    A job's CSV file as an iterable of chunks for a streaming response
+
+    The WSGI server calls close() when the response ends, including when
+    the client disconnects before the first chunk, which ends the
+    download.
+    """
+
+    def __init__(self, manager, job):
+        self.manager = manager
+        self.job = job
+        self._released = False
+
+    def __iter__(self):
+        try:
+            with open(self.job.path, 'rb') as f:
+                while True:
+                    chunk = f.read(self.manager.CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    yield chunk
+        finally:
+            self.close()
+
+    def close(self):
+        if not self._released:
+            self._released = True
+            self.manager._release(self.job)
+
+
+class ExportManager:
+    """
+    Runs export jobs on worker threads and keeps the most recent results
+    """
+
+    PROGRESS_EVERY = 1000
+    CHUNK_SIZE = 64 * 1024
+
+    def __init__(self, max_jobs=10, directory=None):
+        self.max_jobs = max_jobs
+        self.directory = directory or tempfile.gettempdir()
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def start(self, snapshot):
+        """
+        Start an export job
+
+        Args:
+            snapshot: Callable returning (rows, summary) where rows is a
+                list of blink dicts (BLINK_FIELDS) that will not be mutated
+                afterwards, or an iterable reading them back from a session
+                log; rows are written as they are iterated, and a session
+                log range (LogRange) is copied as raw CSV bytes
+
+        Returns:
+            ExportJob: The new job
+        """
+        job = ExportJob()
+        with self._lock:
+            self._jobs[job.job_id] = job
+            self._prune()
+        threading.Thread(target=self._run, args=(job, snapshot),
+                         name=f"export-{job.job_id}", daemon=True).start()
+        return job
+
+    def get(self, job_id):
+        """Look up a job by ID"""
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def iter_file(self, job):
+        """
+        Open a finished job's CSV for streaming
+
+        The job counts as being downloaded from this call until the
+        returned stream is closed, and its file is not pruned meanwhile.
+
+        Returns:
+            ExportStream: Iterable of fixed-size chunks, or None if the
+            job has already been pruned
+        """
+        with self._lock:
+            if self._jobs.get(job.job_id) is not job:
+                return None
+            job.downloads += 1
+        return ExportStream(self, job)
+
+    def _release(self, job):
+        """End one download of a job"""
+        with self._lock:
+            job.downloads -= 1
+
+    def _run(self, job, snapshot):
+        """Snapshot the data, then write the CSV without touching the detector"""
+        job.status = "running"
+        try:
+            rows, job.summary = snapshot()
+            if hasattr(rows, '__len__'):
+                job.rows_total = len(rows)
+
+            fd, job.path = tempfile.mkstemp(prefix=f"blink_export_{job.job_id}_",
+                                            suffix=".csv", dir=self.directory)
+            with os.fdopen(fd, 'w', newline='') as csvfile:
+                writer = csv.DictWriter(csvfile, fieldnames=getattr(rows, 'fieldnames', BLINK_FIELDS))
+                writer.writeheader()
+                if hasattr(rows, 'copy_to'):
+                    # Rows already on disk are copied without parsing them;
+                    # progress is tracked in bytes
+                    csvfile.flush()
+                    job.bytes_total = rows.size
+                    rows.copy_to(csvfile.buffer, self.CHUNK_SIZE,
+                                 on_chunk=lambda chunk: self._copied(job, chunk))
+                else:
+                    written = 0
+                    for written, row in enumerate(rows, 1):
+                        writer.writerow(row)
+                        if written % self.PROGRESS_EVERY == 0:
+                            job.rows_written = written
+                    job.rows_written = written
+            job.rows_total = max(job.rows_total, job.rows_written)
+            job.status = "done"
+        except Exception as e:
+            job.error = str(e)
+            job.status = "failed"
+        finally:
+            job.finished_at = time.time()
+
+    @staticmethod
+    def _copied(job, chunk):
+        job.bytes_written += len(chunk)
+        job.rows_written += chunk.count(b"\n")
+
+    def _prune(self):
+        """Drop the oldest finished jobs beyond max_jobs; caller holds the lock"""
+        finished = [j for j in self._jobs.values()
+                    if j.status in ("done", "failed") and j.downloads == 0]
+        excess = len(self._jobs) - self.max_jobs
+        for job in sorted(finished, key=lambda j: j.created_at)[:max(0, excess)]:
+            del self._jobs[job.job_id]
+            if job.path and os.path.exists(job.path):
+                os.remove(job.path)
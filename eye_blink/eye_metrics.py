@@ -0,0 +1,82 @@
+"""
+Vectorized facial landmark and Eye Aspect Ratio helpers
+Shared by EyeBlinkDetector and ModernBlinkDetector
+"""
+
+from itertools import chain
+
+from startup import lazy_import
+
+np = lazy_import("numpy")
+
+
+# Eye landmark indices (68-point facial landmarks)
+LEFT_EYE_INDICES = list(range(36, 42))
+RIGHT_EYE_INDICES = list(range(42, 48))
+EYE_INDICES = [LEFT_EYE_INDICES, RIGHT_EYE_INDICES]
+
+# The same six EAR points on the MediaPipe FaceMesh (468-point) topology,
+# in dlib's order: outer/inner corner, two upper lid and two lower lid points
+FACEMESH_LEFT_EYE_INDICES = [33, 160, 158, 133, 153, 144]
+FACEMESH_RIGHT_EYE_INDICES = [362, 385, 387, 263, 373, 380]
+FACEMESH_EYE_INDICES = [FACEMESH_LEFT_EYE_INDICES, FACEMESH_RIGHT_EYE_INDICES]
+
+# EAR point pairs within a 6-point eye contour (p1..p6 -> 0..5)
+_VERTICAL_A = [1, 2]
+_VERTICAL_B = [5, 4]
+
+
+def shape_to_array(shape, dtype=None):
+    """
+    Convert a dlib full_object_detection into an (N, 2) coordinate array
+
+    Args:
+        shape: dlib landmark shape (68 parts for the standard predictor)
+        dtype: Output dtype (default: int32)
+
+    Returns:
+        numpy array: (N, 2) array of (x, y) landmark coordinates
+    """
+    n = shape.num_parts
+    if dtype is None:
+        dtype = np.int32
+    coords = np.fromiter(chain.from_iterable((p.x, p.y) for p in shape.parts()),
+                         dtype=dtype, count=2 * n)
+    return coords.reshape(n, 2)
+
+
+def eye_aspect_ratios(points, eye_indices=EYE_INDICES):
+    """
+    Calculate the Eye Aspect Ratio of both eyes for one or more faces
+
+    EAR = (||p2-p6|| + ||p3-p5||) / (2 * ||p1-p4||)
+
+    Args:
+        points: (..., N, 2) landmark array, e.g. (68, 2) for one face
+            or (F, 68, 2) for F faces
+        eye_indices: [left, right] lists of the six contour points of
+            each eye (default: 68-point dlib layout)
+
+    Returns:
+        numpy array: (..., 2) EAR values ordered [left, right]
+    """
+    eyes = np.asarray(points, dtype=np.float64)[..., eye_indices, :]
+    return contour_aspect_ratio(eyes)
+
+
+def contour_aspect_ratio(eyes):
+    """
+    Calculate the Eye Aspect Ratio of 6-point eye contours
+
+    Args:
+        eyes: (..., 6, 2) array of eye contour points p1..p6
+
+    Returns:
+        numpy array: (...) EAR values
+    """
+    eyes = np.asarray(eyes, dtype=np.float64)
+    vertical = eyes[..., _VERTICAL_A, :] - eyes[..., _VERTICAL_B, :]
+    horizontal = eyes[..., 0, :] - eyes[..., 3, :]
+    v = np.hypot(vertical[..., 0], vertical[..., 1]).sum(axis=-1)
+    h = np.hypot(horizontal[..., 0], horizontal[..., 1])
+    return v / (2.0 * h)
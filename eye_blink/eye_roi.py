@@ -0,0 +1,193 @@
+"""
+Eye-ROI fast path for high frame rates
+Between full landmark fits each eye is followed by template matching in
+a small window around its last position, and its openness is estimated
+from the number of rows of the eye box crossed by the dark iris. Closing
+lids cover the iris until only the lash line is left. The row count is
+scaled to the landmark EAR measured at the last fit with open eyes, so
+it can be fed to the blink state machine as an EAR proxy.
+"""
+
+from startup import lazy_import
+
+cv2 = lazy_import("cv2")
+np = lazy_import("numpy")
+
+
+# Template margin and search margin around the eye box, in eye widths
+TEMPLATE_PAD = 0.4
+SEARCH_PAD = 0.3
+
+# Vertical margin around the eye box when counting dark rows, in eye
+# heights, so lids opening wider than at calibration are still counted
+OPENING_PAD = 0.5
+
+# A row is dark when at least this fraction of the eye width is darker
+# than the iris threshold
+DARK_ROW_FRACTION = 0.15
+
+
+class EyeROI:
+    """
+    Template and openness calibration of one eye
+    """
+
+    def __init__(self, min_match=0.4):
+        """
+        Args:
+            min_match: Minimum normalized template correlation for the
+                eye to count as found
+        """
+        self.min_match = min_match
+        self.template = None
+        self.origin = None
+        self.box = None
+        self.eye_size = None
+        self.threshold = None
+        self.min_dark = 2
+        self.dark_ref = 0
+        self.ear_ref = None
+
+    @property
+    def calibrated(self):
+        return self.template is not None and self.dark_ref > 0
+
+    def calibrate(self, gray, eye, ear, ear_threshold):
+        """
+        Take the eye's template, and its openness reference when open
+
+        Args:
+            gray: Grayscale frame the landmarks were fitted on
+            eye: (6, 2) eye contour points
+            ear: Landmark EAR of this eye
+            ear_threshold: EAR below which the eye counts as closed; the
+                openness reference is only updated from open eyes
+        """
+        frame_h, frame_w = gray.shape[:2]
+        x0, y0 = eye.min(axis=0)
+        x1, y1 = eye.max(axis=0)
+        is_open = ear >= ear_threshold
+        if is_open or self.eye_size is None:
+            self.eye_size = (max(int(x1 - x0), 4), max(int(y1 - y0), 2))
+        # Closed lids keep the box of the last open eye, centered on the eye
+        width, height = self.eye_size
+        left = int(round((x0 + x1 - width) / 2.0))
+        top = int(round((y0 + y1 - height) / 2.0))
+
+        pad = int(round(width * TEMPLATE_PAD))
+        tx0, ty0 = max(left - pad, 0), max(top - pad, 0)
+        tx1, ty1 = min(left + width + pad + 1, frame_w), min(top + height + pad + 1, frame_h)
+        if tx1 - tx0 < 8 or ty1 - ty0 < 8:
+            self.template = None
+            return
+
+        self.template = gray[ty0:ty1, tx0:tx1].copy()
+        self.origin = (tx0, ty0)
+        # Eye box relative to the template, with room for wider lids
+        lid = int(round(height * OPENING_PAD))
+        self.box = (max(left - tx0, 0), max(top - lid - ty0, 0),
+                    min(left + width + 1 - tx0, tx1 - tx0), min(top + height + lid + 1 - ty0, ty1 - ty0))
+
+        if is_open:
+            # Iris threshold halfway between the darkest eye pixels and the
+            # surrounding skin
+            patch = self._eye_patch(self.template)
+            threshold = (np.percentile(patch, 5) + np.median(self.template)) / 2.0
+            min_dark = max(2, int(width * DARK_ROW_FRACTION))
+            dark = self._dark_rows(patch, threshold, min_dark)
+            if dark > 0:
+                self.threshold = threshold
+                self.min_dark = min_dark
+                self.dark_ref = dark
+                self.ear_ref = float(ear)
+
+    def _eye_patch(self, image):
+        bx0, by0, bx1, by1 = self.box
+        return image[by0:by1, bx0:bx1]
+
+    @staticmethod
+    def _dark_rows(patch, threshold, min_dark):
+        return int(np.count_nonzero(np.count_nonzero(patch < threshold, axis=1) >= min_dark))
+
+    def estimate(self, gray):
+        """
+        Find the eye near its last position and estimate its EAR
+
+        Args:
+            gray: Grayscale frame
+
+        Returns:
+            tuple: (ear, dx, dy) with the EAR proxy and the eye's shift
+            since calibration, or None if the eye was not found
+        """
+        frame_h, frame_w = gray.shape[:2]
+        th, tw = self.template.shape
+        ox, oy = self.origin
+        search = int(round(tw * SEARCH_PAD))
+        sx0, sy0 = max(ox - search, 0), max(oy - search, 0)
+        sx1, sy1 = min(ox + tw + search, frame_w), min(oy + th + search, frame_h)
+        if sx1 - sx0 < tw or sy1 - sy0 < th:
+            return None
+
+        scores = cv2.matchTemplate(gray[sy0:sy1, sx0:sx1], self.template, cv2.TM_CCOEFF_NORMED)
+        _, score, _, (mx, my) = cv2.minMaxLoc(scores)
+        if score < self.min_match:
+            return None
+
+        x, y = sx0 + mx, sy0 + my
+        patch = self._eye_patch(gray[y:y + th, x:x + tw])
+        dark = self._dark_rows(patch, self.threshold, self.min_dark)
+        return self.ear_ref * dark / self.dark_ref, x - ox, y - oy
+
+
+class EyeROITracker:
+    """
+    Fast-path state of both eyes of one face
+
+    Holds the landmarks of the last full fit, so frames measured from the
+    ROIs still have landmarks (shifted with the eyes) for the overlay.
+    """
+
+    def __init__(self, eye_indices, min_match=0.4):
+        """
+        Args:
+            eye_indices: [left, right] eye contour indices of the backend
+            min_match: Minimum template correlation (see EyeROI)
+        """
+        self.eye_indices = eye_indices
+        self.eyes = (EyeROI(min_match), EyeROI(min_match))
+        self.points = None
+
+    @property
+    def calibrated(self):
+        return self.points is not None and all(eye.calibrated for eye in self.eyes)
+
+    def calibrate(self, gray, points, ears, ear_threshold):
+        """
+        Refresh templates from a full landmark fit
+
+        Args:
+            gray: Grayscale frame
+            points: (N, 2) landmarks of the face
+            ears: [left, right] landmark EARs
+            ear_threshold: Closed-eye EAR threshold
+        """
+        self.points = points
+        for eye, indices, ear in zip(self.eyes, self.eye_indices, ears):
+            eye.calibrate(gray, points[indices], ear, ear_threshold)
+
+    def estimate(self, gray):
+        """
+        Estimate both eyes' EAR from their ROIs
+
+        Returns:
+            tuple: (points, ears) with the last fit's landmarks shifted by
+            the mean eye motion and the [left, right] EAR proxies, or None
+            if either eye was lost
+        """
+        results = [eye.estimate(gray) for eye in self.eyes]
+        if results[0] is None or results[1] is None:
+            return None
+        (left, ldx, ldy), (right, rdx, rdy) = results
+        shift = np.array([(ldx + rdx) / 2.0, (ldy + rdy) / 2.0], dtype=np.float32)
+        return self.points + shift, (left, right)
@@ -0,0 +1,165 @@
+"""
+Per-face track state for multi-person blink detection
+Faces are associated across frames by IoU matching of their rectangles
+"""
+
+from blink_state import BlinkStateMachine
+from session_metrics import BlinkRates, DurationStats, PerclosWindow, DEFAULT_RATE_WINDOWS
+
+
+# Status text of a face with open eyes, closed eyes and drowsiness
+STATUS_LABELS = ("Eyes Open", "Eyes Closed", "DROWSY ALERT!")
+
+
+def rect_iou(a, b):
+    """Intersection-over-union of two dlib rectangles"""
+    ix = max(0, min(a.right(), b.right()) - max(a.left(), b.left()))
+    iy = max(0, min(a.bottom(), b.bottom()) - max(a.top(), b.top()))
+    inter = ix * iy
+    union = a.area() + b.area() - inter
+    return inter / union if union > 0 else 0.0
+
+
+def match_tracks(tracks, faces, min_iou=0.3):
+    """
+    Greedily associate face rectangles with existing tracks by IoU
+
+    Pairs are taken in order of decreasing overlap, so each track and each
+    face is used at most once.
+
+    Args:
+        tracks: List of FaceTrack
+        faces: List of dlib rectangles from this frame
+        min_iou: Minimum overlap for a pair to be considered the same face
+
+    Returns:
+        tuple: (matches, unmatched_tracks, unmatched_faces) where matches
+        is a list of (track, face) pairs
+    """
+    pairs = []
+    for ti, track in enumerate(tracks):
+        for fi, face in enumerate(faces):
+            iou = rect_iou(track.rect, face)
+            if iou >= min_iou:
+                pairs.append((iou, ti, fi))
+    pairs.sort(reverse=True)
+
+    used_tracks, used_faces, matches = set(), set(), []
+    for _, ti, fi in pairs:
+        if ti in used_tracks or fi in used_faces:
+            continue
+        used_tracks.add(ti)
+        used_faces.add(fi)
+        matches.append((tracks[ti], faces[fi]))
+
+    unmatched_tracks = [t for i, t in enumerate(tracks) if i not in used_tracks]
+    unmatched_faces = [f for i, f in enumerate(faces) if i not in used_faces]
+    return matches, unmatched_tracks, unmatched_faces
+
+
+class FaceTrack:
+    """
+    Tracking and blink state of one face
+    """
+
+    def __init__(self, track_id, rect, now, blink_params, refractory=0.0, smoothing=1,
+                 labels=STATUS_LABELS, rate_windows=DEFAULT_RATE_WINDOWS,
+                 perclos_window=60.0, perclos_fps=30.0):
+        """
+        Args:
+            track_id: ID assigned on first sight
+            rect: Face rectangle
+            now: Time the face was first seen
+            blink_params: Blink settings for this face's state machine
+            refractory: Minimum seconds between counted blinks
+            smoothing: Number of samples in the EAR moving average
+            labels: (open, closed, drowsy) status texts
+            rate_windows: Blink rate window lengths in seconds
+            perclos_window: PERCLOS window length in seconds
+            perclos_fps: Expected frame rate sizing the PERCLOS buffer
+        """
+        self.track_id = track_id
+        self.rect = rect
+        self.first_seen = now
+
+        # Tracking between detections
+        self.missed = 0
+        self.offsets = None
+        self.correlation = None
+        self.eye_rois = None
+
+        # Blink state
+        self.blink = BlinkStateMachine(blink_params, refractory, smoothing)
+        self.labels = labels
+        self.blink_rates = BlinkRates(rate_windows)
+        self.blink_durations = DurationStats()
+
+        # Fatigue: share of recent frames with closed eyes
+        self.perclos = PerclosWindow(perclos_window, perclos_fps)
+        self.perclos_drowsy = False
+
+    @property
+    def total_blinks(self):
+        return self.blink.total_blinks
+
+    @property
+    def frame_counter(self):
+        return self.blink.frame_counter
+
+    @property
+    def eyes_closed_start(self):
+        return self.blink.eyes_closed_start
+
+    @property
+    def is_drowsy(self):
+        return self.blink.is_drowsy or self.perclos_drowsy
+
+    @property
+    def current_ear(self):
+        return self.blink.current_ear
+
+    @property
+    def status(self):
+        eyes_open, eyes_closed, drowsy = self.labels
+        if self.is_drowsy:
+            return drowsy
+        if self.blink.closed:
+            return eyes_closed
+        return eyes_open
+
+    def update_perclos(self, now, threshold):
+        """
+        Record this frame's eye state in the PERCLOS window
+
+        Args:
+            now: Frame time in seconds
+            threshold: PERCLOS at or above which the face counts as
+                drowsy once the window is full (None disables)
+        """
+        self.perclos.add(now, self.blink.closed)
+        self.perclos_drowsy = (threshold is not None and self.perclos.full
+                               and self.perclos.value >= threshold)
+
+    def get_blink_rate(self, current_time):
+        """Calculate this face's blinks per minute"""
+        return self.blink_rates.rate(current_time)
+
+    def get_stats(self, current_time):
+        """
+        Get statistics for this face
+
+        Returns:
+            dict: Statistics dictionary
+        """
+        return {
+            'face_id': self.track_id,
+            'total_blinks': self.total_blinks,
+            'current_ear': round(self.current_ear, 3),
+            'status': self.status,
+            'blink_rate': round(self.get_blink_rate(current_time), 2),
+            'blink_rates': self.blink_rates.rates(current_time),
+            'is_drowsy': self.is_drowsy,
+            'perclos': round(self.perclos.value, 3),
+            'blink_duration': self.blink_durations.summary(),
+            'tracked_duration': round(current_time - self.first_seen, 2)
+        }
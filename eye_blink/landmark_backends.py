@@ -0,0 +1,230 @@
+"""
+Facial landmark backends for the blink detectors
+A backend turns a grayscale frame into per-face landmarks. The dlib
+backend fits the 68-point predictor inside face rectangles found by the
+detector's HOG detector and trackers; the FaceMesh backend (MediaPipe)
+finds and tracks faces itself and needs no model download.
+"""
+
+from itertools import chain
+
+import model_registry
+from eye_metrics import EYE_INDICES, FACEMESH_EYE_INDICES, shape_to_array
+from startup import lazy_import
+
+cv2 = lazy_import("cv2")
+np = lazy_import("numpy")
+
+
+BACKENDS = ("dlib", "facemesh")
+
+
+class FaceBox:
+    """
+    Face rectangle with the dlib.rectangle accessors used by face tracking
+
+    Lets backends without dlib hand rectangles to the track matching;
+    `area()` counts pixels inclusively, exactly like dlib.
+    """
+
+    __slots__ = ("_left", "_top", "_right", "_bottom")
+
+    def __init__(self, left, top, right, bottom):
+        self._left = int(left)
+        self._top = int(top)
+        self._right = int(right)
+        self._bottom = int(bottom)
+
+    def left(self):
+        return self._left
+
+    def top(self):
+        return self._top
+
+    def right(self):
+        return self._right
+
+    def bottom(self):
+        return self._bottom
+
+    def width(self):
+        return self._right - self._left + 1
+
+    def height(self):
+        return self._bottom - self._top + 1
+
+    def area(self):
+        return self.width() * self.height()
+
+    def __repr__(self):
+        return f"FaceBox({self._left}, {self._top}, {self._right}, {self._bottom})"
+
+
+class LandmarkBackend:
+    """
+    Base landmark backend
+
+    Backends with `locates_faces` set find faces themselves (`locate`);
+    the others fit landmarks inside rectangles found by the detector
+    (`fit`). `eye_indices` selects the six EAR points of each eye from
+    the backend's landmark array.
+    """
+
+    name = None
+    eye_indices = EYE_INDICES
+    locates_faces = False
+
+    def fit(self, gray, faces):
+        """
+        Fit landmarks inside face rectangles
+
+        Args:
+            gray: Grayscale frame
+            faces: Face rectangles
+
+        Returns:
+            numpy array: (F, N, 2) landmarks, one set per rectangle
+        """
+        raise NotImplementedError(f"{type(self).__name__} does not fit landmarks in given faces")
+
+    def locate(self, gray):
+        """
+        Find faces and their landmarks
+
+        Args:
+            gray: Grayscale frame
+
+        Returns:
+            tuple: (faces, points) with one rectangle and one (N, 2)
+            landmark set per face; points is None when no face was found
+        """
+        raise NotImplementedError(f"{type(self).__name__} does not locate faces")
+
+    def reset(self):
+        """Forget tracking state, e.g. after seeking or on a new video"""
+
+    def close(self):
+        """Release backend resources"""
+
+
+class DlibBackend(LandmarkBackend):
+    """
+    dlib 68-point shape predictor, shared through model_registry
+    """
+
+    name = "dlib"
+
+    def __init__(self, predictor_path="shape_predictor_68_face_landmarks.dat"):
+        """
+        Args:
+            predictor_path: Path to the dlib facial landmark predictor
+
+        Raises:
+            RuntimeError: If the model cannot be loaded
+        """
+        try:
+            self.predictor = model_registry.get_shape_predictor(predictor_path)
+        except RuntimeError as e:
+            raise RuntimeError(
+                f"Error loading facial landmark predictor: {e}\n"
+                f"Please download the model from:\n"
+                f"http://dlib.net/files/shape_predictor_68_face_landmarks.dat.bz2"
+            )
+
+    def fit(self, gray, faces):
+        return np.stack([shape_to_array(self.predictor(gray, face)) for face in faces])
+
+
+class FaceMeshBackend(LandmarkBackend):
+    """
+    MediaPipe FaceMesh in video (tracking) mode
+
+    After the first detection the mesh is tracked from frame to frame and
+    its face detector only runs again when fewer than `max_faces` faces
+    are being tracked, so keep `max_faces` at the number of people
+    expected in view. Landmarks are float pixel coordinates.
+    """
+
+    name = "facemesh"
+    eye_indices = FACEMESH_EYE_INDICES
+    locates_faces = True
+
+    def __init__(self, max_faces=1, min_detection_confidence=0.5, min_tracking_confidence=0.5):
+        """
+        Args:
+            max_faces: Maximum number of faces to track
+            min_detection_confidence: Face detector confidence needed to
+                start tracking a face
+            min_tracking_confidence: Landmark confidence below which the
+                face detector is run again
+
+        Raises:
+            RuntimeError: If mediapipe is not installed
+        """
+        try:
+            import mediapipe
+        except ImportError:
+            raise RuntimeError("The FaceMesh backend requires mediapipe (pip install mediapipe)")
+
+        self.options = {
+            'static_image_mode': False,
+            'max_num_faces': int(max_faces),
+            'refine_landmarks': False,
+            'min_detection_confidence': min_detection_confidence,
+            'min_tracking_confidence': min_tracking_confidence,
+        }
+        self._face_mesh = mediapipe.solutions.face_mesh
+        self.mesh = self._face_mesh.FaceMesh(**self.options)
+
+    def locate(self, gray):
+        height, width = gray.shape[:2]
+        # FaceMesh takes RGB; the luma plane is replicated into all channels
+        image = cv2.cvtColor(gray, cv2.COLOR_GRAY2RGB) if gray.ndim == 2 else gray
+        results = self.mesh.process(image)
+        if not results.multi_face_landmarks:
+            return [], None
+
+        meshes = [face.landmark for face in results.multi_face_landmarks]
+        n = len(meshes[0])
+        points = np.empty((len(meshes), n, 2), dtype=np.float32)
+        for index, landmarks in enumerate(meshes):
+            points[index] = np.fromiter(chain.from_iterable((p.x, p.y) for p in landmarks),
+                                        dtype=np.float32, count=2 * n).reshape(n, 2)
+        points *= np.array([width, height], dtype=np.float32)
+
+        low = points.min(axis=1)
+        high = points.max(axis=1)
+        faces = [FaceBox(x0, y0, x1, y1) for (x0, y0), (x1, y1) in zip(low.tolist(), high.tolist())]
+        return faces, points
+
+    def reset(self):
+        self.mesh.close()
+        self.mesh = self._face_mesh.FaceMesh(**self.options)
+
+    def close(self):
+        self.mesh.close()
+
+
+def create_backend(name="dlib", predictor_path="shape_predictor_68_face_landmarks.dat",
+                   max_faces=1, min_detection_confidence=0.5):
+    """
+    Create a landmark backend by name
+
+    Args:
+        name: "dlib" or "facemesh"
+        predictor_path: dlib predictor model (dlib only)
+        max_faces: Maximum number of tracked faces (FaceMesh only)
+        min_detection_confidence: Face detection confidence (FaceMesh only)
+
+    Returns:
+        LandmarkBackend: New backend
+
+    Raises:
+        ValueError: If the backend name is unknown
+        RuntimeError: If the backend's model or package is unavailable
+    """
+    if name == "dlib":
+        return DlibBackend(predictor_path)
+    if name == "facemesh":
+        return FaceMeshBackend(max_faces, min_detection_confidence)
+    raise ValueError(f"Unknown landmark backend '{name}' (use {' or '.join(repr(b) for b in BACKENDS)})")
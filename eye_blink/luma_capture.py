@@ -0,0 +1,228 @@
+"""
+Luma-plane capture for grayscale-only detection
+Detection only looks at the luma (Y) plane, yet OpenCV normally converts
+every camera frame from the driver's YUV format to BGR, and the detector
+then converts it back to gray. A LumaCapture asks for YUYV with RGB
+conversion disabled and wraps each raw buffer in a LumaFrame: `gray` is
+the Y plane, and BGR is only produced when the frame is displayed or
+streamed.
+"""
+
+from startup import lazy_import
+
+cv2 = lazy_import("cv2")
+np = lazy_import("numpy")
+
+
+# Channel holding Y in packed 4:2:2 formats (two bytes per pixel)
+PACKED_LUMA_CHANNEL = {"YUYV": 0, "YUY2": 0, "YVYU": 0, "UYVY": 1}
+
+# cv2 conversion to BGR per FourCC (names, so cv2 stays lazily imported)
+BGR_CONVERSIONS = {
+    "YUYV": "COLOR_YUV2BGR_YUYV",
+    "YUY2": "COLOR_YUV2BGR_YUY2",
+    "YVYU": "COLOR_YUV2BGR_YVYU",
+    "UYVY": "COLOR_YUV2BGR_UYVY",
+    "I420": "COLOR_YUV2BGR_I420",
+    "YV12": "COLOR_YUV2BGR_YV12",
+    "NV12": "COLOR_YUV2BGR_NV12",
+    "NV21": "COLOR_YUV2BGR_NV21",
+}
+
+
+def fourcc_string(value):
+    """Decode a CAP_PROP_FOURCC value into its four characters"""
+    value = int(value)
+    return "".join(chr((value >> 8 * i) & 0xFF) for i in range(4))
+
+
+class LumaFrame:
+    """
+    One captured frame in the format the driver delivered it
+
+    The layout is taken from the buffer's shape, falling back to the
+    FourCC for raw single-row buffers:
+
+    - (H, W): the luma plane itself (grey cameras, and video files
+      decoded by FFmpeg, which hands over only the first plane)
+    - (H * 3/2, W): planar 4:2:0 (I420, YV12, NV12, NV21), whose full
+      Y plane comes first; `gray` is a zero-copy view
+    - (H, W, 2): packed 4:2:2; Y is interleaved with chroma, so `gray`
+      is one byte copy (dlib only accepts contiguous images)
+    - (H, W, 3): BGR from a driver that ignored the request
+    - compressed MJPEG: decoded straight to gray, skipping chroma
+
+    Drawing meant for the display is queued with `draw()` and applied
+    when `bgr()` first converts the frame.
+    """
+
+    def __init__(self, raw, fourcc, width, height):
+        """
+        Args:
+            raw: Buffer returned by VideoCapture.read()
+            fourcc: Pixel format reported by the capture
+            width: Frame width in pixels
+            height: Frame height in pixels
+
+        Raises:
+            ValueError: If the buffer layout is not recognized
+        """
+        self.raw = raw
+        self.fourcc = fourcc
+        self.width = width
+        self.height = height
+        self._bgr = None
+        self._pending = []
+        self.layout, self.image = self._parse(raw)
+        self.gray = self._luma()
+
+    @property
+    def shape(self):
+        return (self.height, self.width, 3)
+
+    def _parse(self, raw):
+        """Classify the buffer and reshape raw rows into an image (no copy)"""
+        height, width = self.height, self.width
+        if raw.ndim == 3:
+            if raw.shape[2] == 3:
+                return "bgr", raw
+            if raw.shape[2] == 2:
+                return "packed", raw
+        elif raw.ndim == 2 and raw.shape[0] > 1:
+            if raw.shape[0] == height * 3 // 2:
+                return "planar", raw
+            return "gray", raw
+
+        size = raw.size
+        if size == height * width * 2:
+            return "packed", raw.reshape(height, width, 2)
+        if size == height * width * 3 // 2:
+            return "planar", raw.reshape(height * 3 // 2, width)
+        if size == height * width:
+            return "gray", raw.reshape(height, width)
+        if self.fourcc == "MJPG":
+            return "mjpeg", raw.reshape(-1)
+        raise ValueError(f"Unrecognized {self.fourcc!r} frame buffer of {size} bytes "
+                         f"for {width}x{height}")
+
+    def _luma(self):
+        if self.layout == "gray":
+            return self.image
+        if self.layout == "planar":
+            return self.image[:self.image.shape[0] * 2 // 3]
+        if self.layout == "packed":
+            return np.ascontiguousarray(self.image[:, :, PACKED_LUMA_CHANNEL.get(self.fourcc, 0)])
+        if self.layout == "mjpeg":
+            return cv2.imdecode(self.image, cv2.IMREAD_GRAYSCALE)
+        self._bgr = self.image
+        return cv2.cvtColor(self.image, cv2.COLOR_BGR2GRAY)
+
+    def draw(self, callback):
+        """
+        Queue a drawing for the BGR image
+
+        Args:
+            callback: Called with the BGR image to draw on in place
+        """
+        if self._bgr is not None and not self._pending:
+            callback(self._bgr)
+        else:
+            self._pending.append(callback)
+
+    def bgr(self):
+        """
+        Get the frame as BGR, converting it on first use
+
+        Returns:
+            numpy array: (H, W, 3) BGR image with queued drawings applied
+        """
+        if self._bgr is None:
+            if self.layout == "gray":
+                self._bgr = cv2.cvtColor(self.image, cv2.COLOR_GRAY2BGR)
+            elif self.layout == "mjpeg":
+                self._bgr = cv2.imdecode(self.image, cv2.IMREAD_COLOR)
+            else:
+                default = "YUYV" if self.layout == "packed" else "I420"
+                code = BGR_CONVERSIONS.get(self.fourcc, BGR_CONVERSIONS[default])
+                self._bgr = cv2.cvtColor(self.image, getattr(cv2, code))
+        for callback in self._pending:
+            callback(self._bgr)
+        self._pending.clear()
+        return self._bgr
+
+
+def as_bgr(frame):
+    """Return a BGR image for a LumaFrame or an already BGR frame"""
+    return frame.bgr() if isinstance(frame, LumaFrame) else frame
+
+
+def to_gray(frame):
+    """Return the luma plane of a LumaFrame, or convert a BGR frame"""
+    if isinstance(frame, LumaFrame):
+        return frame.gray
+    return cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+
+
+class LumaCapture:
+    """
+    cv2.VideoCapture whose read() returns LumaFrames
+
+    Everything else (get, set, isOpened, release, ...) is forwarded to
+    the wrapped capture, so clocks and callers use it unchanged.
+    """
+
+    def __init__(self, source, fourcc="YUYV", width=None, height=None, fps=None):
+        """
+        Args:
+            source: Camera index or video file path
+            fourcc: Pixel format requested from cameras; video files
+                keep their codec's format
+            width: Requested frame width (cameras only)
+            height: Requested frame height (cameras only)
+            fps: Requested frame rate (cameras only)
+        """
+        self.cap = cv2.VideoCapture(source)
+        if isinstance(source, int):
+            self.cap.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*fourcc))
+            if width:
+                self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, width)
+            if height:
+                self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, height)
+            if fps:
+                self.cap.set(cv2.CAP_PROP_FPS, fps)
+        self.cap.set(cv2.CAP_PROP_CONVERT_RGB, 0)
+        self.fourcc = fourcc_string(self.cap.get(cv2.CAP_PROP_FOURCC))
+        self.width = int(self.cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+        self.height = int(self.cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+
+    def read(self):
+        """
+        Grab and wrap the next frame
+
+        Returns:
+            tuple: (success, LumaFrame or None)
+        """
+        ret, raw = self.cap.read()
+        if not ret or raw is None:
+            return False, None
+        return True, LumaFrame(raw, self.fourcc, self.width, self.height)
+
+    def __getattr__(self, name):
+        return getattr(self.cap, name)
+
+
+def open_capture(source, luma=False, **options):
+    """
+    Open a plain BGR capture or a LumaCapture
+
+    Args:
+        source: Camera index or video file path
+        luma: Deliver LumaFrames (see LumaCapture)
+        **options: LumaCapture options
+
+    Returns:
+        cv2.VideoCapture or LumaCapture
+    """
+    if luma:
+        return LumaCapture(source, **options)
+    return cv2.VideoCapture(source)
@@ -0,0 +1,126 @@
+"""
+Process-wide dlib model registry
+The ~100 MB landmark predictor is loaded once per process and shared by
+every detector. Preloading before worker processes are forked lets the
+workers inherit the loaded model instead of deserializing it again.
+"""
+
+import multiprocessing
+import os
+import sys
+import threading
+import time
+
+from startup import lazy_import
+
+dlib = lazy_import("dlib")
+
+
+_lock = threading.Lock()
+_predictors = {}
+_load_times = {}
+_hits = {}
+
+# HOG detectors keep per-call scan state, so each thread gets its own;
+# they are small and load in milliseconds
+_local = threading.local()
+
+
+def get_shape_predictor(predictor_path="shape_predictor_68_face_landmarks.dat"):
+    """
+    Get the shared landmark predictor for a model file, loading it on first use
+
+    Args:
+        predictor_path: Path to the dlib shape predictor model
+
+    Returns:
+        dlib.shape_predictor: Shared predictor (safe to use from any thread)
+
+    Raises:
+        RuntimeError: If the model cannot be loaded (from dlib)
+    """
+    key = os.path.abspath(predictor_path)
+    with _lock:
+        predictor = _predictors.get(key)
+        if predictor is not None:
+            _hits[key] += 1
+            return predictor
+
+        start = time.perf_counter()
+        predictor = dlib.shape_predictor(predictor_path)
+        _load_times[key] = time.perf_counter() - start
+        _predictors[key] = predictor
+        _hits[key] = 0
+        return predictor
+
+
+def get_face_detector():
+    """
+    Get this thread's HOG frontal face detector
+
+    Detectors look this up on every call, so a detector built on one
+    thread and run on another still uses the running thread's copy.
+
+    Returns:
+        dlib face detector
+    """
+    detector = getattr(_local, "face_detector", None)
+    if detector is None:
+        start = time.perf_counter()
+        detector = dlib.get_frontal_face_detector()
+        _local.face_detector = detector
+        with _lock:
+            _load_times.setdefault("face_detector", time.perf_counter() - start)
+    return detector
+
+
+def preload(predictor_path="shape_predictor_68_face_landmarks.dat"):
+    """
+    Load the models now, e.g. before starting worker processes
+
+    Returns:
+        float: Seconds spent loading the predictor (0 if already loaded)
+    """
+    key = os.path.abspath(predictor_path)
+    already_loaded = key in _predictors
+    get_shape_predictor(predictor_path)
+    get_face_detector()
+    return 0.0 if already_loaded else _load_times[key]
+
+
+def fork_context():
+    """
+    Multiprocessing context whose workers inherit preloaded models
+
+    Forking is only used on Linux, where it is the default. macOS makes
+    "spawn" the default because forking a process that has loaded system
+    frameworks can crash, so elsewhere the platform default is kept and
+    workers load the models themselves.
+
+    Returns:
+        Context: "fork" on Linux, otherwise the platform default
+    """
+    if sys.platform.startswith("linux"):
+        return multiprocessing.get_context("fork")
+    return multiprocessing.get_context()
+
+
+def get_stats():
+    """
+    Get load statistics of every loaded model
+
+    Returns:
+        list: One dict per model with its path, load time and the number
+        of times the cached copy was reused
+    """
+    with _lock:
+        return [{'model': key, 'load_seconds': round(seconds, 3), 'reused': _hits.get(key, 0)}
+                for key, seconds in _load_times.items()]
+
+
+def report():
+    """Print model load times"""
+    for stats in get_stats():
+        name = os.path.basename(stats['model'])
+        reused = f", reused {stats['reused']}x" if stats['reused'] else ""
+        print(f"  {name}: loaded in {stats['load_seconds']:.2f}s{reused}")
@@ -0,0 +1,283 @@
+"""
+EAR Trace Replay
+Records, generates and replays (timestamp, left_ear, right_ear) traces
+through the blink state machine, without a camera or predictor file
+"""
+
+import argparse
+import csv
+import time
+
+import numpy as np
+
+from blink_state import BlinkParams, BlinkStateMachine, replay_trace
+from detection_core import MODES
+
+# Values of the optional `label` column
+LABEL_OPEN = 0
+LABEL_BLINK = 1
+LABEL_DROWSY = 2
+
+
+def load_trace(path):
+    """
+    Load an EAR trace CSV
+
+    Columns: timestamp, left_ear, right_ear and optionally label
+    (0 open, 1 blink, 2 drowsy closure).
+
+    Returns:
+        dict: 'timestamp', 'left_ear', 'right_ear' arrays and 'label'
+        (int array, or None when the trace is unlabeled)
+    """
+    with open(path, newline='') as f:
+        reader = csv.reader(f)
+        header = next(reader)
+        rows = np.array([row for row in reader], dtype=np.float64).reshape(-1, len(header))
+    columns = {name: rows[:, i] for i, name in enumerate(header)}
+    label = columns.get('label')
+    return {
+        'timestamp': columns['timestamp'],
+        'left_ear': columns['left_ear'],
+        'right_ear': columns['right_ear'],
+        'label': None if label is None else label.astype(np.int8)
+    }
+
+
+def save_trace(path, trace):
+    """Write a trace dict (see load_trace) to CSV"""
+    header = ['timestamp', 'left_ear', 'right_ear']
+    columns = [trace['timestamp'], trace['left_ear'], trace['right_ear']]
+    if trace.get('label') is not None:
+        header.append('label')
+        columns.append(trace['label'])
+    with open(path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(header)
+        for row in zip(*columns):
+            writer.writerow([f"{row[0]:.6f}", f"{row[1]:.5f}", f"{row[2]:.5f}", *row[3:]])
+
+
+def synthetic_trace(seconds=600.0, fps=30.0, blink_rate=17.0, drowsy_rate=0.5,
+                    open_ear=0.30, closed_ear=0.08, noise=0.015, seed=0):
+    """
+    Generate a labeled EAR trace with blinks and drowsy closures
+
+    Blinks last 100-400 ms with a V-shaped EAR dip; drowsy closures
+    last 1.5-4 s. Both are placed as Poisson events.
+
+    Args:
+        seconds: Trace length
+        fps: Sample rate
+        blink_rate: Blinks per minute
+        drowsy_rate: Drowsy closures per minute
+        open_ear: Baseline EAR of open eyes
+        closed_ear: EAR of fully closed eyes
+        noise: Standard deviation of per-sample noise
+        seed: Random seed
+
+    Returns:
+        dict: Trace (see load_trace)
+    """
+    rng = np.random.default_rng(seed)
+    n = int(seconds * fps)
+    timestamp = np.arange(n) / fps
+    ear = np.full(n, open_ear)
+    label = np.zeros(n, dtype=np.int8)
+
+    events = [(t, LABEL_BLINK) for t in np.cumsum(rng.exponential(60.0 / blink_rate, n // 2))]
+    if drowsy_rate > 0:
+        events += [(t, LABEL_DROWSY) for t in np.cumsum(rng.exponential(60.0 / drowsy_rate, n // 2))]
+    events.sort()
+
+    free_from = 0
+    for start_time, kind in events:
+        start = int(start_time * fps)
+        if start >= n:
+            break
+        if start < free_from:
+            continue
+        duration = rng.uniform(0.1, 0.4) if kind == LABEL_BLINK else rng.uniform(1.5, 4.0)
+        length = max(2, int(round(duration * fps)))
+        end = min(n, start + length)
+        if kind == LABEL_BLINK:
+            depth = 1.0 - np.abs(np.linspace(-1.0, 1.0, length))
+            ear[start:end] = open_ear - (open_ear - closed_ear) * depth[:end - start]
+        else:
+            ear[start:end] = closed_ear
+        label[start:end] = kind
+        free_from = end + int(0.3 * fps)
+
+    left = ear + rng.normal(0.0, noise, n)
+    right = ear + rng.normal(0.0, noise, n)
+    return {'timestamp': timestamp, 'left_ear': left, 'right_ear': right, 'label': label}
+
+
+def record_trace(source, max_frames=None, config=None):
+    """
+    Record the EAR trace of the largest face in a video or camera
+
+    Returns:
+        dict: Trace (see load_trace), without labels
+    """
+    # Only recording needs OpenCV and dlib; replaying works without them
+    import cv2
+    from blink_detector import EyeBlinkDetector
+    from clocks import CaptureClock, VideoClock
+
+    cap = cv2.VideoCapture(source)
+    if not cap.isOpened():
+        raise RuntimeError(f"Cannot open video source: {source}")
+    clock = CaptureClock(cap) if isinstance(source, int) else VideoClock(cap)
+    detector = EyeBlinkDetector.from_config(config or {}, clock=clock, overlay=False)
+
+    rows = []
+    frames = 0
+    while max_frames is None or frames < max_frames:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        frames += 1
+        timestamp = clock.stamp()
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        tracks, _, ears = detector.measure_faces(gray, timestamp)
+        if not tracks:
+            continue
+        primary = max(range(len(tracks)), key=lambda i: tracks[i].rect.area())
+        rows.append((timestamp, ears[primary, 0], ears[primary, 1]))
+    cap.release()
+
+    rows = np.array(rows, dtype=np.float64).reshape(-1, 3)
+    return {'timestamp': rows[:, 0], 'left_ear': rows[:, 1], 'right_ear': rows[:, 2], 'label': None}
+
+
+def step_trace(trace, params, refractory=0.0, smoothing=1):
+    """
+    Feed a trace through BlinkStateMachine one sample at a time
+
+    Reference implementation for checking replay_trace.
+
+    Returns:
+        dict: Same layout as replay_trace
+    """
+    machine = BlinkStateMachine(params, refractory, smoothing)
+    blinks = []
+    drowsy_starts = []
+    was_drowsy = False
+    for t, left, right in zip(trace['timestamp'].tolist(), trace['left_ear'].tolist(),
+                              trace['right_ear'].tolist()):
+        event = machine.update(t, left, right)
+        if event is not None:
+            blinks.append(event)
+        if machine.is_drowsy and not was_drowsy:
+            drowsy_starts.append(t)
+        was_drowsy = machine.is_drowsy
+    return {'blinks': blinks, 'drowsy_starts': drowsy_starts}
+
+
+def parse_args():
+    """Parse command-line options"""
+    parser = argparse.ArgumentParser(description="Record, generate and replay EAR traces")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run = commands.add_parser("run", help="replay a trace through the blink logic")
+    run.add_argument("trace", help="trace CSV (timestamp,left_ear,right_ear[,label])")
+    run.add_argument("--mode", choices=sorted(MODES), default="classic",
+                     help="blink logic of EyeBlinkDetector (classic) or "
+                          "ModernBlinkDetector (modern)")
+    run.add_argument("--ear-threshold", type=float, default=0.25)
+    run.add_argument("--consec-frames", type=int, default=None,
+                     help="default: 3 (classic) or 2 (modern)")
+    run.add_argument("--drowsiness-threshold", type=float, default=1.5)
+    run.add_argument("--repeat", type=int, default=1,
+                     help="replay N times to measure throughput (default: 1)")
+    run.add_argument("--check", action="store_true",
+                     help="also step the state machine per sample and compare")
+    run.add_argument("--events", action="store_true", help="print every blink")
+
+    synth = commands.add_parser("synthetic", help="generate a labeled trace")
+    synth.add_argument("output", help="output CSV")
+    synth.add_argument("--seconds", type=float, default=600.0)
+    synth.add_argument("--fps", type=float, default=30.0)
+    synth.add_argument("--blink-rate", type=float, default=17.0, help="blinks per minute")
+    synth.add_argument("--drowsy-rate", type=float, default=0.5,
+                       help="drowsy closures per minute")
+    synth.add_argument("--noise", type=float, default=0.015)
+    synth.add_argument("--seed", type=int, default=0)
+
+    record = commands.add_parser("record", help="record a trace from a video or camera")
+    record.add_argument("source", help="video file path or camera index")
+    record.add_argument("output", help="output CSV")
+    record.add_argument("--frames", type=int, default=None, help="stop after N frames")
+    record.add_argument("--config", default="config.json",
+                        help="path to config file (default: config.json)")
+    return parser.parse_args()
+
+
+def run_replay(args):
+    trace = load_trace(args.trace)
+    mode = MODES[args.mode]
+    refractory, smoothing = mode.refractory, mode.smoothing
+    params = BlinkParams(args.ear_threshold,
+                         args.consec_frames if args.consec_frames is not None else mode.consec_frames,
+                         args.drowsiness_threshold)
+    samples = len(trace['timestamp'])
+
+    start = time.perf_counter()
+    for _ in range(max(1, args.repeat)):
+        result = replay_trace(trace['timestamp'], trace['left_ear'], trace['right_ear'],
+                              params, refractory, smoothing)
+    elapsed = (time.perf_counter() - start) / max(1, args.repeat)
+
+    duration = trace['timestamp'][-1] - trace['timestamp'][0] if samples > 1 else 0.0
+    print(f"Samples: {samples} ({duration:.1f}s of trace)")
+    print(f"Blinks: {len(result['blinks'])}")
+    if duration > 0:
+        print(f"Blink Rate: {len(result['blinks']) / duration * 60:.2f} blinks/minute")
+    print(f"Drowsiness Episodes: {len(result['drowsy_starts'])}")
+    print(f"Replay: {elapsed * 1000:.2f} ms ({samples / max(elapsed, 1e-9) / 1e6:.1f}M samples/s)")
+
+    if args.events:
+        for number, event in enumerate(result['blinks'], 1):
+            print(f"  #{number} t={event.timestamp:.3f}s ear={event.ear:.3f} "
+                  f"frames={event.duration_frames} duration={event.duration * 1000:.0f}ms")
+
+    if args.check:
+        start = time.perf_counter()
+        reference = step_trace(trace, params, refractory, smoothing)
+        step_elapsed = time.perf_counter() - start
+        match = reference == result
+        print(f"Per-sample state machine: {step_elapsed * 1000:.2f} ms "
+              f"({samples / max(step_elapsed, 1e-9) / 1e6:.2f}M samples/s) - "
+              f"{'✅ identical' if match else '❌ results differ'}")
+        return match
+    return True
+
+
+def main():
+    args = parse_args()
+
+    if args.command == "run":
+        if not run_replay(args):
+            raise SystemExit(1)
+    elif args.command == "synthetic":
+        trace = synthetic_trace(args.seconds, args.fps, args.blink_rate, args.drowsy_rate,
+                                noise=args.noise, seed=args.seed)
+        save_trace(args.output, trace)
+        labels = trace['label']
+        blinks = int(np.sum(np.diff(labels == LABEL_BLINK, prepend=False) & (labels == LABEL_BLINK)))
+        print(f"Saved {len(labels)} samples with {blinks} blinks to {args.output}")
+    elif args.command == "record":
+        from blink_detector import load_config
+        source = int(args.source) if args.source.isdigit() else args.source
+        try:
+            trace = record_trace(source, args.frames, load_config(args.config))
+        except RuntimeError as e:
+            print(f"\nError: {e}")
+            return
+        save_trace(args.output, trace)
+        print(f"Saved {len(trace['timestamp'])} samples to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
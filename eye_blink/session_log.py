@@ -0,0 +1,316 @@
+"""
+Long-session blink logging
+Blink events are appended to an on-disk CSV log by a background writer
+thread, and per-frame measurements are folded into per-minute rollups,
+so memory stays flat however long a session runs and a crash loses at
+most the rows still queued for the writer.
+"""
+
+import atexit
+import csv
+import os
+import queue
+import threading
+from collections import deque
+from datetime import datetime
+
+
+BLINK_FIELDS = ('timestamp', 'blink_number', 'ear_value', 'duration_frames', 'duration_ms', 'face_id')
+MINUTE_FIELDS = ('minute', 'frames', 'blinks', 'mean_ear', 'mean_duration_ms', 'perclos')
+
+# Leading column of both session logs; blink numbers and minute indexes
+# restart with every session, so rows are only unique per session
+SESSION_FIELD = 'session_id'
+
+# Completed minutes kept in memory (one day); older ones are only on disk
+DEFAULT_MAX_MINUTES = 24 * 60
+
+
+class MinuteRollup:
+    """
+    Aggregates of one minute of a session
+    """
+
+    __slots__ = ('minute', 'frames', 'ear_sum', 'closed', 'blinks', 'duration_sum')
+
+    def __init__(self, minute):
+        self.minute = minute
+        self.frames = 0
+        self.ear_sum = 0.0
+        self.closed = 0
+        self.blinks = 0
+        self.duration_sum = 0.0
+
+    def to_row(self):
+        """
+        Get the minute as a log row
+
+        Returns:
+            dict: Row with MINUTE_FIELDS; means are empty when the minute
+            has no frames or no blinks
+        """
+        return {
+            'minute': self.minute,
+            'frames': self.frames,
+            'blinks': self.blinks,
+            'mean_ear': round(self.ear_sum / self.frames, 3) if self.frames else '',
+            'mean_duration_ms': round(self.duration_sum / self.blinks * 1000, 1) if self.blinks else '',
+            'perclos': round(self.closed / self.frames, 3) if self.frames else '',
+        }
+
+
+class MinuteRollups:
+    """
+    Per-minute count, mean EAR, mean blink duration and PERCLOS
+
+    Only the minute in progress is updated; completed minutes are handed
+    to `on_complete` (e.g. the session log) and the most recent
+    `max_minutes` of them are kept in memory.
+    """
+
+    def __init__(self, max_minutes=DEFAULT_MAX_MINUTES, on_complete=None):
+        """
+        Args:
+            max_minutes: Completed minutes kept in memory
+            on_complete: Called with the row of every completed minute
+        """
+        self.completed = deque(maxlen=max(1, int(max_minutes)))
+        self.on_complete = on_complete
+        self.current = None
+
+    def _bucket(self, minute):
+        current = self.current
+        if current is None or minute > current.minute:
+            if current is not None:
+                self._complete(current)
+            current = self.current = MinuteRollup(minute)
+        return current
+
+    def _complete(self, rollup):
+        row = rollup.to_row()
+        self.completed.append(row)
+        if self.on_complete is not None:
+            self.on_complete(row)
+
+    def add_frame(self, minute, ear, closed):
+        """Record one frame's EAR and eye state"""
+        bucket = self._bucket(minute)
+        bucket.frames += 1
+        bucket.ear_sum += ear
+        if closed:
+            bucket.closed += 1
+
+    def add_blink(self, minute, duration):
+        """Record one blink and its duration in seconds"""
+        bucket = self._bucket(minute)
+        bucket.blinks += 1
+        bucket.duration_sum += duration
+
+    def rows(self):
+        """
+        Get the minutes held in memory, oldest first
+
+        Returns:
+            list: Rows of the completed minutes and the one in progress
+        """
+        rows = list(self.completed)
+        if self.current is not None:
+            rows.append(self.current.to_row())
+        return rows
+
+    def clear(self):
+        self.completed.clear()
+        self.current = None
+
+
+class LogRange:
+    """
+    Rows appended to a log file between two byte offsets
+
+    Iterating reads them back from disk as dicts one line at a time, so
+    neither a snapshot nor a pass over it holds the whole range.
+    """
+
+    def __init__(self, path, fieldnames, start, end):
+        self.path = path
+        self.fieldnames = fieldnames
+        self.start = start
+        self.end = end
+
+    @property
+    def size(self):
+        """Length of the range in bytes"""
+        return max(0, self.end - self.start)
+
+    def _lines(self, f):
+        remaining = self.size
+        for line in f:
+            if remaining <= 0:
+                break
+            line = line[:remaining]
+            remaining -= len(line)
+            yield line.decode('utf-8')
+
+    def __iter__(self):
+        if self.size == 0:
+            return
+        with open(self.path, 'rb') as f:
+            f.seek(self.start)
+            yield from csv.DictReader(self._lines(f), fieldnames=self.fieldnames)
+
+    def copy_to(self, f, chunk_size=64 * 1024, on_chunk=None):
+        """
+        Copy the raw CSV rows to an open binary file
+
+        Args:
+            f: Destination file
+            chunk_size: Bytes read and written at a time
+            on_chunk: Called with every chunk after it is written
+        """
+        with open(self.path, 'rb') as src:
+            src.seek(self.start)
+            remaining = self.size
+            while remaining > 0:
+                chunk = src.read(min(chunk_size, remaining))
+                if not chunk:
+                    break
+                f.write(chunk)
+                remaining -= len(chunk)
+                if on_chunk is not None:
+                    on_chunk(chunk)
+
+
+def new_session_id():
+    """Session ID from the current time, e.g. "20251102_143215_234567" """
+    return datetime.now().strftime('%Y%m%d_%H%M%S_%f')
+
+
+class SessionLog:
+    """
+    Append-only CSV logs of blink events and completed minutes
+
+    `<path>` receives one row per blink and `<path stem>_minutes.csv` one
+    row per completed minute. Rows are queued by the detection thread and
+    written by a single background thread, which flushes after every
+    batch. Existing logs are appended to, never truncated. Every row
+    starts with the ID of the session it belongs to, so sessions stay
+    apart on disk across resets and restarts; `mark()` starts a new one.
+    """
+
+    def __init__(self, path):
+        """
+        Args:
+            path: Blink log CSV path; its directory is created if needed
+        """
+        self.paths = {
+            'blinks': path,
+            'minutes': os.path.splitext(path)[0] + "_minutes.csv",
+        }
+        self.fieldnames = {
+            'blinks': (SESSION_FIELD,) + BLINK_FIELDS,
+            'minutes': (SESSION_FIELD,) + MINUTE_FIELDS,
+        }
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        for kind, log_path in self.paths.items():
+            self._check_header(log_path, self.fieldnames[kind])
+
+        self._files = {}
+        self._writers = {}
+        self._sizes = {}
+        for kind, log_path in self.paths.items():
+            f = open(log_path, 'a', newline='')
+            writer = csv.DictWriter(f, fieldnames=self.fieldnames[kind])
+            if f.tell() == 0:
+                writer.writeheader()
+                f.flush()
+            self._files[kind] = f
+            self._writers[kind] = writer
+            self._sizes[kind] = f.tell()
+        self._marks = dict(self._sizes)
+        self.session_id = new_session_id()
+
+        self._queue = queue.Queue()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="session-log", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    @staticmethod
+    def _check_header(path, fieldnames):
+        """Refuse to append to a log written with other columns"""
+        if not os.path.exists(path) or os.path.getsize(path) == 0:
+            return
+        with open(path, newline='') as f:
+            header = next(csv.reader(f), [])
+        if tuple(header) != fieldnames:
+            raise ValueError(f"{path} has columns {header}, expected {list(fieldnames)}; "
+                             f"use a new log path")
+
+    def log_blink(self, row):
+        """Queue one blink row (a dict with BLINK_FIELDS)"""
+        self._queue.put(('blinks', dict(row, session_id=self.session_id)))
+
+    def log_minute(self, row):
+        """Queue one completed minute row (a dict with MINUTE_FIELDS)"""
+        self._queue.put(('minutes', dict(row, session_id=self.session_id)))
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            batch = [item]
+            while True:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            written = set()
+            for entry in batch:
+                if entry is None:
+                    continue
+                kind, row = entry
+                self._writers[kind].writerow(row)
+                written.add(kind)
+            for kind in written:
+                self._files[kind].flush()
+                self._sizes[kind] = self._files[kind].tell()
+            for _ in batch:
+                self._queue.task_done()
+            if None in batch:
+                return
+
+    def flush(self):
+        """Wait until every queued row is on disk"""
+        if not self._closed:
+            self._queue.join()
+
+    def mark(self):
+        """Start a new session with a new ID; later snapshots only cover rows from here"""
+        self.flush()
+        self._marks = dict(self._sizes)
+        self.session_id = new_session_id()
+
+    def snapshot(self, kind='blinks'):
+        """
+        Get the current session's rows of one log
+
+        Args:
+            kind: "blinks" or "minutes"
+
+        Returns:
+            LogRange: Rows written since the last mark
+        """
+        self.flush()
+        return LogRange(self.paths[kind], self.fieldnames[kind], self._marks[kind], self._sizes[kind])
+
+    def close(self):
+        """Write out queued rows and close the log files"""
+        if self._closed:
+            return
+        self._queue.put(None)
+        self._queue.join()
+        self._thread.join()
+        self._closed = True
+        for f in self._files.values():
+            f.close()
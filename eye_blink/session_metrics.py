@@ -0,0 +1,238 @@
+"""
+Rolling session metrics for the blink detectors
+Every metric is updated incrementally as frames and blinks arrive, so
+queries cost the same whether a session is one minute or eight hours old.
+"""
+
+import math
+from collections import deque
+
+from startup import lazy_import
+
+np = lazy_import("numpy")
+
+
+# Blink rate windows reported by get_stats, in seconds; `blink_rate` is
+# the one-minute window
+DEFAULT_RATE_WINDOWS = (10, 60, 300)
+PRIMARY_RATE_WINDOW = 60
+
+
+def window_label(seconds):
+    """Short label of a window length, e.g. "10s" or "5min" """
+    seconds = float(seconds)
+    if seconds >= 60 and seconds % 60 == 0:
+        return f"{int(seconds // 60)}min"
+    return f"{seconds:g}s"
+
+
+class SlidingWindowRate:
+    """
+    Blinks per minute over the most recent `window` seconds
+
+    Blink times are kept in arrival order and expired ones are evicted
+    from the front on every insert and query, so both are O(1)
+    amortized. Blink times must not decrease.
+    """
+
+    def __init__(self, window=PRIMARY_RATE_WINDOW):
+        """
+        Args:
+            window: Window length in seconds
+        """
+        self.window = float(window)
+        self.times = deque()
+
+    def _evict(self, now):
+        times = self.times
+        while times and now - times[0] > self.window:
+            times.popleft()
+
+    def add(self, timestamp):
+        """Record a blink at `timestamp`"""
+        self.times.append(timestamp)
+        self._evict(timestamp)
+
+    def count(self, now):
+        """Number of blinks within the window ending at `now`"""
+        self._evict(now)
+        return len(self.times)
+
+    def rate(self, now):
+        """
+        Calculate blinks per minute
+
+        The rate is measured from the oldest blink in the window, and is
+        0 until the window holds at least two blinks.
+
+        Args:
+            now: Reference time
+
+        Returns:
+            float: Blinks per minute
+        """
+        if now is None or self.count(now) < 2:
+            return 0.0
+        time_span = now - self.times[0]
+        if time_span > 0:
+            return len(self.times) / time_span * 60
+        return 0.0
+
+    def clear(self):
+        self.times.clear()
+
+
+class BlinkRates:
+    """
+    Blink rates over several sliding windows at once
+    """
+
+    def __init__(self, windows=DEFAULT_RATE_WINDOWS):
+        """
+        Args:
+            windows: Window lengths in seconds; the one-minute window is
+                always included since it backs `blink_rate`
+        """
+        windows = sorted(set(float(w) for w in windows) | {float(PRIMARY_RATE_WINDOW)})
+        self.windows = {w: SlidingWindowRate(w) for w in windows}
+        self.primary = self.windows[float(PRIMARY_RATE_WINDOW)]
+
+    def add(self, timestamp):
+        """Record a blink in every window"""
+        for window in self.windows.values():
+            window.add(timestamp)
+
+    def rate(self, now):
+        """Blinks per minute over the one-minute window"""
+        return self.primary.rate(now)
+
+    def rates(self, now):
+        """
+        Get the rate of every window
+
+        Returns:
+            dict: Blinks per minute keyed by window label ("10s", "1min", ...)
+        """
+        return {window_label(w): round(window.rate(now), 2) for w, window in self.windows.items()}
+
+    def clear(self):
+        for window in self.windows.values():
+            window.clear()
+
+
+class PerclosWindow:
+    """
+    PERCLOS: fraction of recent frames in which the eyes were closed
+
+    Frame timestamps and closed flags live in a preallocated ring buffer
+    with a running count of closed frames, so each frame costs O(1) and
+    nothing is allocated per frame. Frames older than `window` seconds
+    are evicted by timestamp, so the window spans `window` seconds when
+    the source runs at or below `fps`; a faster source fills the buffer
+    first and the window then holds the most recent `window * fps`
+    frames. Timestamps must not decrease.
+    """
+
+    def __init__(self, window=60.0, fps=30.0):
+        """
+        Args:
+            window: Window length in seconds
+            fps: Expected frame rate, which sets the buffer size
+        """
+        self.window = float(window)
+        self.capacity = max(1, int(math.ceil(window * fps)))
+        self.times = np.zeros(self.capacity, dtype=np.float64)
+        self.flags = np.zeros(self.capacity, dtype=np.uint8)
+        self.clear()
+
+    def _drop_oldest(self):
+        self.closed -= int(self.flags[self.head])
+        self.head = (self.head + 1) % self.capacity
+        self.size -= 1
+
+    def add(self, timestamp, closed):
+        """Record one frame's eye state at `timestamp`"""
+        if self.first is None:
+            self.first = timestamp
+        self.last = timestamp
+        if self.size == self.capacity:
+            self._drop_oldest()
+        tail = (self.head + self.size) % self.capacity
+        self.times[tail] = timestamp
+        self.flags[tail] = 1 if closed else 0
+        self.size += 1
+        if closed:
+            self.closed += 1
+        while timestamp - self.times[self.head] > self.window:
+            self._drop_oldest()
+
+    @property
+    def full(self):
+        """True once frames have been recorded for the whole window"""
+        return self.first is not None and self.last - self.first >= self.window
+
+    @property
+    def value(self):
+        """Fraction of frames in the window with closed eyes (0-1)"""
+        return self.closed / self.size if self.size else 0.0
+
+    def clear(self):
+        self.head = 0
+        self.size = 0
+        self.closed = 0
+        self.first = None
+        self.last = None
+
+
+class DurationStats:
+    """
+    Running count, mean, spread and extremes of blink durations
+
+    Uses Welford's update, so every blink costs O(1) and no durations
+    are stored.
+    """
+
+    def __init__(self):
+        self.clear()
+
+    def add(self, duration):
+        """Record one blink duration in seconds"""
+        self.count += 1
+        delta = duration - self.mean
+        self.mean += delta / self.count
+        self._m2 += delta * (duration - self.mean)
+        self.min = duration if self.min is None else min(self.min, duration)
+        self.max = duration if self.max is None else max(self.max, duration)
+        self.last = duration
+
+    @property
+    def std(self):
+        return (self._m2 / (self.count - 1)) ** 0.5 if self.count > 1 else 0.0
+
+    def summary(self):
+        """
+        Get the statistics in milliseconds
+
+        Returns:
+            dict: count, mean_ms, std_ms, min_ms, max_ms and last_ms;
+            all but count and std_ms are None before the first blink
+        """
+        def ms(seconds):
+            return None if seconds is None else round(seconds * 1000, 1)
+
+        return {
+            'count': self.count,
+            'mean_ms': ms(self.mean) if self.count else None,
+            'std_ms': ms(self.std),
+            'min_ms': ms(self.min),
+            'max_ms': ms(self.max),
+            'last_ms': ms(self.last),
+        }
+
+    def clear(self):
+        self.count = 0
+        self.mean = 0.0
+        self._m2 = 0.0
+        self.min = None
+        self.max = None
+        self.last = None
@@ -0,0 +1,156 @@
+"""
+Fast start helpers for the eye blink entry points
+Heavy modules (OpenCV, dlib, NumPy) are imported on first use, the
+detector is built on a background thread while the window or web server
+comes up, and `--profile-startup` prints where the startup time went.
+"""
+
+import importlib
+import sys
+import threading
+import time
+from concurrent.futures import Future
+from contextlib import contextmanager
+
+
+# Reference point for time-to-first-frame; entry points import this
+# module before anything heavy
+PROCESS_START = time.perf_counter()
+
+_lock = threading.Lock()
+_import_times = {}
+
+
+class LazyModule:
+    """
+    Module proxy that imports the real module on first attribute access
+
+    importlib.util.LazyLoader cannot be used here because cv2 replaces
+    its own sys.modules entry while importing. Attributes are cached on
+    the proxy, so repeated lookups such as `cv2.resize` cost the same as
+    on the real module.
+    """
+
+    def __init__(self, name):
+        self.__dict__['_name'] = name
+        self.__dict__['_module'] = None
+
+    def _load(self):
+        module = self.__dict__['_module']
+        if module is None:
+            name = self.__dict__['_name']
+            loaded = name in sys.modules
+            start = time.perf_counter()
+            module = importlib.import_module(name)
+            if not loaded:
+                with _lock:
+                    _import_times.setdefault(name, time.perf_counter() - start)
+            self.__dict__['_module'] = module
+        return module
+
+    def __getattr__(self, attr):
+        value = getattr(self._load(), attr)
+        self.__dict__[attr] = value
+        return value
+
+    def __repr__(self):
+        state = "loaded" if self.__dict__['_module'] is not None else "not loaded"
+        return f"<lazy module '{self.__dict__['_name']}' ({state})>"
+
+
+def lazy_import(name):
+    """
+    Import a module on first use
+
+    Args:
+        name: Module name, e.g. "cv2"
+
+    Returns:
+        LazyModule: Proxy to use in place of the module
+    """
+    return LazyModule(name)
+
+
+def import_times():
+    """
+    Get the time spent importing each lazily imported module
+
+    Returns:
+        list: (module name, seconds) in import order; a module imported
+        from within another one's import is counted in both
+    """
+    with _lock:
+        return list(_import_times.items())
+
+
+def run_in_background(function, *args, name="startup-loader", **kwargs):
+    """
+    Run a function on a daemon thread
+
+    Args:
+        function: Callable to run, e.g. a detector factory
+        name: Thread name
+
+    Returns:
+        Future: Resolves to the function's result or exception
+    """
+    future = Future()
+
+    def run():
+        if not future.set_running_or_notify_cancel():
+            return
+        try:
+            future.set_result(function(*args, **kwargs))
+        except BaseException as e:
+            future.set_exception(e)
+
+    threading.Thread(target=run, name=name, daemon=True).start()
+    return future
+
+
+class StartupProfiler:
+    """
+    Wall-clock timing of startup phases, safe to record from any thread
+
+    Phases recorded on the background loader overlap with the ones on
+    the main thread, so their sum can exceed the total.
+    """
+
+    def __init__(self, enabled=True):
+        """
+        Args:
+            enabled: Record and print timings (a disabled profiler makes
+                every call a no-op, so entry points can always use one)
+        """
+        self.enabled = enabled
+        self.start = PROCESS_START
+        self.phases = []
+        self.reported = False
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def phase(self, name):
+        """Time the enclosed block as one phase"""
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            if self.enabled:
+                if threading.current_thread() is not threading.main_thread():
+                    name += " (background)"
+                with self._lock:
+                    self.phases.append((name, time.perf_counter() - t0))
+
+    def report(self, label="first frame"):
+        """Print the import and phase breakdown (once)"""
+        if not self.enabled or self.reported:
+            return
+        self.reported = True
+        total = time.perf_counter() - self.start
+        print("⏱️  Startup timings:")
+        for name, secs in import_times():
+            print(f"   {'import ' + name:<30} {secs * 1000:8.1f} ms")
+        with self._lock:
+            for name, secs in self.phases:
+                print(f"   {name:<30} {secs * 1000:8.1f} ms")
+        print(f"   {label:<30} {total * 1000:8.1f} ms (since start)")
@@ -2,6 +2,8 @@
 
 let isDetecting = false;
 let statsInterval = null;
+let statsSource = null;
+let currentStats = {};
 
 // DOM Elements
 const startBtn = document.getElementById('startBtn');
@@ -22,6 +24,9 @@ const totalBlinks = document.getElementById('totalBlinks');
 const earValue = document.getElementById('earValue');
 const blinkRate = document.getElementById('blinkRate');
 const avgBlinkRate = document.getElementById('avgBlinkRate');
+const perclosValue = document.getElementById('perclosValue');
+const perclosLabel = document.getElementById('perclosLabel');
+const blinkDuration = document.getElementById('blinkDuration');
 const sessionTime = document.getElementById('sessionTime');
 const statusValue = document.getElementById('statusValue');
 
@@ -91,8 +96,8 @@ async function startDetection() {
             // Update status
             updateStatusIndicator('Detecting', true);
             
-            // Start stats update interval
-            statsInterval = setInterval(updateStats, 500);
+            // Subscribe to pushed stats updates
+            startStatsStream();
             
             showNotification('Detection started successfully!', 'success');
         } else {
@@ -130,10 +135,7 @@ async function stopDetection() {
             updateStatusIndicator('Stopped', false);
             
             // Stop stats update
-            if (statsInterval) {
-                clearInterval(statsInterval);
-                statsInterval = null;
-            }
+            stopStatsStream();
             
             showNotification('Detection stopped', 'info');
         }
@@ -162,6 +164,8 @@ async function resetCounters() {
         if (data.success) {
             updateStats();
             showNotification('Counters reset successfully!', 'success');
+        } else {
+            showNotification(data.message, 'error');
         }
     } catch (error) {
         console.error('Error resetting counters:', error);
@@ -181,14 +185,66 @@ async function exportData() {
         
         const data = await response.json();
         
-        if (data.success) {
-            showNotification('Data exported to: ' + data.filepath, 'success');
-        } else {
+        if (!data.success) {
             showNotification('Export failed: ' + data.message, 'error');
+            return;
+        }
+        
+        exportBtn.disabled = true;
+        showNotification('Preparing export...', 'info');
+        
+        // Poll the background job, then download the finished CSV
+        let job = data;
+        while (job.status !== 'done' && job.status !== 'failed') {
+            await new Promise(resolve => setTimeout(resolve, 500));
+            job = await (await fetch(data.status_url)).json();
+        }
+        
+        if (job.status === 'done') {
+            const link = document.createElement('a');
+            link.href = data.download_url;
+            link.download = job.filename;
+            document.body.appendChild(link);
+            link.click();
+            document.body.removeChild(link);
+            showNotification(`Exported ${job.rows_total} blinks`, 'success');
+        } else {
+            showNotification('Export failed: ' + job.error, 'error');
         }
     } catch (error) {
         console.error('Error exporting data:', error);
         showNotification('Error exporting data', 'error');
+    } finally {
+        exportBtn.disabled = false;
+    }
+}
+
+// Stats Stream (Server-Sent Events, falls back to polling)
+function startStatsStream() {
+    stopStatsStream();
+    
+    if (!window.EventSource) {
+        statsInterval = setInterval(updateStats, 500);
+        return;
+    }
+    
+    statsSource = new EventSource('/api/stats/stream');
+    statsSource.addEventListener('stats', function(event) {
+        renderStats(JSON.parse(event.data));
+    });
+    statsSource.onerror = function() {
+        console.warn('Stats stream interrupted, reconnecting...');
+    };
+}
+
+function stopStatsStream() {
+    if (statsSource) {
+        statsSource.close();
+        statsSource = null;
+    }
+    if (statsInterval) {
+        clearInterval(statsInterval);
+        statsInterval = null;
     }
 }
 
@@ -196,13 +252,31 @@ async function exportData() {
 async function updateStats() {
     try {
         const response = await fetch('/api/stats');
-        const stats = await response.json();
-        
+        renderStats(await response.json());
+    } catch (error) {
+        console.error('Error updating stats:', error);
+    }
+}
+
+// Render Statistics (accepts full stats or a delta)
+function renderStats(delta) {
+    const previousBlinks = currentStats.total_blinks || 0;
+    currentStats = Object.assign({}, currentStats, delta);
+    const stats = currentStats;
+    if (stats.total_blinks === undefined) {
+        return;
+    }
+    
+    try {
         // Update values with animations
-        animateValue(totalBlinks, parseInt(totalBlinks.textContent), stats.total_blinks);
+        animateValue(totalBlinks, previousBlinks, stats.total_blinks);
         earValue.textContent = stats.current_ear.toFixed(3);
         blinkRate.textContent = stats.blink_rate.toFixed(1);
         avgBlinkRate.textContent = stats.avg_blink_rate.toFixed(1);
+        perclosValue.textContent = (stats.perclos * 100).toFixed(1) + '%';
+        perclosLabel.textContent = `PERCLOS (${stats.perclos_window})`;
+        const meanDuration = stats.blink_duration.mean_ms;
+        blinkDuration.textContent = meanDuration === null ? '--' : meanDuration.toFixed(0);
         sessionTime.textContent = stats.session_duration.toFixed(1) + 's';
         statusValue.textContent = stats.status;
         
@@ -220,7 +294,7 @@ async function updateStats() {
         }
         
     } catch (error) {
-        console.error('Error updating stats:', error);
+        console.error('Error rendering stats:', error);
     }
 }
 
@@ -0,0 +1,496 @@
+"""
+Capture-and-detect engine for the web interface
+One background thread captures, detects and JPEG-encodes each frame at
+most twice (see DetectionEngine.MAX_ENCODES), then publishes it to every
+connected viewer. Statistics are pushed to dashboards as deltas when
+they change.
+"""
+
+import itertools
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from types import MappingProxyType
+
+from luma_capture import as_bgr
+from startup import lazy_import
+
+cv2 = lazy_import("cv2")
+
+
+class QualityLadder:
+    """
+    Encoding levels from best (0) to cheapest, as (jpeg_quality, scale)
+
+    Quality and resolution are interpolated between the configured bounds.
+    """
+
+    def __init__(self, max_quality=85, min_quality=40, min_scale=0.5, steps=5):
+        steps = max(1, int(steps))
+        self.levels = []
+        for i in range(steps):
+            t = i / (steps - 1) if steps > 1 else 0.0
+            quality = int(round(max_quality - (max_quality - min_quality) * t))
+            scale = round(1.0 - (1.0 - min_scale) * t, 3)
+            self.levels.append((quality, scale))
+
+    def __len__(self):
+        return len(self.levels)
+
+    def __getitem__(self, level):
+        return self.levels[level]
+
+
+class FrameSlot:
+    """
+    Latest-frame mailbox for one streaming client
+
+    The engine overwrites the slot on every frame; the client always takes
+    the newest frame, so a slow reader never builds up a backlog. The slot
+    also measures how fast the client drains frames and moves it up or
+    down the quality ladder to match.
+    """
+
+    # Fraction of the frame budget a send may take before degrading, and
+    # below which the client is considered to have headroom to upgrade
+    DEGRADE_LOAD = 0.9
+    UPGRADE_LOAD = 0.4
+    DEGRADE_COOLDOWN = 1.0
+    UPGRADE_COOLDOWN = 3.0
+    SMOOTHING = 0.2
+
+    _ids = itertools.count(1)
+
+    def __init__(self, ladder, target_fps=30.0):
+        self._cond = threading.Condition()
+        self._frame = None
+        self._seq = 0
+        self.closed = False
+        
+        # Adaptive quality
+        self.client_id = next(self._ids)
+        self.ladder = ladder
+        self.level = 0
+        self.frame_budget = 1.0 / target_fps
+        self._last_level_change = time.monotonic()
+        
+        # Delivery statistics
+        self.connected_at = time.monotonic()
+        self.frames_sent = 0
+        self.frames_dropped = 0
+        self.bytes_sent = 0
+        self._send_time = 0.0
+        self._interval = None
+        self._last_delivery = None
+
+    def publish(self, seq, frame_bytes):
+        """Replace the slot's frame and wake the client"""
+        with self._cond:
+            self._seq = seq
+            self._frame = frame_bytes
+            self._cond.notify()
+
+    def wait(self, last_seq, timeout=1.0):
+        """
+        Wait for a frame newer than `last_seq`
+
+        Returns:
+            tuple: (seq, frame_bytes), or None on timeout or close
+        """
+        with self._cond:
+            if not self._cond.wait_for(lambda: self.closed or self._seq > last_seq, timeout):
+                return None
+            if self.closed:
+                return None
+            return self._seq, self._frame
+
+    def close(self):
+        """Release a waiting client"""
+        with self._cond:
+            self.closed = True
+            self._cond.notify_all()
+
+    def record_delivery(self, seq, last_seq, nbytes, send_seconds):
+        """
+        Account for one frame written to the client and adapt quality
+
+        Args:
+            seq: Sequence number of the frame just sent
+            last_seq: Sequence number of the previously sent frame
+            nbytes: Bytes written
+            send_seconds: Time the server took to write them
+        """
+        now = time.monotonic()
+        self.frames_sent += 1
+        self.bytes_sent += nbytes
+        if last_seq:
+            self.frames_dropped += max(0, seq - last_seq - 1)
+        if self._last_delivery is not None:
+            interval = now - self._last_delivery
+            self._interval = interval if self._interval is None else (
+                self._interval + self.SMOOTHING * (interval - self._interval))
+        self._last_delivery = now
+        self._send_time += self.SMOOTHING * (send_seconds - self._send_time)
+        
+        load = self._send_time / self.frame_budget
+        since_change = now - self._last_level_change
+        if (load > self.DEGRADE_LOAD and self.level < len(self.ladder) - 1
+                and since_change > self.DEGRADE_COOLDOWN):
+            self.level += 1
+            self._last_level_change = now
+        elif (load < self.UPGRADE_LOAD and self.level > 0
+                and since_change > self.UPGRADE_COOLDOWN):
+            self.level -= 1
+            self._last_level_change = now
+
+    def get_stats(self):
+        """
+        Get delivery statistics for this client
+        
+        Returns:
+            dict: Statistics dictionary
+        """
+        quality, scale = self.ladder[self.level]
+        return {
+            'client_id': self.client_id,
+            'fps': round(1.0 / self._interval, 2) if self._interval else 0.0,
+            'frames_sent': self.frames_sent,
+            'frames_dropped': self.frames_dropped,
+            'bytes_sent': self.bytes_sent,
+            'jpeg_quality': quality,
+            'scale': scale,
+            'send_ms': round(self._send_time * 1000, 2),
+            'connected_seconds': round(time.monotonic() - self.connected_at, 2)
+        }
+
+
+class StatsSubscription:
+    """
+    Pending stats delta for one dashboard
+
+    Deltas published while the client is busy are merged, so a slow
+    client receives one combined update instead of a queue.
+    """
+
+    def __init__(self, initial):
+        self._cond = threading.Condition()
+        self._pending = dict(initial)
+        self.closed = False
+
+    def push(self, delta):
+        """Merge a delta into the pending update"""
+        with self._cond:
+            self._pending.update(delta)
+            self._cond.notify()
+
+    def wait(self, timeout=15.0):
+        """
+        Wait for the next update
+
+        Returns:
+            dict: Merged delta, or None on timeout or close
+        """
+        with self._cond:
+            if not self._cond.wait_for(lambda: self.closed or self._pending, timeout):
+                return None
+            if self.closed:
+                return None
+            delta, self._pending = self._pending, {}
+            return delta
+
+    def close(self):
+        """Release a waiting client"""
+        with self._cond:
+            self.closed = True
+            self._cond.notify_all()
+
+
+class StatsChannel:
+    """
+    Publishes detector statistics to subscribed dashboards as deltas
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._last = {}
+        self._subscribers = set()
+
+    def subscribe(self):
+        """Register a dashboard; its first update is the full stats"""
+        with self._lock:
+            sub = StatsSubscription(self._last)
+            self._subscribers.add(sub)
+        return sub
+
+    def unsubscribe(self, sub):
+        """Remove a dashboard"""
+        with self._lock:
+            self._subscribers.discard(sub)
+        sub.close()
+
+    @property
+    def has_subscribers(self):
+        with self._lock:
+            return bool(self._subscribers)
+
+    def publish(self, stats):
+        """Send the keys of `stats` that changed since the last publish"""
+        with self._lock:
+            if not self._subscribers:
+                # Kept as the first update of the next dashboard
+                self._last = dict(stats)
+                return
+            delta = {k: v for k, v in stats.items() if self._last.get(k) != v}
+            if not delta:
+                return
+            self._last = dict(stats)
+            subscribers = list(self._subscribers)
+        for sub in subscribers:
+            sub.push(delta)
+
+    def close(self):
+        """Release all dashboards"""
+        with self._lock:
+            subscribers = list(self._subscribers)
+            self._subscribers.clear()
+        for sub in subscribers:
+            sub.close()
+
+
+class DetectionEngine:
+    """
+    Single producer for all viewers of the video feed
+
+    Adding a viewer only adds a FrameSlot; capture, detection and
+    encoding cost is paid once per frame regardless of viewer count.
+
+    The engine thread owns the detector. It publishes an immutable stats
+    snapshot by swapping a single reference, so readers never wait for
+    detection. Anything that changes the detector (settings, reset,
+    export) is submitted as a command and executed by the engine thread
+    between frames. Stats are only collected when blinks, status or
+    drowsiness change, after a command, and at least every
+    `heartbeat_interval` seconds; each time the snapshot is replaced
+    and the delta pushed to dashboards.
+
+    Each frame is encoded at no more than MAX_ENCODES ladder levels:
+    the best level any viewer is on and the cheapest. Viewers on a level
+    in between get the cheapest frame, never a larger one than they can
+    take, and move back up as their sends speed up.
+    """
+
+    MAX_ENCODES = 2
+
+    def __init__(self, ladder=None, target_fps=30.0, heartbeat_interval=1.0):
+        self.ladder = ladder or QualityLadder()
+        self.target_fps = target_fps
+        self.stats = StatsChannel()
+        self.heartbeat_interval = heartbeat_interval
+        self.snapshot = MappingProxyType({})
+        self._stats_key = None
+        self._last_stats_publish = 0.0
+        self._commands = queue.Queue()
+        self.detector = None
+        self.cap = None
+        self.active = False
+        self.frames_processed = 0
+        self.frame_errors = 0
+        self._slots = set()
+        self._slots_lock = threading.Lock()
+        self._thread = None
+        self._running = False
+
+    def _ensure_thread(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._running = True
+            self._thread = threading.Thread(target=self._run, name="detection-engine", daemon=True)
+            self._thread.start()
+
+    def attach(self, detector, cap):
+        """Use a (new) detector and capture device"""
+        def swap(_):
+            self.detector = detector
+            self.cap = cap
+        self._ensure_thread()
+        self.call(swap)
+
+    def start(self):
+        """Start the engine thread if needed and resume detection"""
+        self.active = True
+        self._ensure_thread()
+
+    def pause(self):
+        """Stop capturing and detecting; viewers stay connected"""
+        self.active = False
+
+    def shutdown(self):
+        """Stop the engine thread and release all viewers"""
+        self._running = False
+        self.active = False
+        if self._thread is not None:
+            self._thread.join(timeout=2.0)
+        with self._slots_lock:
+            for slot in self._slots:
+                slot.close()
+            self._slots.clear()
+        self.stats.close()
+
+    def submit(self, command):
+        """
+        Queue a command to run on the engine thread between frames
+
+        Args:
+            command: Callable taking the detector
+
+        Returns:
+            Future: Resolves to the command's return value
+        """
+        future = Future()
+        self._commands.put((command, future))
+        self._ensure_thread()
+        return future
+
+    def call(self, command, timeout=10.0):
+        """Run a command on the engine thread and wait for its result"""
+        return self.submit(command).result(timeout)
+
+    def subscribe(self):
+        """Register a viewer and return its frame slot"""
+        slot = FrameSlot(self.ladder, self.target_fps)
+        with self._slots_lock:
+            self._slots.add(slot)
+        return slot
+
+    def unsubscribe(self, slot):
+        """Remove a viewer"""
+        with self._slots_lock:
+            self._slots.discard(slot)
+        slot.close()
+
+    @property
+    def viewer_count(self):
+        with self._slots_lock:
+            return len(self._slots)
+
+    def client_stats(self):
+        """Delivery statistics of every connected client"""
+        with self._slots_lock:
+            slots = list(self._slots)
+        return [slot.get_stats() for slot in slots]
+
+    def _drain_commands(self, timeout=None):
+        """
+        Run queued commands; optionally block up to `timeout` for the first
+
+        Returns:
+            bool: True if any command ran
+        """
+        ran = False
+        while True:
+            try:
+                if timeout is not None and not ran:
+                    command, future = self._commands.get(timeout=timeout)
+                else:
+                    command, future = self._commands.get_nowait()
+            except queue.Empty:
+                return ran
+            ran = True
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                future.set_result(command(self.detector))
+            except Exception as e:
+                future.set_exception(e)
+
+    def _publish_stats(self, force=False):
+        """Swap in a new stats snapshot and push it to dashboards on change or heartbeat"""
+        d = self.detector
+        if d is None:
+            return
+        key = (d.total_blinks, d.status, d.is_drowsy)
+        now = time.monotonic()
+        if not (force or key != self._stats_key
+                or now - self._last_stats_publish >= self.heartbeat_interval):
+            return
+        self._stats_key = key
+        self._last_stats_publish = now
+        stats = d.get_stats()
+        self.snapshot = MappingProxyType(stats)
+        self.stats.publish(stats)
+
+    def _encode(self, frame, level):
+        """JPEG-encode a frame at one ladder level"""
+        quality, scale = self.ladder[level]
+        if scale < 1.0:
+            frame = cv2.resize(frame, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+        ret, buffer = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, quality])
+        return buffer.tobytes() if ret else None
+
+    def _collapse_levels(self, by_level):
+        """Serve every viewer from the best and the cheapest level in use"""
+        best, cheapest = min(by_level), max(by_level)
+        collapsed = {best: by_level[best], cheapest: []}
+        for level, level_slots in by_level.items():
+            if level != best:
+                collapsed[cheapest].extend(level_slots)
+        return collapsed
+
+    def _run(self):
+        """Capture, detect, encode at most MAX_ENCODES levels and fan out"""
+        seq = 0
+        while self._running:
+            if not self.active or self.cap is None or self.detector is None:
+                ran = self._drain_commands(timeout=0.1)
+                self._publish_stats(force=ran)
+                continue
+
+            if self._drain_commands():
+                self._publish_stats(force=True)
+
+            # One bad frame must not stop the thread every viewer and
+            # queued command depends on
+            try:
+                seq = self._process_frame(seq)
+            except Exception as e:
+                self.frame_errors += 1
+                if self.frame_errors == 1 or self.frame_errors % 100 == 0:
+                    print(f"⚠️  Frame processing failed ({self.frame_errors} so far): {e!r}")
+                time.sleep(0.05)
+
+    def _process_frame(self, seq):
+        """
+        Capture, detect and fan out one frame
+
+        Returns:
+            int: Sequence number of the last published frame
+        """
+        success, frame = self.cap.read()
+        if not success:
+            time.sleep(0.05)
+            return seq
+
+        frame, blink_detected, is_drowsy = self.detector.detect_blink(frame)
+        self._publish_stats(force=blink_detected)
+        self.frames_processed += 1
+
+        with self._slots_lock:
+            slots = list(self._slots)
+        if not slots:
+            return seq
+
+        # Luma-only captures are converted to BGR only for viewers
+        frame = as_bgr(frame)
+        seq += 1
+        by_level = {}
+        for slot in slots:
+            by_level.setdefault(slot.level, []).append(slot)
+        if len(by_level) > self.MAX_ENCODES:
+            by_level = self._collapse_levels(by_level)
+        for level, level_slots in by_level.items():
+            frame_bytes = self._encode(frame, level)
+            if frame_bytes is None:
+                continue
+            for slot in level_slots:
+                slot.publish(seq, frame_bytes)
+        return seq
@@ -16,7 +16,6 @@ def test_imports():
         'cv2': 'OpenCV',
         'dlib': 'dlib',
         'numpy': 'NumPy',
-        'scipy': 'SciPy',
         'PIL': 'Pillow'
     }
     
@@ -48,12 +47,6 @@ def test_versions():
     except:
         print("  NumPy: Not available")
     
-    try:
-        import scipy
-        print(f"  SciPy: {scipy.__version__}")
-    except:
-        print("  SciPy: Not available")
-    
     try:
         import PIL
         print(f"  Pillow: {PIL.__version__}")
@@ -0,0 +1,115 @@
+"""
+Chunked batch measurement must reproduce a serial run
+"""
+
+import numpy as np
+import pytest
+
+cv2 = pytest.importorskip("cv2")
+
+import batch_process
+from blink_detector import EyeBlinkDetector
+from clocks import ManualClock
+from landmark_backends import FaceBox, LandmarkBackend
+
+FPS = 30.0
+WIDTH, HEIGHT = 160, 120
+FACE = (40, 20, 119, 99)
+
+
+class BrightnessBackend(LandmarkBackend):
+    """One fixed face whose eyes are closed on bright frames"""
+
+    name = "test"
+    locates_faces = True
+
+    def locate(self, gray):
+        height = 1.0 if gray.mean() > 100 else 8.0
+        points = np.zeros((1, 68, 2), dtype=np.float32)
+        for base, cx in ((36, 60.0), (42, 100.0)):
+            cy = 50.0
+            points[0, base:base + 6] = [(cx - 10, cy), (cx - 4, cy - height / 2),
+                                        (cx + 4, cy - height / 2), (cx + 10, cy),
+                                        (cx + 4, cy + height / 2), (cx - 4, cy + height / 2)]
+        return [FaceBox(*FACE)], points
+
+
+def write_clip(path, closed_spans, frames):
+    """Write an MJPEG clip that is bright during the closed spans"""
+    writer = cv2.VideoWriter(str(path), cv2.VideoWriter_fourcc(*"MJPG"), FPS, (WIDTH, HEIGHT))
+    assert writer.isOpened()
+    closed = np.zeros(frames, dtype=bool)
+    for start, length in closed_spans:
+        closed[start:start + length] = True
+    for flag in closed:
+        writer.write(np.full((HEIGHT, WIDTH, 3), 200 if flag else 50, np.uint8))
+    writer.release()
+
+
+@pytest.fixture
+def clip(tmp_path):
+    # Blinks, one of them across the 1/3 boundary (frame 100), and a
+    # drowsy closure across the 2/3 boundary (frame 200)
+    path = tmp_path / "clip.avi"
+    write_clip(path, [(20, 4), (60, 5), (98, 5), (150, 3), (185, 60), (260, 4)], 300)
+    return path
+
+
+@pytest.fixture
+def worker():
+    overrides = {'backend': BrightnessBackend()}
+    batch_process.init_worker({}, overrides)
+    return overrides
+
+
+def test_chunked_matches_serial(clip, worker, tmp_path):
+    plan = batch_process.plan_chunks(str(clip), 3, overlap=0.5)
+    assert len(plan) == 3
+    chunks = [batch_process.measure_chunk(str(clip), *chunk) for chunk in plan]
+
+    replay = EyeBlinkDetector.from_config({}, clock=ManualClock(), overlay=False, **worker)
+    chunked = batch_process.stitch_chunks(replay, str(clip), str(tmp_path / "chunked.csv"),
+                                          chunks, elapsed=1.0)
+    serial = batch_process.process_video(str(clip), str(tmp_path / "serial.csv"))
+
+    assert chunked['error'] == ''
+    assert serial['error'] == ''
+    assert chunked['frames'] == serial['frames'] == 300
+    assert chunked['total_blinks'] == serial['total_blinks'] == 6
+    assert chunked['drowsy_episodes'] == serial['drowsy_episodes'] == 1
+    assert (tmp_path / "chunked.csv").read_text() == (tmp_path / "serial.csv").read_text()
+
+
+class FakeCapture:
+    """Capture whose seeks land `error` frames away from the target"""
+
+    def __init__(self, frames, error):
+        self.frames = frames
+        self.error = error
+        self.position = 0
+
+    def set(self, prop, value):
+        assert prop == cv2.CAP_PROP_POS_FRAMES
+        self.position = 0 if value == 0 else int(value) + self.error
+
+    def get(self, prop):
+        assert prop == cv2.CAP_PROP_POS_FRAMES
+        return float(self.position)
+
+    def grab(self):
+        if self.position >= self.frames:
+            return False
+        self.position += 1
+        return True
+
+
+@pytest.mark.parametrize("error", [0, -3, 4])
+def test_seek_frame_lands_on_target(error):
+    cap = FakeCapture(100, error)
+    batch_process.seek_frame(cap, 40)
+    assert cap.position == 40
+
+
+def test_seek_frame_past_end_fails():
+    with pytest.raises(RuntimeError):
+        batch_process.seek_frame(FakeCapture(30, 5), 40)
@@ -0,0 +1,138 @@
+"""
+BlinkStateMachine and replay_trace must agree sample for sample
+"""
+
+import numpy as np
+import pytest
+
+from blink_state import BlinkParams, replay_trace
+from detection_core import MODES
+from replay_trace import step_trace, synthetic_trace
+
+# Power-of-two rate, so sample times and thresholds are exact in binary
+FPS = 32.0
+OPEN_EAR = 0.30
+CLOSED_EAR = 0.08
+
+
+def mode_params(mode, drowsiness_threshold=1.5):
+    return BlinkParams(0.25, mode.consec_frames, drowsiness_threshold)
+
+
+def segments_trace(segments, fps=FPS):
+    """Build a trace from (closed, samples) segments"""
+    ear = np.concatenate([np.full(length, CLOSED_EAR if closed else OPEN_EAR)
+                          for closed, length in segments])
+    return {'timestamp': np.arange(len(ear)) / fps, 'left_ear': ear, 'right_ear': ear.copy()}
+
+
+def both(trace, params, refractory=0.0, smoothing=1):
+    vectorized = replay_trace(trace['timestamp'], trace['left_ear'], trace['right_ear'],
+                              params, refractory, smoothing)
+    reference = step_trace(trace, params, refractory, smoothing)
+    assert vectorized == reference
+    return vectorized
+
+
+@pytest.mark.parametrize("name", sorted(MODES))
+@pytest.mark.parametrize("seed", [0, 1, 2])
+def test_synthetic_traces_match(name, seed):
+    mode = MODES[name]
+    trace = synthetic_trace(seconds=120.0, fps=30.0, drowsy_rate=2.0, seed=seed)
+    result = both(trace, mode_params(mode), mode.refractory, mode.smoothing)
+    assert result['blinks']
+    assert result['drowsy_starts']
+
+
+@pytest.mark.parametrize("name", sorted(MODES))
+def test_empty_and_always_open_traces(name):
+    mode = MODES[name]
+    assert both(segments_trace([(False, 0)]), mode_params(mode),
+                mode.refractory, mode.smoothing) == {'blinks': [], 'drowsy_starts': []}
+    assert both(segments_trace([(False, 100)]), mode_params(mode),
+                mode.refractory, mode.smoothing) == {'blinks': [], 'drowsy_starts': []}
+
+
+@pytest.mark.parametrize("name", sorted(MODES))
+def test_consec_frames_edge(name):
+    mode = MODES[name]
+    params = mode_params(mode)
+    short = both(segments_trace([(False, 10), (True, mode.consec_frames - 1), (False, 10)]), params)
+    exact = both(segments_trace([(False, 10), (True, mode.consec_frames), (False, 10)]), params)
+    assert short['blinks'] == []
+    assert len(exact['blinks']) == 1
+    assert exact['blinks'][0].duration_frames == mode.consec_frames
+
+
+@pytest.mark.parametrize("name", sorted(MODES))
+def test_closure_still_open_at_end_is_not_a_blink(name):
+    mode = MODES[name]
+    result = both(segments_trace([(False, 10), (True, 20)]), mode_params(mode),
+                  mode.refractory, mode.smoothing)
+    assert result['blinks'] == []
+
+
+@pytest.mark.parametrize("name", sorted(MODES))
+def test_drowsiness_edge(name):
+    mode = MODES[name]
+    # 1.5s is 48 samples: a run spanning exactly the threshold does not
+    # raise drowsiness, the next closed sample does
+    params = mode_params(mode, drowsiness_threshold=1.5)
+    at_threshold = both(segments_trace([(False, 10), (True, 49), (False, 10)]), params)
+    past_threshold = both(segments_trace([(False, 10), (True, 50), (False, 10)]), params)
+    assert at_threshold['drowsy_starts'] == []
+    assert past_threshold['drowsy_starts'] == [(10 + 49) / FPS]
+    # The long closure still ends in a blink
+    assert len(past_threshold['blinks']) == 1
+
+
+@pytest.mark.parametrize("name", sorted(MODES))
+def test_drowsiness_raised_once_per_closure(name):
+    mode = MODES[name]
+    trace = segments_trace([(False, 10), (True, 100), (False, 10), (True, 100)])
+    result = both(trace, mode_params(mode), mode.refractory, mode.smoothing)
+    assert len(result['drowsy_starts']) == 2
+    assert len(result['blinks']) == 1
+
+
+def test_refractory_suppression_edge():
+    params = BlinkParams(0.25, 2, 1.5)
+    # Blinks complete on the first open sample; 0.25s is 8 samples
+    refractory = 0.25
+    gap = [(False, 10), (True, 3)]
+    within = both(segments_trace(gap + [(False, 5), (True, 2), (False, 10)]), params, refractory)
+    exact = both(segments_trace(gap + [(False, 6), (True, 2), (False, 10)]), params, refractory)
+    after = both(segments_trace(gap + [(False, 7), (True, 2), (False, 10)]), params, refractory)
+    assert len(within['blinks']) == 1
+    # Reopenings exactly `refractory` apart are still suppressed
+    assert len(exact['blinks']) == 1
+    assert len(after['blinks']) == 2
+    assert after['blinks'][1].timestamp - after['blinks'][0].timestamp == pytest.approx(9 / FPS)
+
+
+def test_refractory_only_counts_accepted_blinks():
+    params = BlinkParams(0.25, 2, 1.5)
+    # Three blinks 5 samples apart: the second is suppressed, so the
+    # third is measured from the first and counted
+    blink = [(True, 2), (False, 3)]
+    result = both(segments_trace([(False, 10)] + blink * 3 + [(False, 10)]), params, 0.25)
+    assert [round(b.timestamp * FPS) for b in result['blinks']] == [12, 22]
+
+
+@pytest.mark.parametrize("name", sorted(MODES))
+def test_mode_refractory_with_rapid_blinks(name):
+    mode = MODES[name]
+    # Blinks every 7 samples at 64 fps (109 ms): inside the modern
+    # refractory period, so every other one is suppressed
+    blink = [(True, 3), (False, 4)]
+    trace = segments_trace([(False, 10)] + blink * 10 + [(False, 10)], fps=64.0)
+    params = mode_params(mode)
+    result = both(trace, params, mode.refractory, mode.smoothing)
+    unsuppressed = both(trace, params, 0.0, mode.smoothing)
+    assert len(unsuppressed['blinks']) == 10
+    if mode.refractory > 0:
+        assert len(result['blinks']) == 5
+        times = [b.timestamp for b in result['blinks']]
+        assert all(b - a > mode.refractory for a, b in zip(times, times[1:]))
+    else:
+        assert result == unsuppressed
@@ -0,0 +1,43 @@
+"""
+Consecutive frames from config.json must not override another mode's preset
+"""
+
+import pytest
+
+pytest.importorskip("cv2")
+
+from blink_detector import EyeBlinkDetector
+from blink_detector_modern import ModernBlinkDetector
+from landmark_backends import LandmarkBackend
+
+CONFIG = {'detection': {'consecutive_frames': 4}}
+
+
+class NoFaceBackend(LandmarkBackend):
+    """Backend that never finds a face"""
+
+    name = "test"
+    locates_faces = True
+
+    def locate(self, gray):
+        return [], None
+
+
+def test_classic_reads_consecutive_frames():
+    detector = EyeBlinkDetector.from_config(CONFIG, backend=NoFaceBackend())
+    assert detector.consec_frames == 4
+
+
+@pytest.mark.parametrize("factory", [
+    lambda config: ModernBlinkDetector.from_config(config, backend=NoFaceBackend()),
+    lambda config: EyeBlinkDetector.from_config(config, mode='modern', backend=NoFaceBackend()),
+])
+def test_modern_keeps_its_preset(factory):
+    assert factory(CONFIG).consec_frames == 2
+
+
+def test_mode_specific_key_and_override():
+    config = {'detection': {'consecutive_frames': 4, 'modern_consecutive_frames': 1}}
+    assert ModernBlinkDetector.from_config(config, backend=NoFaceBackend()).consec_frames == 1
+    detector = ModernBlinkDetector.from_config(config, consec_frames=5, backend=NoFaceBackend())
+    assert detector.consec_frames == 5
@@ -0,0 +1,65 @@
+"""
+Background export jobs
+"""
+
+import os
+import time
+
+from export_jobs import ExportManager
+from session_log import BLINK_FIELDS
+
+
+def wait(job):
+    while job.status in ("pending", "running"):
+        time.sleep(0.01)
+    return job
+
+
+def row(number):
+    return {'timestamp': number, 'blink_number': number, 'ear_value': 0.2,
+            'duration_frames': 3, 'duration_ms': 100.0, 'face_id': 0}
+
+
+def test_empty_export_has_header(tmp_path):
+    exports = ExportManager(directory=str(tmp_path))
+    job = wait(exports.start(lambda: ([], {})))
+    assert job.status == "done"
+    with open(job.path) as f:
+        assert f.read().strip() == ",".join(BLINK_FIELDS)
+
+
+def test_rows_are_streamed_from_iterables(tmp_path):
+    exports = ExportManager(directory=str(tmp_path))
+    job = wait(exports.start(lambda: ((row(n) for n in range(1, 2501)), {})))
+    assert job.status == "done"
+    assert job.rows_written == job.rows_total == 2500
+    with open(job.path) as f:
+        assert len(f.readlines()) == 2501
+
+
+def test_prune_keeps_files_being_downloaded(tmp_path):
+    exports = ExportManager(max_jobs=1, directory=str(tmp_path))
+    first = wait(exports.start(lambda: ([row(1)], {})))
+    stream = exports.iter_file(first)
+
+    # Pruning must not touch the open download, before or while it is read
+    wait(exports.start(lambda: ([row(2)], {})))
+    assert os.path.exists(first.path)
+    chunks = iter(stream)
+    assert next(chunks).startswith(b"timestamp")
+    wait(exports.start(lambda: ([row(3)], {})))
+    assert os.path.exists(first.path)
+
+    list(chunks)
+    stream.close()
+    assert first.downloads == 0
+    wait(exports.start(lambda: ([row(4)], {})))
+    assert not os.path.exists(first.path)
+    assert exports.iter_file(first) is None
+
+
+def test_unstarted_download_is_released_on_close(tmp_path):
+    exports = ExportManager(max_jobs=1, directory=str(tmp_path))
+    job = wait(exports.start(lambda: ([row(1)], {})))
+    exports.iter_file(job).close()
+    assert job.downloads == 0
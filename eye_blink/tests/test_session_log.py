@@ -0,0 +1,141 @@
+"""
+Per-minute rollups and the append-only session log
+"""
+
+import csv
+
+import pytest
+
+from session_log import BLINK_FIELDS, MINUTE_FIELDS, SESSION_FIELD, MinuteRollups, SessionLog
+
+
+def blink_row(number, face_id=0):
+    return {'timestamp': f"00:00:{number:06.3f}", 'blink_number': number, 'ear_value': 0.21,
+            'duration_frames': 3, 'duration_ms': 100.0, 'face_id': face_id}
+
+
+def minute_row(minute):
+    return {'minute': minute, 'frames': 1800, 'blinks': 15, 'mean_ear': 0.3,
+            'mean_duration_ms': 140.0, 'perclos': 0.05}
+
+
+@pytest.fixture
+def log(tmp_path):
+    log = SessionLog(str(tmp_path / "logs" / "session.csv"))
+    yield log
+    log.close()
+
+
+def test_rollups_complete_on_minute_boundary():
+    completed = []
+    rollups = MinuteRollups(on_complete=completed.append)
+    rollups.add_frame(0, 0.30, closed=False)
+    rollups.add_frame(0, 0.10, closed=True)
+    rollups.add_blink(0, 0.2)
+    assert completed == []
+    rollups.add_frame(1, 0.28, closed=False)
+    assert completed == [{'minute': 0, 'frames': 2, 'blinks': 1, 'mean_ear': 0.2,
+                          'mean_duration_ms': 200.0, 'perclos': 0.5}]
+    assert [row['minute'] for row in rollups.rows()] == [0, 1]
+
+
+def test_rollups_skip_empty_minutes_and_empty_means():
+    completed = []
+    rollups = MinuteRollups(on_complete=completed.append)
+    rollups.add_blink(0, 0.1)
+    rollups.add_frame(3, 0.3, closed=False)
+    assert completed == [{'minute': 0, 'frames': 0, 'blinks': 1, 'mean_ear': '',
+                          'mean_duration_ms': 100.0, 'perclos': ''}]
+    assert rollups.current.minute == 3
+    assert rollups.rows()[-1]['mean_duration_ms'] == ''
+
+
+def test_rollups_keep_max_minutes_in_memory():
+    completed = []
+    rollups = MinuteRollups(max_minutes=2, on_complete=completed.append)
+    for minute in range(5):
+        rollups.add_frame(minute, 0.3, closed=False)
+    assert len(completed) == 4
+    assert [row['minute'] for row in rollups.rows()] == [2, 3, 4]
+    rollups.clear()
+    assert rollups.rows() == []
+
+
+def test_snapshot_returns_rows_in_order_after_flush(log):
+    for number in range(1, 2001):
+        log.log_blink(blink_row(number))
+    rows = list(log.snapshot('blinks'))
+    assert [int(row['blink_number']) for row in rows] == list(range(1, 2001))
+    assert rows[0][SESSION_FIELD] == log.session_id
+
+
+def test_flush_writes_everything_queued(log):
+    for number in range(1, 51):
+        log.log_blink(blink_row(number))
+    log.log_minute(minute_row(0))
+    log.flush()
+    with open(log.paths['blinks'], newline='') as f:
+        assert len(list(csv.DictReader(f))) == 50
+    with open(log.paths['minutes'], newline='') as f:
+        rows = list(csv.DictReader(f))
+    assert [row['minute'] for row in rows] == ['0']
+
+
+def test_mark_starts_a_new_session(log):
+    log.log_blink(blink_row(1))
+    log.log_blink(blink_row(2))
+    first_session = log.session_id
+    log.mark()
+    assert log.session_id != first_session
+    assert list(log.snapshot('blinks')) == []
+    log.log_blink(blink_row(1))
+    rows = list(log.snapshot('blinks'))
+    assert [(row[SESSION_FIELD], row['blink_number']) for row in rows] == [(log.session_id, '1')]
+
+    # Both sessions stay apart on disk
+    with open(log.paths['blinks'], newline='') as f:
+        on_disk = [(row[SESSION_FIELD], row['blink_number']) for row in csv.DictReader(f)]
+    assert on_disk == [(first_session, '1'), (first_session, '2'), (log.session_id, '1')]
+
+
+def test_reopened_log_appends_with_a_new_session(tmp_path):
+    path = str(tmp_path / "session.csv")
+    first = SessionLog(path)
+    first.log_blink(blink_row(1))
+    first.close()
+    second = SessionLog(path)
+    second.log_blink(blink_row(1))
+    assert [row['blink_number'] for row in second.snapshot('blinks')] == ['1']
+    second.close()
+    with open(path, newline='') as f:
+        rows = list(csv.DictReader(f))
+    assert len(rows) == 2
+    assert rows[0][SESSION_FIELD] != rows[1][SESSION_FIELD]
+
+
+def test_log_headers(log):
+    with open(log.paths['blinks'], newline='') as f:
+        assert tuple(next(csv.reader(f))) == (SESSION_FIELD,) + BLINK_FIELDS
+    with open(log.paths['minutes'], newline='') as f:
+        assert tuple(next(csv.reader(f))) == (SESSION_FIELD,) + MINUTE_FIELDS
+
+
+def test_log_with_other_columns_is_refused(tmp_path):
+    path = tmp_path / "old.csv"
+    path.write_text("timestamp,blink_number\n1,1\n")
+    with pytest.raises(ValueError):
+        SessionLog(str(path))
+
+
+def test_copy_to_matches_iteration(log, tmp_path):
+    for number in range(1, 101):
+        log.log_blink(blink_row(number))
+    snapshot = log.snapshot('blinks')
+    chunks = []
+    target = tmp_path / "copy.csv"
+    with open(target, 'wb') as f:
+        snapshot.copy_to(f, chunk_size=256, on_chunk=chunks.append)
+    assert sum(len(chunk) for chunk in chunks) == snapshot.size
+    with open(target, newline='') as f:
+        copied = list(csv.DictReader(f, fieldnames=snapshot.fieldnames))
+    assert copied == list(snapshot)
@@ -0,0 +1,120 @@
+"""
+Incremental session metrics
+"""
+
+import numpy as np
+import pytest
+
+from session_metrics import BlinkRates, DurationStats, PerclosWindow, SlidingWindowRate, window_label
+
+
+def test_window_evicts_old_blinks():
+    rate = SlidingWindowRate(10)
+    for t in (0.0, 2.0, 4.0, 11.0):
+        rate.add(t)
+    # 0.0 is more than 10 s before 11.0; 2.0 is not yet
+    assert list(rate.times) == [2.0, 4.0, 11.0]
+    assert rate.count(12.5) == 2
+    assert rate.count(30.0) == 0
+
+
+def test_window_edge_is_inclusive():
+    rate = SlidingWindowRate(10)
+    rate.add(0.0)
+    assert rate.count(10.0) == 1
+    assert rate.count(10.001) == 0
+
+
+def test_rate_over_partial_window():
+    rate = SlidingWindowRate(60)
+    assert rate.rate(5.0) == 0.0
+    rate.add(0.0)
+    assert rate.rate(5.0) == 0.0
+    rate.add(5.0)
+    # Two blinks in the 10 s since the oldest one, not in the full minute
+    assert rate.rate(10.0) == pytest.approx(12.0)
+    assert rate.rate(None) == 0.0
+
+
+def test_rate_over_full_window():
+    rate = SlidingWindowRate(60)
+    for t in range(0, 120, 4):
+        rate.add(float(t))
+    # Blinks at 56..116 remain (56 is exactly 60 s old): 16 over 60 s
+    assert rate.rate(116.0) == pytest.approx(16.0)
+
+
+def test_blink_rates_always_include_one_minute():
+    rates = BlinkRates((10, 300))
+    assert sorted(rates.windows) == [10.0, 60.0, 300.0]
+    for t in (0.0, 30.0, 55.0, 58.0):
+        rates.add(t)
+    assert rates.rate(58.0) == pytest.approx(4 / 58 * 60)
+    assert rates.rates(58.0) == {'10s': pytest.approx(40.0), '1min': round(4 / 58 * 60, 2),
+                                 '5min': round(4 / 58 * 60, 2)}
+    rates.clear()
+    assert rates.rates(58.0) == {'10s': 0.0, '1min': 0.0, '5min': 0.0}
+
+
+def test_window_label():
+    assert window_label(10) == "10s"
+    assert window_label(60) == "1min"
+    assert window_label(300) == "5min"
+    assert window_label(90) == "90s"
+    assert window_label(2.5) == "2.5s"
+
+
+def test_perclos_evicts_by_time():
+    perclos = PerclosWindow(window=1.0, fps=10.0)
+    assert perclos.capacity == 10
+    # 4 fps source: half the buffer covers the whole window
+    for i in range(10):
+        perclos.add(i / 4, closed=i < 6)
+    # Frames at 1.25..2.25 s remain, of which only 1.25 is closed
+    assert perclos.size == 5
+    assert perclos.value == pytest.approx(1 / 5)
+    assert perclos.full
+
+
+def test_perclos_capacity_bounds_fast_sources():
+    perclos = PerclosWindow(window=1.0, fps=10.0)
+    for i in range(30):
+        perclos.add(i / 20, closed=i % 3 == 0)
+    # A 20 fps source keeps only the most recent 10 frames
+    assert perclos.size == 10
+    assert perclos.closed == sum(1 for i in range(20, 30) if i % 3 == 0)
+
+
+def test_perclos_not_full_before_window_elapses():
+    perclos = PerclosWindow(window=2.0, fps=10.0)
+    assert perclos.value == 0.0
+    for i in range(10):
+        perclos.add(i / 10, closed=True)
+    assert not perclos.full
+    assert perclos.value == 1.0
+    perclos.clear()
+    assert perclos.size == 0 and perclos.value == 0.0 and not perclos.full
+
+
+def test_duration_stats_match_numpy():
+    rng = np.random.default_rng(0)
+    durations = rng.uniform(0.05, 0.5, 500)
+    stats = DurationStats()
+    for duration in durations:
+        stats.add(float(duration))
+    assert stats.count == 500
+    assert stats.mean == pytest.approx(np.mean(durations), rel=1e-12)
+    assert stats.std == pytest.approx(np.std(durations, ddof=1), rel=1e-9)
+    summary = stats.summary()
+    assert summary['min_ms'] == round(durations.min() * 1000, 1)
+    assert summary['max_ms'] == round(durations.max() * 1000, 1)
+    assert summary['last_ms'] == round(durations[-1] * 1000, 1)
+
+
+def test_duration_stats_before_and_after_first_blink():
+    stats = DurationStats()
+    assert stats.summary() == {'count': 0, 'mean_ms': None, 'std_ms': 0.0,
+                               'min_ms': None, 'max_ms': None, 'last_ms': None}
+    stats.add(0.2)
+    assert stats.summary() == {'count': 1, 'mean_ms': 200.0, 'std_ms': 0.0,
+                               'min_ms': 200.0, 'max_ms': 200.0, 'last_ms': 200.0}
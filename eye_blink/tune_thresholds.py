@@ -0,0 +1,370 @@
+"""
+Blink Threshold Tuner
+Evaluates a grid of ear_threshold, consec_frames and drowsiness_threshold
+values against labeled EAR traces and writes the best settings in
+config.json format
+"""
+
+import argparse
+import csv
+import itertools
+import json
+import os
+import time
+
+import numpy as np
+
+from blink_state import smoothed_ear
+from detection_core import MODES
+from replay_trace import LABEL_BLINK, LABEL_DROWSY, load_trace
+
+
+def label_intervals(labels, timestamps, kind):
+    """
+    Convert a per-sample label column into (start, end) time intervals
+
+    Returns:
+        tuple: (starts, ends) arrays of interval times in seconds
+    """
+    mask = labels == kind
+    edges = np.diff(mask.astype(np.int8), prepend=0, append=0)
+    first = np.flatnonzero(edges == 1)
+    last = np.flatnonzero(edges == -1) - 1
+    return timestamps[first], timestamps[last]
+
+
+def load_labels(trace_path, trace):
+    """
+    Get the labeled blink and drowsy intervals of a trace
+
+    Labels come from the trace's `label` column, or from a sidecar
+    `<trace>_labels.csv` with a `timestamp` column (blink times),
+    optional `end` column and optional `kind` column (blink/drowsy).
+
+    Returns:
+        dict: 'blink' and 'drowsy' as (starts, ends) interval arrays
+    """
+    if trace['label'] is not None:
+        return {
+            'blink': label_intervals(trace['label'], trace['timestamp'], LABEL_BLINK),
+            'drowsy': label_intervals(trace['label'], trace['timestamp'], LABEL_DROWSY)
+        }
+
+    sidecar = os.path.splitext(trace_path)[0] + "_labels.csv"
+    if not os.path.exists(sidecar):
+        raise RuntimeError(f"{trace_path} has no label column and no {sidecar}")
+    intervals = {'blink': ([], []), 'drowsy': ([], [])}
+    with open(sidecar, newline='') as f:
+        for row in csv.DictReader(f):
+            start = float(row['timestamp'])
+            end = float(row.get('end') or start)
+            starts, ends = intervals[row.get('kind') or 'blink']
+            starts.append(start)
+            ends.append(end)
+    return {kind: (np.array(starts), np.array(ends))
+            for kind, (starts, ends) in intervals.items()}
+
+
+def match_intervals(times, intervals, tolerance):
+    """
+    Find the labeled interval each time falls into
+
+    Args:
+        times: (R,) event times
+        intervals: (starts, ends) sorted interval arrays
+        tolerance: Seconds an event may fall outside its interval
+
+    Returns:
+        numpy array: (R,) interval index, or -1 when unmatched
+    """
+    starts, ends = intervals
+    if len(starts) == 0:
+        return np.full(len(times), -1)
+    index = np.searchsorted(starts - tolerance, times, side='right') - 1
+    valid = index >= 0
+    matched = valid & (times <= ends[np.maximum(index, 0)] + tolerance)
+    return np.where(matched, index, -1)
+
+
+def closed_runs(ear, thresholds):
+    """
+    Find runs of closed samples for every threshold at once
+
+    Returns:
+        tuple: (row, start, end) arrays, one entry per run, where row
+        indexes `thresholds` and end is exclusive (len(ear) if the trace
+        ends closed)
+    """
+    closed = ear[None, :] < thresholds[:, None]
+    padding = np.zeros((len(thresholds), 1), dtype=np.int8)
+    edges = np.diff(closed.astype(np.int8), axis=1, prepend=padding, append=padding)
+    row, start = np.nonzero(edges == 1)
+    _, end = np.nonzero(edges == -1)
+    return row, start, end
+
+
+def refractory_keep(times, refractory):
+    """
+    Apply the minimum time between counted blinks to sorted candidates
+
+    Candidates far enough from their predecessor are always kept; only
+    clusters of close candidates are resolved one by one.
+
+    Returns:
+        numpy array: Boolean keep mask
+    """
+    gaps = np.diff(times, prepend=-np.inf)
+    keep = gaps > refractory
+    last = None
+    for i in range(len(times)):
+        if keep[i]:
+            last = times[i]
+        elif last is None or times[i] - last > refractory:
+            keep[i] = True
+            last = times[i]
+    return keep
+
+
+def sweep_trace(trace, labels, thresholds, consec, drowsiness, mode, tolerance):
+    """
+    Count true/false positives of every parameter combination on one trace
+
+    Returns:
+        dict: Count arrays; blink counts have shape (T, C), drowsiness
+        counts have shape (T, D)
+    """
+    t = trace['timestamp']
+    refractory, smoothing = MODES[mode].refractory, MODES[mode].smoothing
+    ear = smoothed_ear((trace['left_ear'] + trace['right_ear']) / 2.0, smoothing)
+    n = len(ear)
+    n_thresholds = len(thresholds)
+
+    row, start, end = closed_runs(ear, thresholds)
+    length = end - start
+
+    # Blinks complete on the first open sample after the run; those
+    # inside a labeled drowsy closure are neither right nor wrong
+    finished = end < n
+    event_time = t[np.minimum(end, n - 1)]
+    in_drowsy = match_intervals(event_time, labels['drowsy'], tolerance) >= 0
+    scored = finished & ~in_drowsy
+    matched = match_intervals(event_time, labels['blink'], tolerance)
+    n_blinks = len(labels['blink'][0])
+
+    if refractory > 0:
+        detections = np.zeros((n_thresholds, len(consec)), dtype=np.int64)
+        hits = np.zeros_like(detections)
+        for k, (c_index, c) in itertools.product(range(n_thresholds), enumerate(consec)):
+            candidates = np.flatnonzero((row == k) & finished & (length >= c))
+            kept = candidates[refractory_keep(event_time[candidates], refractory)]
+            kept = kept[scored[kept]]
+            detections[k, c_index] = len(kept)
+            hits[k, c_index] = len(np.unique(matched[kept][matched[kept] >= 0]))
+    else:
+        counted = scored[:, None] & (length[:, None] >= consec[None, :])
+        detections = np.zeros((n_thresholds, len(consec)), dtype=np.int64)
+        np.add.at(detections, row, counted)
+
+        # A labeled blink is found when its longest matching run is long enough
+        longest = np.zeros(n_thresholds * max(n_blinks, 1), dtype=np.int64)
+        has_match = scored & (matched >= 0)
+        np.maximum.at(longest, row[has_match] * n_blinks + matched[has_match], length[has_match])
+        longest = longest.reshape(n_thresholds, -1)
+        hits = (longest[:, :, None] >= consec[None, None, :]).sum(axis=1)
+
+    # Drowsiness is raised when a run lasts longer than the threshold
+    duration = t[np.maximum(end - 1, start)] - t[start]
+    raised = duration[:, None] > drowsiness[None, :]
+    alarms = np.zeros((n_thresholds, len(drowsiness)), dtype=np.int64)
+    np.add.at(alarms, row, raised)
+
+    drowsy_match = match_intervals(t[start], labels['drowsy'], tolerance)
+    n_drowsy = len(labels['drowsy'][0])
+    longest_closure = np.full(n_thresholds * max(n_drowsy, 1), -1.0)
+    has_match = drowsy_match >= 0
+    np.maximum.at(longest_closure, row[has_match] * n_drowsy + drowsy_match[has_match],
+                  duration[has_match])
+    longest_closure = longest_closure.reshape(n_thresholds, -1)
+    caught = (longest_closure[:, :, None] > drowsiness[None, None, :]).sum(axis=1)
+
+    return {
+        'blink_detections': detections, 'blink_hits': hits, 'blinks': n_blinks,
+        'drowsy_alarms': alarms, 'drowsy_hits': caught, 'drowsy': n_drowsy
+    }
+
+
+def precision_recall(hits, detections, total):
+    """Element-wise precision, recall and F1 (0 where undefined)"""
+    hits = hits.astype(np.float64)
+    precision = np.divide(hits, detections, out=np.zeros_like(hits), where=detections > 0)
+    recall = hits / total if total > 0 else np.zeros_like(hits)
+    denominator = precision + recall
+    f1 = np.divide(2 * precision * recall, denominator,
+                   out=np.zeros_like(hits), where=denominator > 0)
+    return precision, recall, f1
+
+
+def run_sweep(trace_paths, thresholds, consec, drowsiness, mode="classic", tolerance=0.2):
+    """
+    Sweep the parameter grid over all traces and aggregate the counts
+
+    Returns:
+        dict: 'blink' and 'drowsy' (precision, recall, f1) arrays of shape
+        (T, C) and (T, D), plus total 'samples'
+    """
+    totals = None
+    samples = 0
+    for path in trace_paths:
+        trace = load_trace(path)
+        counts = sweep_trace(trace, load_labels(path, trace), thresholds, consec,
+                             drowsiness, mode, tolerance)
+        samples += len(trace['timestamp'])
+        totals = counts if totals is None else {k: totals[k] + v for k, v in counts.items()}
+
+    return {
+        'blink': precision_recall(totals['blink_hits'], totals['blink_detections'], totals['blinks']),
+        'drowsy': precision_recall(totals['drowsy_hits'], totals['drowsy_alarms'], totals['drowsy']),
+        'samples': samples
+    }
+
+
+def best_settings(results, thresholds, consec, drowsiness, mode="classic"):
+    """
+    Pick the combination with the best blink F1, then the drowsiness
+    threshold with the best drowsiness F1 at that EAR threshold
+
+    Consecutive frames are stored under the swept mode's config key, so
+    tuning one mode leaves the other mode's preset alone
+
+    Returns:
+        dict: Settings in config.json format plus their scores
+    """
+    blink_f1 = results['blink'][2]
+    k, c = np.unravel_index(np.argmax(blink_f1), blink_f1.shape)
+    d = int(np.argmax(results['drowsy'][2][k]))
+    return {
+        'detection': {
+            'ear_threshold': round(float(thresholds[k]), 4),
+            MODES[mode].consec_frames_key: int(consec[c]),
+            'drowsiness_threshold_seconds': round(float(drowsiness[d]), 3)
+        },
+        'scores': {
+            'blink_precision': round(float(results['blink'][0][k, c]), 4),
+            'blink_recall': round(float(results['blink'][1][k, c]), 4),
+            'blink_f1': round(float(blink_f1[k, c]), 4),
+            'drowsy_precision': round(float(results['drowsy'][0][k, d]), 4),
+            'drowsy_recall': round(float(results['drowsy'][1][k, d]), 4),
+            'drowsy_f1': round(float(results['drowsy'][2][k, d]), 4)
+        }
+    }
+
+
+def write_grid(path, results, thresholds, consec, drowsiness):
+    """Write precision/recall of every combination to CSV"""
+    bp, br, bf = results['blink']
+    dp, dr, df = results['drowsy']
+    with open(path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['ear_threshold', 'consecutive_frames', 'drowsiness_threshold_seconds',
+                         'blink_precision', 'blink_recall', 'blink_f1',
+                         'drowsy_precision', 'drowsy_recall', 'drowsy_f1'])
+        for k, c, d in itertools.product(range(len(thresholds)), range(len(consec)),
+                                         range(len(drowsiness))):
+            writer.writerow([f"{thresholds[k]:.4f}", consec[c], f"{drowsiness[d]:.3f}",
+                             f"{bp[k, c]:.4f}", f"{br[k, c]:.4f}", f"{bf[k, c]:.4f}",
+                             f"{dp[k, d]:.4f}", f"{dr[k, d]:.4f}", f"{df[k, d]:.4f}"])
+
+
+def update_config(path, detection):
+    """Merge tuned detection settings into a config.json file"""
+    config = {}
+    if os.path.exists(path):
+        with open(path) as f:
+            config = json.load(f)
+    config.setdefault('detection', {}).update(detection)
+    with open(path, 'w') as f:
+        json.dump(config, f, indent=2)
+        f.write("\n")
+
+
+def value_range(spec, cast=float):
+    """Parse "start:stop:step" (inclusive) or a comma-separated list"""
+    if ":" in spec:
+        start, stop, step = (float(x) for x in spec.split(":"))
+        values = np.arange(start, stop + step / 2, step)
+    else:
+        values = np.array([float(x) for x in spec.split(",")])
+    return np.array([cast(v) for v in values]) if cast is int else values.round(6)
+
+
+def parse_args():
+    """Parse command-line options"""
+    parser = argparse.ArgumentParser(description="Tune blink thresholds on labeled EAR traces")
+    parser.add_argument("traces", nargs="+",
+                        help="labeled trace CSVs (see replay_trace.py)")
+    parser.add_argument("--mode", choices=sorted(MODES), default="classic",
+                        help="blink logic to tune (default: classic)")
+    parser.add_argument("--ear-thresholds", default="0.15:0.35:0.01",
+                        help="start:stop:step or list (default: 0.15:0.35:0.01)")
+    parser.add_argument("--consec-frames", default="1:6:1",
+                        help="start:stop:step or list (default: 1:6:1)")
+    parser.add_argument("--drowsiness-thresholds", default="0.5:3.0:0.25",
+                        help="start:stop:step or list in seconds (default: 0.5:3.0:0.25)")
+    parser.add_argument("--tolerance", type=float, default=0.2,
+                        help="seconds a detection may fall outside its labeled "
+                             "blink (default: 0.2)")
+    parser.add_argument("--grid-output", default="tuning_grid.csv",
+                        help="CSV with every combination (default: tuning_grid.csv)")
+    parser.add_argument("--output", default="tuned_settings.json",
+                        help="best settings in config.json format (default: tuned_settings.json)")
+    parser.add_argument("--update-config", metavar="CONFIG",
+                        help="also merge the best settings into this config.json")
+    parser.add_argument("--top", type=int, default=5, help="combinations to print (default: 5)")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    thresholds = value_range(args.ear_thresholds)
+    consec = value_range(args.consec_frames, int)
+    drowsiness = value_range(args.drowsiness_thresholds)
+    combos = len(thresholds) * len(consec) * len(drowsiness)
+
+    print("=== Blink Threshold Tuner ===")
+    start = time.perf_counter()
+    try:
+        results = run_sweep(args.traces, thresholds, consec, drowsiness, args.mode, args.tolerance)
+    except (RuntimeError, KeyError) as e:
+        print(f"\nError: {e}")
+        return
+    elapsed = time.perf_counter() - start
+    print(f"Evaluated {combos} combinations over {results['samples']} samples "
+          f"from {len(args.traces)} trace(s) in {elapsed:.2f}s\n")
+
+    bp, br, bf = results['blink']
+    order = np.argsort(bf, axis=None)[::-1][:args.top]
+    print(f"{'ear':>6} {'frames':>6} {'precision':>10} {'recall':>7} {'f1':>6}")
+    for k, c in zip(*np.unravel_index(order, bf.shape)):
+        print(f"{thresholds[k]:>6.3f} {consec[c]:>6} {bp[k, c]:>10.1%} "
+              f"{br[k, c]:>7.1%} {bf[k, c]:>6.3f}")
+
+    best = best_settings(results, thresholds, consec, drowsiness, args.mode)
+    write_grid(args.grid_output, results, thresholds, consec, drowsiness)
+    with open(args.output, 'w') as f:
+        json.dump(best, f, indent=2)
+        f.write("\n")
+
+    print("\nBest settings:")
+    for key, value in best['detection'].items():
+        print(f"  {key}: {value}")
+    print(f"  (blink F1 {best['scores']['blink_f1']:.3f}, "
+          f"drowsiness F1 {best['scores']['drowsy_f1']:.3f})")
+    print(f"\nGrid saved to: {args.grid_output}")
+    print(f"Settings saved to: {args.output}")
+    if args.update_config:
+        update_config(args.update_config, best['detection'])
+        print(f"Updated: {args.update_config}")
+
+
+if __name__ == "__main__":
+    main()
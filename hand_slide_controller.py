@@ -42,11 +42,30 @@ from collections import deque
 from pathlib import Path
 from typing import Dict, List, Tuple, Optional
 import math
+from concurrent.futures import Future, ThreadPoolExecutor
 
-import cv2
-import mediapipe as mp
-import pyautogui
-import numpy as np
+# Startup timing is shared with the eye blink entry points
+sys.path.insert(0, str(Path(__file__).resolve().parent / 'eye_blink'))
+from startup import StartupProfiler
+
+# Startup phases, beginning with the heavy imports
+STARTUP = StartupProfiler()
+with STARTUP.phase('imports'):
+    import cv2
+    import pyautogui
+    import numpy as np
+
+# mediapipe is the slowest import by far; it is pulled in on the model-loader
+# thread (see GestureController.load_hands_model) so it overlaps camera startup.
+mp = None
+
+
+def import_mediapipe():
+    global mp
+    if mp is None:
+        import mediapipe
+        mp = mediapipe
+    return mp
 
 # Optional Win32 (for real always-on-top)
 IS_WINDOWS = platform.system() == 'Windows'
@@ -190,12 +209,18 @@ class GestureMacro:
 
 class HandTracker:
     def __init__(self):
-        self.mp_hands = mp.solutions.hands
-        self.mp_drawing = mp.solutions.drawing_utils
         self.FINGER_TIPS = [4, 8, 12, 16, 20]
         self.last_pinch_distance = 0
         self.pinch_active = False
 
+    @property
+    def mp_hands(self):
+        return import_mediapipe().solutions.hands
+
+    @property
+    def mp_drawing(self):
+        return import_mediapipe().solutions.drawing_utils
+
     def count_fingers(self, hand_landmarks, handedness_str: str = "Right") -> int:
         if hand_landmarks is None:
             return 0
@@ -226,8 +251,33 @@ class HandTracker:
         return int(index_tip.x * Config.FRAME_WIDTH), int(index_tip.y * Config.FRAME_HEIGHT)
 
 
+class FrameBufferPool:
+    """Preallocated per-frame destinations so the main loop runs allocation-free."""
+
+    def __init__(self, width: int, height: int, pip_size: Tuple[int, int]):
+        self.width = width
+        self.height = height
+        self.raw = np.empty((height, width, 3), dtype=np.uint8)
+        self.frame = np.empty((height, width, 3), dtype=np.uint8)
+        self.rgb = np.empty((height, width, 3), dtype=np.uint8)
+        self.mask = np.empty((height, width), dtype=np.uint8)
+        self.mask_bool = np.empty((height, width), dtype=bool)
+        self.pip = np.empty((pip_size[1], pip_size[0], 3), dtype=np.uint8)
+
+    def matches(self, frame: np.ndarray) -> bool:
+        return frame.shape[0] == self.height and frame.shape[1] == self.width
+
+    def pip_buffer(self, pip_size: Tuple[int, int]) -> np.ndarray:
+        if self.pip.shape[1] != pip_size[0] or self.pip.shape[0] != pip_size[1]:
+            self.pip = np.empty((pip_size[1], pip_size[0], 3), dtype=np.uint8)
+        return self.pip
+
+
 class GestureController:
     def __init__(self):
+        self.startup = STARTUP
+        # Negotiated (width, height) for the model warm-up, or None without a camera
+        self._camera_size: Future = Future()
         print("=" * 74)
         print("  🚀 ENHANCED Hand Gesture Slide Controller — OpenCV GUI + PiP")
         print("=" * 74)
@@ -258,6 +308,7 @@ class GestureController:
         self.feedback_expire = 0.0
         self.show_help = True
         self.cap = None
+        self.buffers: Optional[FrameBufferPool] = None
         # PiP state
         self.pip_enabled = True
         self.pip_topmost_enforce = True
@@ -302,11 +353,17 @@ class GestureController:
         self.cap = cv2.VideoCapture(cam_index)
         if not self.cap.isOpened():
             print("❌ ERROR: Could not open webcam")
+            self._camera_size.set_result(None)
             return False
         self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, Config.FRAME_WIDTH)
         self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, Config.FRAME_HEIGHT)
-        self.drawing_canvas = np.zeros((Config.FRAME_HEIGHT, Config.FRAME_WIDTH, 3), dtype=np.uint8)
-        print("✅ Camera initialized")
+        # Size the canvas and buffer pool from what the driver actually negotiated
+        width = int(self.cap.get(cv2.CAP_PROP_FRAME_WIDTH)) or Config.FRAME_WIDTH
+        height = int(self.cap.get(cv2.CAP_PROP_FRAME_HEIGHT)) or Config.FRAME_HEIGHT
+        self.drawing_canvas = np.zeros((height, width, 3), dtype=np.uint8)
+        self.buffers = FrameBufferPool(width, height, self.pip_size)
+        self._camera_size.set_result((width, height))
+        print(f"✅ Camera initialized ({width}x{height})")
         return True
 
     # ---------- Gestures ----------
@@ -534,7 +591,7 @@ class GestureController:
             self.drawing_enabled = not self.drawing_enabled
             self.feedback_text = f"Drawing {'ON' if self.drawing_enabled else 'OFF'}"; self.feedback_expire = now + 1.0
         elif key == ord('c'):
-            self.drawing_canvas = np.zeros((Config.FRAME_HEIGHT, Config.FRAME_WIDTH, 3), dtype=np.uint8)
+            self.drawing_canvas.fill(0)
             self.drawing_points = []; self.last_drawing_point = None
             self.feedback_text = 'Drawings Cleared'; self.feedback_expire = now + 1.0
         elif key == ord('s'):
@@ -566,10 +623,22 @@ class GestureController:
             pass
         return True
 
-    # ---------- Main ----------
-    def run(self):
-        if not self.initialize_camera():
-            return
+    # ---------- Startup ----------
+    def load_hands_model(self):
+        # Runs on a worker thread while the camera opens and windows are created
+        with self.startup.phase('import mediapipe'):
+            import_mediapipe()
+        with self.startup.phase('hands model load'):
+            hands = mp.solutions.hands.Hands(max_num_hands=2, min_detection_confidence=0.6, min_tracking_confidence=0.5)
+        # First inference initialises the graph/delegates; pay that on a dummy
+        # frame of the size the camera negotiated, once it is known
+        size = self._camera_size.result()
+        if size is not None:
+            with self.startup.phase('hands warm-up'):
+                hands.process(np.zeros((size[1], size[0], 3), dtype=np.uint8))
+        return hands
+
+    def create_windows(self):
         cv2.namedWindow(Config.MAIN_NAME)
         cv2.setMouseCallback(Config.MAIN_NAME, self.handle_mouse)
         cv2.namedWindow(Config.PIP_NAME)
@@ -579,21 +648,62 @@ class GestureController:
             cv2.setWindowProperty(Config.PIP_NAME, cv2.WND_PROP_TOPMOST, 1)
         except Exception:
             pass
-        with mp.solutions.hands.Hands(max_num_hands=2, min_detection_confidence=0.6, min_tracking_confidence=0.5) as hands:
+
+    # ---------- Main ----------
+    def run(self):
+        # Model load + warm-up in parallel with camera open; GUI stays on the main thread
+        hands = None
+        try:
+            with ThreadPoolExecutor(max_workers=1, thread_name_prefix='hands-loader') as pool:
+                hands_future = pool.submit(self.load_hands_model)
+                try:
+                    with self.startup.phase('camera open'):
+                        camera_ok = self.initialize_camera()
+                finally:
+                    # Never leave the loader waiting for a size that will not come
+                    if not self._camera_size.done():
+                        self._camera_size.set_result(None)
+                if camera_ok:
+                    with self.startup.phase('windows'):
+                        self.create_windows()
+                with self.startup.phase('wait for model'):
+                    hands = hands_future.result()
+        finally:
+            # A failed model load or warm-up must not keep the camera open
+            if hands is None and self.cap is not None:
+                self.cap.release()
+        if not camera_ok:
+            self.cap.release()
+            hands.close()
+            return
+        first_frame = True
+        try:
             self.running = True
             print("🎬 Running… Press 'q' to quit")
             self._pending_screenshot = None
+            buf = self.buffers
             while self.running:
-                ret, frame = self.cap.read()
+                ret, raw = self.cap.read(buf.raw)
                 if not ret:
                     print("⚠️ Empty frame"); time.sleep(0.05); continue
+                if not buf.matches(raw):
+                    # Driver changed resolution mid-stream: resize the pool once
+                    buf = self.buffers = FrameBufferPool(raw.shape[1], raw.shape[0], self.pip_size)
+                    buf.raw = raw
+                    # Keep the strokes drawn so far, scaled to the new frame size
+                    self.drawing_canvas = cv2.resize(self.drawing_canvas, (raw.shape[1], raw.shape[0]),
+                                                     interpolation=cv2.INTER_NEAREST)
+                    self.last_drawing_point = None
                 self.fps_frame_count += 1
                 if time.time() - self.fps_start_time >= 1.0:
                     self.fps_display = self.fps_frame_count / (time.time() - self.fps_start_time)
                     self.fps_frame_count = 0; self.fps_start_time = time.time()
-                frame = cv2.flip(frame, 1)
-                rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+                frame = cv2.flip(raw, 1, dst=buf.frame)
+                rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB, dst=buf.rgb)
                 results = hands.process(rgb)
+                if first_frame:
+                    self.startup.report('first usable frame')
+                    first_frame = False
                 now = time.time()
                 fingers_count, pinch_distance, tip = self.process_frame(frame, results)
                 if pinch_distance > 0:
@@ -602,10 +712,10 @@ class GestureController:
                 if self.drawing_enabled and tip:
                     self.handle_drawing(tip, fingers_count)
                 if self.drawing_enabled:
-                    mask = cv2.cvtColor(self.drawing_canvas, cv2.COLOR_BGR2GRAY)
-                    _, mask = cv2.threshold(mask, 1, 255, cv2.THRESH_BINARY)
-                    frame = cv2.add(cv2.bitwise_and(frame, frame, mask=cv2.bitwise_not(mask)),
-                                    cv2.bitwise_and(self.drawing_canvas, self.drawing_canvas, mask=mask))
+                    # Composite strokes in place: copy canvas pixels wherever gray > 1
+                    cv2.cvtColor(self.drawing_canvas, cv2.COLOR_BGR2GRAY, dst=buf.mask)
+                    np.greater(buf.mask, 1, out=buf.mask_bool)
+                    np.copyto(frame, self.drawing_canvas, where=buf.mask_bool[..., None])
                 if self.gestures_enabled and not self.drawing_enabled and not is_pinching and fingers_count>0:
                     self.handle_gesture(fingers_count)
                 # UI overlays
@@ -614,7 +724,7 @@ class GestureController:
                 cv2.imshow(Config.MAIN_NAME, frame)
                 # Update PiP window from the same camera feed (always-on cam)
                 if self.pip_enabled:
-                    pip = cv2.resize(frame, self.pip_size)
+                    pip = cv2.resize(frame, self.pip_size, dst=buf.pip_buffer(self.pip_size))
                     cv2.imshow(Config.PIP_NAME, pip)
                     # Position PiP window
                     try:
@@ -647,6 +757,8 @@ class GestureController:
             print(f"Total Gestures: {stats['total_gestures']} | GPM: {stats['gestures_per_minute']:.1f} | Most: {stats['most_used']}")
             if self.cap: self.cap.release()
             cv2.destroyAllWindows()
+        finally:
+            hands.close()
 
     # ---- Help panel (same as earlier but local) ----
     def create_help_panel(self) -> np.ndarray: